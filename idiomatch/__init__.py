@@ -1,6 +1,7 @@
 from .idiomatcher import Idiomatcher
+from .component import IdiomatcherComponent  # registers the "idiomatcher" factory with spaCy
 from ._models._idiom import Idiom
 from ._models._sense import Sense
 
 
-__all__ = ["Idiomatcher", "Idiom", "Sense"]
+__all__ = ["Idiomatcher", "IdiomatcherComponent", "Idiom", "Sense"]
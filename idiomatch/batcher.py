@@ -0,0 +1,134 @@
+"""
+Coalesces the texts that coroutines ask to match into micro-batches, which are tagged together with nlp.pipe
+in a pool of threads or processes, so that an asyncio service neither blocks its event loop on the pipeline
+nor runs it once per request, e.g.
+    idiomatcher.serve(n_process=4)
+    matches = await idiomatcher.amatch("The floodgates will remain opened for a host of new lawsuits.")
+"""
+import asyncio
+from collections import defaultdict
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, Callable
+
+
+class Batcher:
+    """
+    Queues the texts to match, up to max_pending of them (put() waits while the queue is full, which pushes
+    back on the callers), and matches whatever is queued as a batch as soon as one of the max_batches
+    slots of the executor is free. The busier the executor, the larger the batches.
+    """
+
+    def __init__(self, run: Callable[[list[str], bool | str, str, bool], list], executor: Executor,
+                 batch_size: int = 64, max_wait: float = 0.0, max_pending: int = 1024, max_batches: int = 1):
+        """
+        Args:
+            run: matches a batch of texts in the executor:
+                 run(texts, greedy, output, within_sentences) -> the matches of each text
+            executor: the pool of threads or processes to run the batches in
+            batch_size: the most texts to match at a time
+            max_wait: how long (in seconds) to wait for more texts before matching a batch that isn't full
+            max_pending: the most texts to queue before callers have to wait
+            max_batches: the most batches to have in flight at a time, e.g. the number of workers of the executor
+        """
+        self.run = run
+        self.executor = executor
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.max_batches = max_batches
+        # the queue and the task that consumes it belong to the event loop they were started in
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.queue: asyncio.Queue | None = None
+        self.slots: asyncio.Semaphore | None = None
+        self.task: asyncio.Task | None = None
+        self.requests = 0  # number of texts matched so far
+        self.batches = 0  # number of batches matched so far
+
+    def start(self):
+        """Start consuming the queue in the running event loop, unless it already is."""
+        loop = asyncio.get_running_loop()
+        if self.loop is loop and self.task is not None and not self.task.done():
+            return
+        self.loop = loop
+        self.queue = asyncio.Queue(self.max_pending)
+        self.slots = asyncio.Semaphore(self.max_batches)
+        self.task = loop.create_task(self.consume())
+
+    async def submit(self, text: str, greedy: bool | str, output: str, within_sentences: bool = False) -> Any:
+        """Queue a text, and wait for its matches."""
+        self.start()
+        future = self.loop.create_future()
+        await self.queue.put((text, (greedy, output, within_sentences), future))
+        return await future
+
+    async def collect(self) -> list[tuple]:
+        """Wait for a text, then take as many of the queued ones as fit in a batch."""
+        batch = [await self.queue.get()]
+        if self.max_wait and self.queue.qsize() < self.batch_size - 1:
+            await asyncio.sleep(self.max_wait)
+        while len(batch) < self.batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def consume(self):
+        while True:
+            await self.slots.acquire()
+            batch = await self.collect()
+            # a batch is matched with a single greedy policy, output and sentence mode
+            groups = defaultdict(list)
+            for text, options, future in batch:
+                if not future.done():  # e.g. the caller was cancelled
+                    groups[options].append((text, future))
+            if not groups:
+                self.slots.release()
+            for i, (options, requests) in enumerate(groups.items()):
+                if i:
+                    await self.slots.acquire()
+                self.batches += 1
+                self.requests += len(requests)
+                try:
+                    done = self.loop.run_in_executor(self.executor, self.run, [text for text, _ in requests],
+                                                     *options)
+                except Exception as e:  # e.g. a broken process pool
+                    done = self.loop.create_future()
+                    done.set_exception(e)
+                done.add_done_callback(partial(self.resolve, requests))
+
+    def resolve(self, requests: list[tuple[str, asyncio.Future]], done: asyncio.Future):
+        """Hand the matches of a batch (or the error matching it raised) to the callers."""
+        self.slots.release()
+        exception = None if done.cancelled() else done.exception()
+        for i, (_, future) in enumerate(requests):
+            if future.done():
+                continue
+            if done.cancelled():
+                future.cancel()
+            elif exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(done.result()[i])
+
+    def close(self):
+        """Stop consuming the queue, cancel the texts still in it, and shut the executor down."""
+        if self.task is not None:
+            self.task.cancel()
+        while self.queue is not None and not self.queue.empty():
+            *_, future = self.queue.get_nowait()
+            future.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """
+        How much the texts have been coalesced so far.
+
+        Returns:
+            requests: the number of texts matched
+            batches: the number of batches they were matched in
+            batch_size: the average number of texts per batch
+        """
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "batch_size": self.requests / self.batches if self.batches else 0.0,
+        }
@@ -1,12 +1,23 @@
+from collections import Counter
+import hashlib
+import json
+import math
+import re
+import spacy
 from spacy import Language
 from spacy.tokens import Token
 from tqdm import tqdm
-from idiomatch.configs import WILDCARD
+from idiomatch.configs import WILDCARD, LEMMA_EXTENSION, PIPES_BY_ATTR
 
 from idiomatch.cases import \
     PRP_PLACEHOLDER_CASES, \
     PRON_PLACEHOLDER_CASES, SPECIAL_TOK_CASES, OPTIONAL_CASES
 
+# bump it along with any change to the builders that changes the patterns they build, compile or fill in,
+# so that scripts/update.py rebuilds the patterns of every idiom (see manifest)
+# and Idiomatcher.from_pretrained rebuilds its snapshots (see idiomatcher.fingerprint)
+BUILDERS_VERSION = 1
+
 
 
 # # Utility functions for idiom processing
@@ -53,6 +64,30 @@ def add_special_tok_cases(nlp: Language) -> None:
         nlp.tokenizer.add_special_case(term, case)
 
 
+def lower_lemma(token: Token) -> str:
+    """The lowercased lemma of a token, which compiled patterns match against."""
+    return token.lemma_.lower()
+
+
+def set_extensions() -> None:
+    """Register the token extensions that compiled patterns rely on."""
+    if not Token.has_extension(LEMMA_EXTENSION):
+        Token.set_extension(LEMMA_EXTENSION, getter=lower_lemma)
+
+
+# compiled patterns must work wherever idiomatch is imported (e.g. in worker processes)
+set_extensions()
+
+
+def wildcard(n: int) -> dict:
+    """
+    The spec of up to n words of any kind, which slop inserts between the tokens of an idiom.
+    The Matcher caches what the regex returns per token, so it is searched at most once per token of a doc.
+    Testing a precomputed lexeme flag instead is slower from n=2 on (see scripts/bench/wildcard.py).
+    """
+    return {"TEXT": {"REGEX": WILDCARD}, "OP": "{0," + str(n) + "}"}
+
+
 def slop(patterns: list[dict], n: int) -> list[dict]:
     """
     Insert slop patterns between token patterns.
@@ -68,7 +103,7 @@ def slop(patterns: list[dict], n: int) -> list[dict]:
         new.append(patterns[i])
         if i < len(patterns) - 1:
             # For higher slop values, we need 0 to n words
-            new.append({"TEXT": {"REGEX": WILDCARD}, "OP": "{0," + str(n) + "}"})        
+            new.append(wildcard(n))
     return new
 
 
@@ -126,27 +161,34 @@ def default(tokens: list[Token], n: int) -> list[dict]:
     return slop(patterns, n)
 
 
-def build(lemmas: list[str], nlp: Language, n: int) -> dict[str, list]:
+# the tokens that make an idiom an openslot one
+OPENSLOT_CASES = set(PRON_PLACEHOLDER_CASES + PRP_PLACEHOLDER_CASES + OPTIONAL_CASES)
+
+
+def build(lemmas: list[str], nlp: Language, n: int, batch_size: int = 256, n_process: int = 1) -> dict[str, list]:
     """
-    Build patterns for a list of idioms.
+    Build patterns for a list of idioms. Each lemma is tagged once, and the tagging is all the work
+    there is to it, so the patterns of every slop value can come from a single build (see to_template).
     
     Args:
         lemmas: list of idiom lemmas to process
         nlp: Spacy Language model
         n: maximum number of words allowed between pattern tokens (default: 3)
+        batch_size: the number of lemmas to tag with nlp.pipe at a time
+        n_process: the number of processes to tag the lemmas with
     Returns:
         dictionary mapping lemmas to their patterns
     """
     add_special_tok_cases(nlp)
     lemma2patterns: dict[str, list[list[dict]]] = {}  # this is the one to build for
-    for lemma in tqdm(lemmas):
+    docs = nlp.pipe(lemmas, batch_size=batch_size, n_process=n_process)
+    for lemma, doc in tqdm(zip(lemmas, docs), total=len(lemmas)):
         patterns = []
-        doc = nlp(lemma)
         # if it's hyphenated, build a pattern for it
         if "-" in lemma:
             patterns.append(hyphenated(doc, n))
         # if it includes openslot, build a pattern for it
-        elif set(PRON_PLACEHOLDER_CASES + PRP_PLACEHOLDER_CASES + OPTIONAL_CASES).intersection(set(tok.text for tok in doc)) \
+        elif OPENSLOT_CASES.intersection(tok.text for tok in doc) \
             and lemma not in ["something like", "something awful"]:  # cases where something is not an openslot
             patterns.append(openslot(doc, n))
             patterns.append(openslot_passive(doc, n))
@@ -155,3 +197,285 @@ def build(lemmas: list[str], nlp: Language, n: int) -> dict[str, list]:
             patterns.append(default(doc, n))
         lemma2patterns[lemma] = patterns
     return lemma2patterns
+
+
+def to_template(lemma2patterns: dict[str, list], n: int) -> dict[str, list]:
+    """
+    Replace the wildcards of patterns built with slop value n with empty slots (None),
+    which leaves patterns that are the same for any slop value.
+    e.g. [{"LEMMA": ...}, {"TEXT": {"REGEX": WILDCARD}, "OP": "{0,3}"}, {"LEMMA": ...}]
+         -> [{"LEMMA": ...}, None, {"LEMMA": ...}]
+    """
+    slot = wildcard(n)
+    return {
+        lemma: [[None if spec == slot else spec for spec in pattern] for pattern in patterns]
+        for lemma, patterns in lemma2patterns.items()
+    }
+
+
+def materialize(patterns: list[list[dict | int | None]], n: int) -> list[list[dict]]:
+    """
+    Fill the slots of template patterns (see to_template) with the wildcard of slop value n.
+    A slot is either None, for a single wildcard, or the number of wildcards merged into it (see normalize).
+    The slots of the same size share a single spec, as the Matcher only reads it.
+    """
+    slots = {}
+    return [
+        [
+            spec if isinstance(spec, dict) else slots.setdefault(spec, wildcard(n * (spec or 1)))
+            for spec in pattern
+        ]
+        for pattern in patterns
+    ]
+
+
+def bounds(op: str) -> tuple[int, int | None] | None:
+    """
+    The least and the most tokens an operator matches (None for no limit), if it is a quantifier.
+    e.g. "?" -> (0, 1), "{0,3}" -> (0, 3), "+" -> (1, None), "!" -> None
+    """
+    quantifiers = {"1": (1, 1), "?": (0, 1), "*": (0, None), "+": (1, None)}
+    if op in quantifiers:
+        return quantifiers[op]
+    match = re.fullmatch(r"\{(\d*)(,?)(\d*)\}", op)
+    if match is None:
+        return None
+    least, comma, most = match.groups()
+    return int(least or 0), (int(most) if most else None) if comma else int(least)
+
+
+def quantifier(least: int, most: int | None) -> str:
+    """The operator of the given bounds, e.g. (0, 1) -> "?", (0, 6) -> "{0,6}"."""
+    if (least, most) == (0, 1):
+        return "?"
+    if most is None:
+        return "*" if least == 0 else "+" if least == 1 else f"{{{least},}}"
+    return f"{{{least},{most}}}"
+
+
+def normalize(pattern: list[dict | int | None]) -> list[dict | int | None]:
+    """
+    Merge the runs of optional specs that match the same tokens into one bounded spec, which matches
+    the same sequences of tokens: X{0,a} X{0,b} -> X{0,a+b}. The runs of slots of a template pattern
+    are merged into a slot of their size, e.g. the three slots openslot_passive puts between each pair
+    of tokens (as it slops the output of openslot again):
+    [{"TAG": "PRP$"}, None, None, None, {"LEMMA": ...}] -> [{"TAG": "PRP$"}, 3, {"LEMMA": ...}]
+    Only optional specs are merged, so that the literals a pattern requires stay as they are (see prefilter.feature).
+    """
+    normalized = []
+    for spec in pattern:
+        if not normalized:
+            normalized.append(spec)
+            continue
+        last = normalized[-1]
+        if not isinstance(spec, dict) and not isinstance(last, dict):
+            normalized[-1] = (last or 1) + (spec or 1)
+            continue
+        if isinstance(spec, dict) and isinstance(last, dict) \
+                and {k: v for k, v in spec.items() if k != "OP"} == {k: v for k, v in last.items() if k != "OP"}:
+            this, that = bounds(spec.get("OP", "1")), bounds(last.get("OP", "1"))
+            if this is not None and that is not None and this[0] == that[0] == 0:
+                most = None if this[1] is None or that[1] is None else this[1] + that[1]
+                normalized[-1] = {**last, "OP": quantifier(0, most)}
+                continue
+        normalized.append(spec)
+    return normalized
+
+
+def complexity(pattern: list[dict]) -> int:
+    """
+    The worst-case branching of a pattern: the most partial matches a single partial match can fork into
+    within a run of optional tokens. The Matcher expands {n,m} into m - n optional tokens, and a state can
+    skip or take each of them, reaching the same position along as many as C(k, k // 2) paths after a run of k.
+    The runs merged by normalize expand to the same optional tokens, so they score the same.
+    e.g. [{"LEMMA": ...}, {"TEXT": {"REGEX": WILDCARD}, "OP": "{0,3}"}, {"LEMMA": ...}] -> C(3, 1) = 3
+    """
+    worst, run = 1, 0
+    for spec in pattern + [{}]:
+        least, most = bounds(spec.get("OP", "1")) or (1, 1)
+        if most is None or most > least:
+            # unbounded operators are counted as a single optional token
+            run += 1 if most is None else most - least
+            continue
+        worst = max(worst, math.comb(run, run // 2))
+        run = 0
+    return worst
+
+
+def reach(pattern: list[dict]) -> int | None:
+    """The most tokens a pattern can match, or None if there is no limit."""
+    most = 0
+    for spec in pattern:
+        # "!" matches a single token
+        _, upper = bounds(spec.get("OP", "1")) or (1, 1)
+        if upper is None:
+            return None
+        most += upper
+    return most
+
+
+def lint(template: dict[str, list], n: int, budget: int) -> list[tuple[str, int, int]]:
+    """
+    The template patterns whose complexity exceeds the budget once filled in with slop value n.
+
+    Returns:
+        (lemma, the index of the pattern, its complexity) triples, the most complex first
+    """
+    over = [
+        (lemma, i, score)
+        for lemma, patterns in template.items()
+        for i, pattern in enumerate(materialize(patterns, n))
+        if (score := complexity(pattern)) > budget
+    ]
+    return sorted(over, key=lambda triple: triple[2], reverse=True)
+
+
+def dedupe(patterns: list[list]) -> list[list]:
+    """
+    Drop the patterns that are the same as an earlier one, e.g. the openslot and the openslot_passive patterns
+    of an idiom that normalize to the same pattern. The Matcher would store and evaluate each copy.
+    """
+    seen = set()
+    deduped = []
+    for pattern in patterns:
+        encoded = json.dumps(pattern, sort_keys=True)
+        if encoded not in seen:
+            seen.add(encoded)
+            deduped.append(pattern)
+    return deduped
+
+
+def sharing(template: dict[str, list]) -> dict:
+    """
+    How much the patterns of a template share across idioms: whole patterns, and the prefixes
+    a trie of the patterns would store once (see trie.PatternTrie).
+
+    Returns:
+        patterns: the number of patterns
+        unique: the number of distinct patterns
+        shared: the number of patterns that another idiom has too
+        specs: the number of specs
+        prefix_nodes: the number of distinct prefixes, i.e. the specs a trie of the patterns would store
+    """
+    counts = Counter(json.dumps(pattern, sort_keys=True) for patterns in template.values() for pattern in patterns)
+    prefixes = set()
+    for patterns in template.values():
+        for pattern in patterns:
+            for i in range(1, len(pattern) + 1):
+                prefixes.add(json.dumps(pattern[:i], sort_keys=True))
+    return {
+        "patterns": sum(counts.values()),
+        "unique": len(counts),
+        "shared": sum(count for count in counts.values() if count > 1),
+        "specs": sum(len(pattern) for patterns in template.values() for pattern in patterns),
+        "prefix_nodes": len(prefixes),
+    }
+
+
+def variants(lemma: str, patterns: list[list[dict]]) -> list[str]:
+    """
+    The names of the builders that made the patterns of an idiom, in the order build makes them.
+    e.g. variants("call someone's bluff", [..., ...]) -> ["openslot", "openslot_passive"]
+    Patterns that build could not have made are named by their positions (e.g. "pattern_2").
+    """
+    if len(patterns) == 1:
+        return ["hyphenated" if "-" in lemma else "default"]
+    if len(patterns) == 2 and "-" not in lemma:
+        return ["openslot", "openslot_passive"]
+    return [f"pattern_{i}" for i in range(len(patterns))]
+
+
+def manifest(lemmas: list[str], model: str) -> dict[str, str]:
+    """
+    Hash, per lemma, everything its patterns are built from: the lemma, the cases that shape the patterns
+    (see idiomatch.cases), the version of the builders (BUILDERS_VERSION), the minor version of spaCy
+    (which the models are pinned to) and the version of the nlp model.
+    Only the lemmas whose hashes change need rebuilding. The wildcards are not among the inputs,
+    as the template leaves them out (see to_template).
+    e.g. manifest(["take a stand"], "en_core_web_sm=3.8.0") -> {"take a stand": "9f2c..."}
+    """
+    shared = hashlib.sha256()
+    shared.update(json.dumps([PRP_PLACEHOLDER_CASES, PRON_PLACEHOLDER_CASES, OPTIONAL_CASES, SPECIAL_TOK_CASES],
+                             sort_keys=True).encode())
+    spacy_version = ".".join(spacy.__version__.split(".")[:2])
+    shared.update(f"builders={BUILDERS_VERSION}|spacy={spacy_version}|{model}".encode())
+    return {
+        lemma: hashlib.sha256(shared.digest() + lemma.encode()).hexdigest()
+        for lemma in lemmas
+    }
+
+
+# e.g. (?i)^take$
+CASE_INSENSITIVE_REGEX = re.compile(r"\(\?i\)\^(.+)\$")
+
+
+def literal(value) -> str | None:
+    """
+    The literal a case-insensitive regex like {"REGEX": "(?i)^take$"} matches, if it is a plain ascii one.
+    """
+    if not isinstance(value, dict) or len(value) != 1 or not isinstance(value.get("REGEX"), str):
+        return None
+    match = CASE_INSENSITIVE_REGEX.fullmatch(value["REGEX"])
+    if match is None or not match.group(1).isascii() or re.escape(match.group(1)) != match.group(1):
+        return None
+    return match.group(1)
+
+
+def compile_spec(spec: dict) -> dict:
+    """
+    Rewrite a case-insensitive regex on LEMMA / TEXT into an exact match on a lowercased attribute,
+    so that the Matcher compares hashes instead of calling a regex predicate per token.
+    e.g. {"LEMMA": {"REGEX": "(?i)^take$"}} -> {"_": {"idiomatch_lemma": "take"}}
+         {"TEXT": {"REGEX": "(?i)^Catch$"}} -> {"LOWER": "catch"}
+    Anything else (including regexes that are not plain ascii literals, e.g. "(?i)^...$") is left as is.
+    """
+    compiled = {}
+    for attr, value in spec.items():
+        text = literal(value) if attr in ("LEMMA", "TEXT") else None
+        if text is None:
+            compiled[attr] = value
+        elif attr == "LEMMA":
+            compiled["_"] = {LEMMA_EXTENSION: text.lower()}
+        else:
+            compiled["LOWER"] = text.lower()
+    return compiled
+
+
+def compile_patterns(patterns: list[list[dict]]) -> list[list[dict]]:
+    """
+    Compile the patterns of an idiom with `compile_spec`. The compiled patterns match exactly
+    what the regex ones do.
+
+    Args:
+        patterns: the patterns of an idiom, as built with `build`, or template patterns (see to_template),
+                  whose slots are left as they are
+    Returns:
+        the compiled patterns
+    """
+    return [
+        [compile_spec(spec) if isinstance(spec, dict) else spec for spec in pattern]
+        for pattern in patterns
+    ]
+
+
+def required_pipes(patterns: list[list[dict]]) -> set[str] | None:
+    """
+    The components of the nlp pipeline that set the token attributes the patterns read (see configs.PIPES_BY_ATTR).
+    e.g. [[{"_": {"idiomatch_lemma": "take"}}, {"TAG": "PRP$"}]] -> {"tok2vec", "tagger", "attribute_ruler", "lemmatizer"}
+         [[{"LOWER": "catch"}, {"TEXT": "-", "OP": "?"}]] -> set()
+
+    Returns:
+        the names of the components, or None if the patterns read an attribute that is not accounted for
+    """
+    attrs = set()
+    for pattern in patterns:
+        for spec in pattern:
+            for attr, value in spec.items():
+                if attr == "_":
+                    # the lemma extension reads LEMMA, any other extension is unknown
+                    attrs.update("LEMMA" if name == LEMMA_EXTENSION else None for name in value)
+                elif attr != "OP":
+                    attrs.add(attr)
+    if not attrs <= PIPES_BY_ATTR.keys():
+        return None
+    return {name for attr in attrs for name in PIPES_BY_ATTR[attr]}
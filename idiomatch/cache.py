@@ -0,0 +1,187 @@
+"""
+Caches the matches of the texts matched so far, so that a workload that repeats the same texts
+(e.g. the short messages of a chat: "break a leg!", "piece of cake") tags each of them only once, e.g.
+    cache = idiomatcher.cache_matches(max_entries=10_000)
+    idiomatcher.match_text("piece of cake")  # a miss: tagged and matched
+    idiomatcher.match_text("piece of cake")  # a hit
+    cache.stats()
+Also bounds what the gap engine remembers about the strings of the docs it has seen (see Memo).
+"""
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterable
+import numpy as np
+
+
+def sizeof(matches: list[dict] | np.ndarray) -> int:
+    """Roughly how many bytes the matches of a text take up."""
+    if isinstance(matches, np.ndarray):
+        return sys.getsizeof(matches) + (0 if matches.base is None else matches.nbytes)
+    return sys.getsizeof(matches) + sum(
+        sys.getsizeof(match) + sum(sys.getsizeof(value) for value in match.values())
+        for match in matches
+    )
+
+
+def copy(matches: list[dict] | np.ndarray) -> list[dict] | np.ndarray:
+    """A copy of the matches that the caller can change without changing the cached ones."""
+    if isinstance(matches, np.ndarray):
+        return matches.copy()
+    return [dict(match) for match in matches]
+
+
+class MatchCache:
+    """
+    A least recently used cache of the matches of texts (as dicts or arrays, Spans hold on to their docs),
+    bounded by both the number of texts and the bytes their matches take up. Its methods hold a lock,
+    so the threads that share a matcher (see Idiomatcher.serve) share its cache too.
+    """
+
+    def __init__(self, max_entries: int = 10_000, max_bytes: int = 64 * 2 ** 20):
+        """
+        Args:
+            max_entries: the most texts to keep the matches of
+            max_bytes: the most bytes the matches kept may take up
+        """
+        if max_entries < 1 or max_bytes < 1:
+            raise ValueError(f"A cache must hold at least one entry, got max_entries={max_entries}, "
+                             f"max_bytes={max_bytes}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[bytes, tuple[list[dict] | np.ndarray, int]] = OrderedDict()  # key -> (matches, size)
+        self.lock = threading.Lock()
+        self.size = 0  # the bytes the matches kept take up
+        # bumped by clear(), so that matches found before the patterns changed are not kept after
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(text: str, n: int, greedy: bool | str, output: str, within_sentences: bool = False) -> bytes:
+        """
+        The key of the matches of a text, with the slop value, greedy policy, output
+        and sentence mode they were found with.
+        """
+        return hashlib.blake2b(f"{n}\0{greedy}\0{output}\0{within_sentences}\0{text}".encode(),
+                               digest_size=16).digest()
+
+    def get(self, key: bytes) -> list[dict] | np.ndarray | None:
+        """The matches of a key (a copy of them), or None if they aren't cached."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return copy(entry[0])
+
+    def put(self, key: bytes, matches: list[dict] | np.ndarray, generation: int):
+        """
+        Cache the matches of a key (a copy of them), evicting the least recently used ones to make room.
+
+        Args:
+            key: the key of the matches (see key())
+            matches: the matches
+            generation: the generation the matches were found in. They are dropped if the cache has been
+                        cleared since, e.g. because idioms were added while they were being found.
+        """
+        size = sizeof(matches)
+        if size > self.max_bytes:
+            return
+        matches = copy(matches)
+        with self.lock:
+            if generation != self.generation:
+                return
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            self.entries[key] = (matches, size)
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all the matches, e.g. because the patterns changed (see Idiomatcher.add / remove)."""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.generation += 1
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        How well the cache has done so far.
+
+        Returns:
+            hits / misses: the number of lookups that found / didn't find the matches of a text
+            hit_rate: the share of lookups that were hits
+            evictions: the number of texts dropped to make room for others
+            invalidations: the number of times the cache was cleared
+            entries / bytes: the number of texts cached, and the bytes their matches take up
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self.entries),
+                "bytes": self.size,
+            }
+
+
+class Memo:
+    """
+    A least recently used memo of a function of the hashes of strings (e.g. whether a regex matches them),
+    bounded by the number of hashes, so that it stays bounded however many distinct strings a long stream
+    of texts has. Its methods hold a lock, as MatchCache's do.
+    """
+
+    def __init__(self, max_entries: int = 50_000):
+        """
+        Args:
+            max_entries: the most hashes to remember the values of
+        """
+        if max_entries < 1:
+            raise ValueError(f"A memo must hold at least one entry, got max_entries={max_entries}")
+        self.max_entries = max_entries
+        self.entries: OrderedDict[int, Any] = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+
+    def lookup(self, keys: Iterable[int], function: Callable[[int], Any]) -> dict[int, Any]:
+        """
+        The values of the function for the keys, computing the ones it doesn't remember.
+        All of them are returned, even if there are more than it can remember.
+
+        Args:
+            keys: the hashes of the strings
+            function: the function, which must give the same value for a hash every time
+                      (e.g. whatever StringStore it reads the string of the hash from)
+        """
+        values = {}
+        with self.lock:
+            for key in set(keys):
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    values[key] = self.entries[key]
+                else:
+                    values[key] = self.entries[key] = function(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return values
+
+    def __len__(self) -> int:
+        return len(self.entries)
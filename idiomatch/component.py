@@ -0,0 +1,92 @@
+"""
+Idiomatcher as a spaCy pipeline component, so that idioms are matched as part of nlp(...) / nlp.pipe(...).
+e.g.
+    nlp = spacy.load("en_core_web_sm")
+    nlp.add_pipe("idiomatcher", config={"n": 3})
+    doc = nlp("The floodgates will remain opened for a host of new lawsuits.")
+    doc.spans["idioms"]  # [The floodgates will remain opened], labelled "open the floodgates"
+"""
+from pathlib import Path
+from spacy import Language
+from spacy.tokens import Doc
+from .idiomatcher import Idiomatcher
+
+SNAPSHOT_NAME = "idiomatcher.msgpack"
+
+
+@Language.factory(
+    "idiomatcher",
+    default_config={"n": 1, "greedy": True, "spans_key": "idioms", "prefilter": True, "engine": "spacy",
+                    "within_sentences": False},
+    assigns=["doc.spans"],
+    requires=["token.lemma", "token.tag", "token.pos"],
+)
+def make_idiomatcher(nlp: Language, name: str, n: int, greedy: bool | str, spans_key: str,
+                     prefilter: bool | str, engine: str, within_sentences: bool) -> 'IdiomatcherComponent':
+    return IdiomatcherComponent(nlp, name, n=n, greedy=greedy, spans_key=spans_key, prefilter=prefilter,
+                                engine=engine, within_sentences=within_sentences)
+
+
+class IdiomatcherComponent:
+    """
+    Stores the idioms matched in a doc in doc.spans[spans_key], labelled with their lemmas.
+    The patterns are loaded lazily (or on nlp.initialize()), so that a pipeline loaded
+    from disk restores its matcher from the snapshot saved with it instead of rebuilding it.
+    """
+
+    def __init__(self, nlp: Language, name: str, n: int = 1, greedy: bool | str = True,
+                 spans_key: str = "idioms", prefilter: bool | str = True, engine: str = "spacy",
+                 within_sentences: bool = False):
+        self.nlp = nlp
+        self.name = name
+        self.n = n
+        self.greedy = greedy
+        self.spans_key = spans_key
+        self.prefilter = prefilter
+        self.engine = engine
+        self.within_sentences = within_sentences
+        self._matcher: Idiomatcher | None = None
+        self._matcher_bytes: bytes | None = None  # a snapshot to restore the matcher from
+
+    @property
+    def matcher(self) -> Idiomatcher:
+        if self._matcher is None:
+            if self._matcher_bytes is not None:
+                self._matcher = Idiomatcher.from_bytes(self._matcher_bytes, self.nlp, self.prefilter,
+                                                       engine=self.engine)
+                self._matcher_bytes = None
+            else:
+                self._matcher = Idiomatcher.from_pretrained(self.n, prefilter=self.prefilter, nlp=self.nlp,
+                                                            engine=self.engine)
+        return self._matcher
+
+    def initialize(self, get_examples=None, *, nlp: Language | None = None):
+        self.matcher
+
+    def __call__(self, doc: Doc) -> Doc:
+        doc.spans[self.spans_key] = self.matcher(doc, self.greedy, output="spans",
+                                                 within_sentences=self.within_sentences)
+        return doc
+
+    def to_bytes(self, *, exclude=tuple()) -> bytes:
+        return self.matcher.to_bytes()
+
+    def from_bytes(self, bytes_data: bytes, *, exclude=tuple()) -> 'IdiomatcherComponent':
+        self._matcher = None
+        self._matcher_bytes = bytes_data
+        return self
+
+    def to_disk(self, path: str | Path, *, exclude=tuple()):
+        self.matcher.to_disk(Path(path) / SNAPSHOT_NAME)
+
+    def from_disk(self, path: str | Path, *, exclude=tuple()) -> 'IdiomatcherComponent':
+        return self.from_bytes((Path(path) / SNAPSHOT_NAME).read_bytes())
+
+    def __getstate__(self) -> dict:
+        # the Matcher can't be pickled as an Idiomatcher, so ship a snapshot of it instead
+        # (e.g. to the worker processes of nlp.pipe(..., n_process=N))
+        state = self.__dict__.copy()
+        if self._matcher is not None:
+            state["_matcher"] = None
+            state["_matcher_bytes"] = self._matcher.to_bytes()
+        return state
@@ -1,4 +1,5 @@
 # spacy - the base model to use.
+import os
 from pathlib import Path
 
 NLP_MODEL = "en_core_web_sm"
@@ -9,5 +10,29 @@ TARGET_IDIOM_MIN_WORD_COUNT = 3
 
 WILDCARD = r"[a-zA-Z0-9,\-\'\"]+"
 
+# the complexity no pattern may exceed once filled in with the slop value scripts/update.py checks (see builders.lint).
+# The worst bundled patterns (e.g. "year in, year out") score 300,540,195 at slop 5
+COMPLEXITY_BUDGET = 350_000_000
+
+# the token extension that compiled patterns match lowercased lemmas against
+LEMMA_EXTENSION = "idiomatch_lemma"
+
+# the components of NLP_MODEL that set each token attribute a pattern can read.
+# Patterns reading any other attribute keep the whole pipeline enabled (see Idiomatcher.prune)
+PIPES_BY_ATTR = {
+    "ORTH": (),
+    "TEXT": (),
+    "LOWER": (),
+    "TAG": ("tok2vec", "tagger"),
+    "POS": ("tok2vec", "tagger", "attribute_ruler"),
+    "LEMMA": ("tok2vec", "tagger", "attribute_ruler", "lemmatizer"),
+    "DEP": ("tok2vec", "parser"),
+    "ENT_TYPE": ("ner",),
+    "ENT_IOB": ("ner",),
+}
+
 # for patterns and idioms
 RESOURCES_DIR = Path(__file__).parent / "resources"
+
+# for the compiled-matcher snapshots that from_pretrained caches
+CACHE_DIR = Path(os.environ.get("IDIOMATCH_CACHE_DIR", Path.home() / ".cache" / "idiomatch"))
@@ -0,0 +1,305 @@
+"""
+A matching engine purpose-built for the shape of the idiom patterns: a sequence of token tests, each repeated
+a bounded number of times (e.g. the {0,n} wildcards slop puts between the tokens of an idiom), e.g.
+    idiomatcher = Idiomatcher.from_pretrained(n=3, engine="gaps")
+    idiomatcher.engine.stats()
+spaCy's Matcher expands {0,n} into n optional tokens and follows every way of skipping or taking each of them
+as a partial match of its own, so the partial matches it tracks grow combinatorially with n (see builders.complexity).
+Here, a pattern is matched from each token it can start at by the set of positions each of its tests can end at,
+which holds at most one entry per token however many ways there are to get there. The tests are evaluated once per
+doc, over NumPy arrays of the token attributes, into the number of tokens from each position that pass them, so that
+a test repeated up to n times takes the range of positions it can end at in a single step.
+The matches are the same (match_id, start, end) triples as the Matcher's.
+"""
+import re
+from collections import defaultdict
+import numpy as np
+from spacy.attrs import IDS, LEMMA, ORTH, LOWER, TAG, POS, MORPH, DEP
+from spacy.matcher.matcher import Matcher
+from spacy.strings import StringStore, get_string_id
+from spacy.tokens import Doc, Span
+from spacy.vocab import Vocab
+from .builders import bounds
+from .cache import Memo
+from .configs import LEMMA_EXTENSION
+
+# the pseudo-attribute of the lowercased lemma, which compiled patterns match with the lemma extension
+LEMMA_LOWER = -1
+# the attributes whose equality tests anchor a pattern on the tokens it can start at
+ANCHORS = (LEMMA_LOWER, LOWER, ORTH)
+# the attributes the Matcher requires a doc to have set, and the components that set them
+ANNOTATIONS = {
+    TAG: "tagger",
+    POS: "morphologizer or tagger+attribute_ruler",
+    MORPH: "morphologizer or tagger+attribute_ruler",
+    LEMMA: "lemmatizer",
+    DEP: "parser",
+}
+
+
+class Unsupported(ValueError):
+    """A spec the engine can't match, which leaves its pattern to a spaCy Matcher."""
+
+
+def predicates(spec: dict, vocab: Vocab) -> tuple:
+    """
+    The predicates a token must pass for the spec to match it, as hashable tuples:
+    ("==", attr, value), ("IN", attr, values), ("NOT_IN", attr, values) or ("REGEX", attr, regex).
+    e.g. {"_": {"idiomatch_lemma": "take"}} -> (("==", LEMMA_LOWER, hash("take")),)
+         {"TEXT": {"REGEX": WILDCARD}, "OP": "{0,3}"} -> (("REGEX", ORTH, WILDCARD),)
+
+    Raises:
+        Unsupported: If the spec tests anything else (e.g. other extensions, or comparisons of LENGTH)
+    """
+    tests = []
+    for name, value in spec.items():
+        if name == "OP":
+            continue
+        if name == "_":
+            if not isinstance(value, dict) or value.keys() != {LEMMA_EXTENSION} \
+                    or not isinstance(value[LEMMA_EXTENSION], str):
+                raise Unsupported(f"Unsupported extension: {value}")
+            tests.append(("==", LEMMA_LOWER, vocab.strings.add(value[LEMMA_EXTENSION])))
+            continue
+        attr = IDS.get("ORTH" if name.upper() == "TEXT" else name.upper())
+        if attr is None or attr == MORPH:
+            raise Unsupported(f"Unsupported attribute: {name}")
+        if isinstance(value, str):
+            tests.append(("==", attr, vocab.strings.add(value)))
+        elif isinstance(value, dict) and len(value) == 1 and isinstance(value.get("REGEX"), str):
+            tests.append(("REGEX", attr, value["REGEX"]))
+        elif isinstance(value, dict) and len(value) == 1 and next(iter(value)) in ("IN", "NOT_IN") \
+                and all(isinstance(v, str) for v in next(iter(value.values()))):
+            (op, values), = value.items()
+            tests.append((op, attr, frozenset(vocab.strings.add(v) for v in values)))
+        else:
+            raise Unsupported(f"Unsupported value of {name}: {value}")
+    return tuple(sorted(tests, key=repr))
+
+
+class GapMatcher:
+    """
+    Matches patterns of bounded quantifiers (1, ?, {m,n}, ! and the unbounded * and +) over equality, IN / NOT_IN
+    and REGEX tests of token attributes and of the lowercased lemma. The patterns start from the tokens that have
+    the literal they start with (their anchor), or, for the ones that don't start with a required literal, from
+    every token that passes any of their leading tests. Patterns with specs it can't match
+    (e.g. other extensions) are matched by a spaCy Matcher of its own.
+    """
+
+    def __init__(self, vocab: Vocab):
+        self.vocab = vocab
+        self.tests: list[tuple[tuple, bool]] = []  # (predicates, whether they are negated) of each test, by id
+        self.ids: dict[tuple[tuple, bool], int] = {}  # (predicates, whether they are negated) -> the id of its test
+        # anchor attr -> value -> (key hash, elements) of the patterns anchored there
+        self.anchored: dict[int, dict[int, list[tuple]]] = {attr: defaultdict(list) for attr in ANCHORS}
+        # (key hash, elements, the tests a match can start with) of the patterns without an anchor
+        self.unanchored: list[tuple] = []
+        self.fallback = Matcher(vocab, validate=False)  # the patterns the engine can't match
+        self.keys: dict[str, list[tuple]] = defaultdict(list)  # key -> (anchor, elements) of its patterns
+        self.attrs: set[int] = set()  # the token attributes the tests read
+        # what is remembered about the strings of the docs matched so far, bounded for long streams of texts
+        self.lemmas = Memo()  # lemma -> its lowercased lemma
+        self.regexes: dict[tuple[int, str], Memo] = {}  # (attr, regex) -> value -> whether it matches
+        self.docs = 0  # number of docs matched so far
+        self.starts = 0  # number of (pattern, token) pairs a match was looked for from so far
+        self.steps = 0  # number of positions reached so far
+
+    def __len__(self) -> int:
+        """The number of patterns in the engine, including the ones its Matcher matches."""
+        return sum(len(patterns) for patterns in self.keys.values()) + sum(
+            len(patterns) for patterns in self.fallback._patterns.values()
+        )
+
+    def test(self, spec: dict, negated: bool) -> int:
+        """The id of the test of a spec (the same for the specs with the same predicates)."""
+        test = (predicates(spec, self.vocab), negated)
+        if test not in self.ids:
+            self.ids[test] = len(self.tests)
+            self.tests.append(test)
+        return self.ids[test]
+
+    def compile(self, pattern: list[dict]) -> tuple[tuple | None, tuple]:
+        """
+        The anchor of a pattern (an (attr, value) its first token must have, if it must have one)
+        and its elements: (test id, the least times, the most times, None for no limit).
+
+        Raises:
+            Unsupported: If the pattern has a spec or an operator the engine can't match
+        """
+        elements = []
+        for spec in pattern:
+            if not isinstance(spec, dict):
+                raise Unsupported(f"Not a spec: {spec}")
+            op = spec.get("OP", "1")
+            negated = op == "!"
+            limits = (1, 1) if negated else bounds(op)
+            if limits is None:
+                raise Unsupported(f"Unsupported operator: {op}")
+            elements.append((self.test(spec, negated), *limits))
+        anchor = None
+        first = pattern[0]
+        if elements[0][1] >= 1 and first.get("OP", "1") != "!":
+            anchor = next(
+                ((attr, value) for op, attr, value in predicates(first, self.vocab) if op == "==" and attr in ANCHORS),
+                None
+            )
+        return anchor, tuple(elements)
+
+    def add(self, key: str, patterns: list[list[dict]]):
+        key_hash = self.vocab.strings.add(key)
+        unsupported = []
+        for pattern in patterns:
+            try:
+                anchor, elements = self.compile(pattern)
+            except Unsupported:
+                unsupported.append(pattern)
+                continue
+            for test, _, _ in elements:
+                self.attrs.update(attr for _, attr, _ in self.tests[test][0])
+            if anchor is None:
+                # a match starts at the first token its leading tests take, up to the first one it requires
+                leading = []
+                for test, least, _ in elements:
+                    leading.append(test)
+                    if least >= 1:
+                        break
+                self.unanchored.append((key_hash, elements, tuple(leading)))
+            else:
+                self.anchored[anchor[0]][anchor[1]].append((key_hash, elements))
+            self.keys[key].append((anchor, elements))
+        if unsupported:
+            self.fallback.add(key, unsupported)
+
+    def remove(self, key: str, patterns: list[list[dict]]):
+        """
+        Remove the patterns of a key.
+
+        Args:
+            key: the key the patterns were added under
+            patterns: all the patterns of the key, as they were added
+        """
+        key_hash = self.vocab.strings[key]
+        for anchor in {anchor for anchor, _ in self.keys.pop(key, [])}:
+            if anchor is None:
+                self.unanchored = [entry for entry in self.unanchored if entry[0] != key_hash]
+                continue
+            bucket = [entry for entry in self.anchored[anchor[0]][anchor[1]] if entry[0] != key_hash]
+            if bucket:
+                self.anchored[anchor[0]][anchor[1]] = bucket
+            else:
+                del self.anchored[anchor[0]][anchor[1]]
+        if key in self.fallback:
+            self.fallback.remove(key)
+
+    def columns(self, doc: Doc, start: int, end: int) -> dict[int, np.ndarray]:
+        """
+        The token attributes the tests read, as arrays over the tokens of doc[start:end].
+        The strings are looked up in the vocab of the doc, which may not be the engine's.
+        """
+        attrs = sorted(attr for attr in self.attrs | {LOWER, ORTH} if attr != LEMMA_LOWER)
+        if LEMMA_LOWER in self.attrs and LEMMA not in attrs:
+            attrs.append(LEMMA)
+        array = doc.to_array(attrs)[start:end].astype(np.uint64)
+        columns = {attr: array[:, i] for i, attr in enumerate(attrs)}
+        if LEMMA_LOWER in self.attrs:
+            lemmas = columns[LEMMA].tolist()
+            # only the hashes are compared, so the lowercased lemmas aren't added to the vocab
+            lowered = self.lemmas.lookup(lemmas, lambda lemma: get_string_id(doc.vocab.strings[lemma].lower()))
+            columns[LEMMA_LOWER] = np.fromiter((lowered[lemma] for lemma in lemmas), np.uint64, len(lemmas))
+        return columns
+
+    def passes(self, test: int, columns: dict[int, np.ndarray], length: int, strings: StringStore) -> np.ndarray:
+        """Whether each token passes a test, with the strings of the doc the columns are of."""
+        tests, negated = self.tests[test]
+        passed = np.ones(length, dtype=bool)
+        for op, attr, value in tests:
+            column = columns[attr]
+            if op == "==":
+                passed &= column == np.uint64(value)
+            elif op in ("IN", "NOT_IN"):
+                isin = np.isin(column, np.fromiter(value, np.uint64, len(value)))
+                passed &= isin if op == "IN" else ~isin
+            else:
+                if (attr, value) not in self.regexes:
+                    self.regexes[attr, value] = Memo()
+                values = column.tolist()
+                found = self.regexes[attr, value].lookup(values, lambda v: re.search(value, strings[v]) is not None)
+                passed &= np.fromiter((found[v] for v in values), bool, length)
+        return ~passed if negated else passed
+
+    def __call__(self, doclike: Doc | Span) -> list[tuple[int, int, int]]:
+        """
+        Find the (match_id, start, end) triples of the patterns in a doc (or a span of one, relative to the span).
+        """
+        doc = doclike.doc if isinstance(doclike, Span) else doclike
+        offset = doclike.start if isinstance(doclike, Span) else 0
+        length = len(doclike)
+        for attr, pipe in ANNOTATIONS.items():
+            if attr in self.attrs and not doc.has_annotation(attr):
+                raise ValueError(f"The patterns read {self.vocab.strings[attr]}, which the doc doesn't have. "
+                                 f"Add a {pipe} to the pipeline")
+        self.docs += 1
+        matches = set(self.fallback(doclike)) if len(self.fallback) else set()
+        if not length or not self.keys:
+            return list(matches)
+        columns = self.columns(doc, offset, offset + length)
+        runs: dict[int, list[int]] = {}  # test -> the number of tokens from each position that pass it
+
+        def run(test: int) -> list[int]:
+            if test not in runs:
+                # the position of the first token from each position that fails the test
+                failed = np.append(np.flatnonzero(~self.passes(test, columns, length, doc.vocab.strings)), length)
+                positions = np.arange(length + 1)
+                runs[test] = (failed[np.searchsorted(failed, positions)] - positions).tolist()
+            return runs[test]
+
+        def find(key_hash: int, elements: tuple, start: int):
+            self.starts += 1
+            reached = {start}
+            for test, least, most in elements:
+                passing = run(test)
+                after = set()
+                for position in reached:
+                    top = position + (passing[position] if most is None else min(most, passing[position]))
+                    after.update(range(position + least, top + 1))
+                self.steps += len(after)
+                if not after:
+                    return
+                reached = after
+            matches.update((key_hash, start, end) for end in reached if end > start)
+
+        for attr in ANCHORS:
+            bucket = self.anchored[attr]
+            if not bucket:
+                continue
+            for start, value in enumerate(columns[attr].tolist()):
+                for key_hash, elements in bucket.get(value, ()):
+                    find(key_hash, elements, start)
+        for key_hash, elements, leading in self.unanchored:
+            starts = np.zeros(length, dtype=bool)
+            for test in leading:
+                starts |= np.asarray(run(test)[:length]) > 0
+            for start in np.flatnonzero(starts).tolist():
+                find(key_hash, elements, start)
+        return list(matches)
+
+    def stats(self) -> dict:
+        """
+        How much work the engine has done so far.
+
+        Returns:
+            docs: the number of docs matched
+            patterns: the number of patterns in the engine
+            fallback: the number of them its spaCy Matcher matches
+            tests: the number of distinct token tests of the patterns
+            starts_per_doc: the average number of (pattern, token) pairs a match was looked for from per doc
+            steps_per_doc: the average number of positions reached per doc
+        """
+        return {
+            "docs": self.docs,
+            "patterns": len(self),
+            "fallback": sum(len(patterns) for patterns in self.fallback._patterns.values()),
+            "tests": len(self.tests),
+            "starts_per_doc": self.starts / self.docs if self.docs else 0.0,
+            "steps_per_doc": self.steps / self.docs if self.docs else 0.0,
+        }
@@ -1,15 +1,152 @@
+import asyncio
+import hashlib
+import importlib.metadata
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator
 from langcodes import Language
+import numpy as np
+from spacy.attrs import IDX, LENGTH
 from spacy.matcher.matcher import Matcher
+from spacy.tokens import Span, DocBin
 from spacy.tokens.doc import Doc
 from spacy import Language
 from tqdm import tqdm
 import spacy
+import srsly
 from loguru import logger
-import yaml
 from ._models._idiom import Idiom
-from .builders import build
-from .configs import NLP_MODEL, RESOURCES_DIR
+from .batcher import Batcher
+from .cache import MatchCache
+from .engine import GapMatcher
+from .builders import BUILDERS_VERSION, build, compile_patterns, required_pipes, materialize, reach
+from .configs import NLP_MODEL, RESOURCES_DIR, CACHE_DIR, PIPES_BY_ATTR
 from .builders import add_special_tok_cases
+from .prefilter import Prefilter, Gate
+from .profiler import Profiler
+from .resolvers import resolve
+from .store import IdiomStore
+from .trie import PatternTrie
+from .windows import windows, sentence_bounds
+
+# what the matches are returned as
+DICTS = "dicts"  # dicts of the idiom, the text of the span and (match_id, start, end)
+SPANS = "spans"  # spaCy Spans, labelled with the idioms
+ARRAY = "array"  # a structured array of MATCH_DTYPE, one row per match
+OUTPUTS = (DICTS, SPANS, ARRAY)
+MATCH_DTYPE = np.dtype([
+    ("idiom", np.uint64),  # the hash of the idiom's lemma
+    ("start", np.int32),
+    ("end", np.int32),
+    ("start_char", np.int64),
+    ("end_char", np.int64),
+])
+# the prefilter that evaluates the patterns by the literals they start with (see trie.PatternTrie)
+TRIE = "trie"
+# what finds the matches of the patterns: spaCy's Matcher, or the engine built for their bounded gaps (see engine.GapMatcher)
+SPACY = "spacy"
+GAPS = "gaps"
+ENGINES = (SPACY, GAPS)
+
+
+def match_array(doc: Doc, matches: list[tuple[int, int, int]]) -> np.ndarray:
+    """
+    The matches of a doc as a structured array of MATCH_DTYPE, with the character offsets
+    looked up in the token offsets of the doc for all the matches at once.
+    """
+    array = np.zeros(len(matches), dtype=MATCH_DTYPE)
+    if not matches:
+        return array
+    triples = np.array(matches, dtype=np.uint64)
+    starts = triples[:, 1].astype(np.int64)
+    ends = triples[:, 2].astype(np.int64)
+    offsets = doc.to_array([IDX, LENGTH]).astype(np.int64)
+    array["idiom"] = triples[:, 0]
+    array["start"] = starts
+    array["end"] = ends
+    array["start_char"] = offsets[starts, 0]
+    array["end_char"] = offsets[ends - 1, 0] + offsets[ends - 1, 1]
+    return array
+
+
+def no_matches(output: str) -> list | np.ndarray:
+    """The result of a text without any match, in the given output."""
+    if output not in OUTPUTS:
+        raise ValueError(f"Unknown output: {output}. Must be one of {', '.join(OUTPUTS)}")
+    return np.zeros(0, dtype=MATCH_DTYPE) if output == ARRAY else []
+
+
+def load_nlp() -> Language:
+    """
+    Load the nlp model to use with the matcher, downloading it if necessary.
+    """
+    logger.info(f"Loading an nlp model to use with the matcher ({NLP_MODEL})...")
+    try:
+        nlp = spacy.load(NLP_MODEL)
+    except OSError:
+        logger.info(f"Model '{NLP_MODEL}' not found. Downloading it now...")
+        try:
+            spacy.cli.download(NLP_MODEL)
+            logger.info(f"Successfully downloaded {NLP_MODEL}")
+            nlp = spacy.load(NLP_MODEL)
+        except Exception as e:
+            raise OSError(
+                f"Failed to download spaCy model '{NLP_MODEL}'. Error: {str(e)}\n"
+                "Please try downloading it manually by running:\n"
+                f"python -m spacy download {NLP_MODEL}"
+            )
+    # must be done for cases like catch-22
+    add_special_tok_cases(nlp)
+    return nlp
+
+
+def fingerprint(paths: list[Path], nlp: Language, **settings) -> str:
+    """
+    Hash everything a pretrained matcher is built from, so that a cached snapshot
+    is rebuilt whenever any of its inputs change, including the version of idiomatch
+    and that of the code that compiles and fills in the patterns (builders.BUILDERS_VERSION).
+
+    Args:
+        paths: the resource files the matcher is built from (idioms, patterns)
+        nlp: the nlp model the matcher is used with
+        settings: the settings the matcher is built with (e.g. the slop value)
+    Returns:
+        a hex digest to key the snapshot with
+    """
+    sha = hashlib.sha256()
+    for path in paths:
+        sha.update(Path(path).read_bytes())
+    try:
+        version = importlib.metadata.version("idiomatch")
+    except importlib.metadata.PackageNotFoundError:  # e.g. run from a checkout, not installed
+        version = "unknown"
+    sha.update(f"idiomatch={version}|builders={BUILDERS_VERSION}".encode())
+    sha.update(f"spacy={spacy.__version__}".encode())
+    sha.update(f"{nlp.meta.get('name')}={nlp.meta.get('version')}".encode())
+    for name, value in sorted(settings.items()):
+        sha.update(f"{name}={value}".encode())
+    return sha.hexdigest()
+
+
+# the matcher of a worker process of Idiomatcher.pipe
+_worker: 'Idiomatcher | None' = None
+
+
+def _init_worker(data: bytes, prefilter: bool | str, prune: bool, engine: str):
+    global _worker
+    _worker = Idiomatcher.from_bytes(data, prefilter=prefilter, prune=prune, engine=engine)
+
+
+def _match_batch(texts: list[str], greedy: bool | str, output: str, within_sentences: bool) -> list:
+    return _worker.match_texts(texts, greedy, output=output, within_sentences=within_sentences)
+
+
+async def _aiter(items: Iterable) -> AsyncIterator:
+    for item in items:
+        yield item
 
 
 class Idiomatcher(Matcher):
@@ -17,128 +154,763 @@ class Idiomatcher(Matcher):
     a matcher class for.. matching idioms.
     """
 
-    def __init__(self, nlp: Language, n: int, idioms: list[Idiom]):
-        super().__init__(nlp.vocab)
+    def __init__(self, nlp: Language, n: int, idioms: list[Idiom] | IdiomStore, validate: bool = True,
+                 compiled: bool = True, prefilter: bool | str = True, engine: str = SPACY):
+        super().__init__(nlp.vocab, validate=validate)
         # we must maintain an nlp model here
         self.nlp = nlp
         self.n = n  # slop value
-        self.idioms = idioms
+        # the idioms are decoded only as they are looked up (see Idiomatcher.idiom)
+        self.idioms = idioms if isinstance(idioms, IdiomStore) else IdiomStore.from_idioms(idioms)
+        self.compiled = compiled  # whether regex specs are compiled into exact matches
+        if isinstance(prefilter, str) and prefilter != TRIE:
+            raise ValueError(f"Unknown prefilter: {prefilter}. Must be a bool or {TRIE}")
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}. Must be one of {', '.join(ENGINES)}")
+        # finds the matches in place of spaCy's Matcher, which makes a prefilter unnecessary
+        self.engine = GapMatcher(nlp.vocab) if engine == GAPS else None
+        if self.engine is not None:
+            prefilter = False
+        # evaluate only the patterns whose anchors (or prefixes, with TRIE) appear in a doc
+        self.prefilter = PatternTrie(nlp.vocab) if prefilter == TRIE else Prefilter(nlp.vocab) if prefilter else None
+        # skip the pipeline for texts that can't contain any idiom (see match_text)
+        self.gate = Gate(nlp)
+        self.pruned: set[str] = set()  # the components of the nlp pipeline disabled by prune()
+        self.profiler: Profiler | None = None  # matches in place of the prefilter while profiling (see profile())
+        self.batcher: Batcher | None = None  # coalesces the texts of amatch / apipe into batches (see serve())
+        self.match_cache: MatchCache | None = None  # the matches of the texts matched so far (see cache_matches())
 
     @staticmethod
-    def from_pretrained(n: int = 1) -> 'Idiomatcher':
+    def from_pretrained(n: int = 1, cache: bool = True, compiled: bool = True,
+                        prefilter: bool | str = True, nlp: Language | None = None, prune: bool = True,
+                        engine: str = SPACY) -> 'Idiomatcher':
         """
         Load a pre-trained idiom matcher, which can identify more than 2000 English idioms.
-        
+
         Args:
-            slop: The slop value to use (1-5). If None, use the default from configs.SLOP
-                  This determines which pattern file to load.
+            n: The slop value to use, i.e. the maximum number of words allowed between the tokens of an idiom.
+               The wildcards of the pattern template are filled in with it as the patterns are added.
+            cache: Whether to restore the matcher from (and save it to) a snapshot in configs.CACHE_DIR.
+                   The snapshot is keyed by the content of the resources and the spaCy/model versions.
+            compiled: Whether to compile the regex specs of the patterns into exact matches (see builders.compile_patterns).
+                      Set it to False to match with the regex patterns as they are in the pattern file.
+            prefilter: Whether to evaluate only the patterns whose anchor lemmas appear in a doc (see prefilter.Prefilter).
+                       Pass "trie" to evaluate the patterns by the literals they start with instead (see trie.PatternTrie).
+                       The matches are the same either way.
+            nlp: The nlp model to use with the matcher (e.g. the pipeline the matcher is a component of).
+                 If None, the default one is loaded.
+            prune: Whether to disable the components of the default nlp model that the patterns don't need
+                   (e.g. the parser and the ner, see Idiomatcher.prune). They are disabled on the `nlp` of the matcher,
+                   so its docs have no sentences or entities. An nlp model passed in is left as is.
+            engine: What finds the matches: "spacy" (spaCy's Matcher), or "gaps", an engine built for the bounded
+                    gaps of the patterns, whose cost grows linearly with the slop value (see engine.GapMatcher).
+                    The prefilter is not used with "gaps". The matches are the same either way.
         Returns:
             An initialized Idiomatcher
         Raises:
-            ValueError: If slop value is not in the range [1,5]
+            ValueError: If slop value is less than 1
         """
         # Validate slop value
-        if n < 1 or n > 5:   
-            raise ValueError(f"Slop value must be between 1 and 5, got {n}")
-        
-        logger.info(f"Loading an nlp model to use with the matcher ({NLP_MODEL})...")
-        try:
-            # must be done for cases like catch-22
-            nlp = spacy.load(NLP_MODEL)
-        except OSError:
-            logger.info(f"Model '{NLP_MODEL}' not found. Downloading it now...")
-            try:
-                spacy.cli.download(NLP_MODEL)
-                logger.info(f"Successfully downloaded {NLP_MODEL}")
-                nlp = spacy.load(NLP_MODEL)
-            except Exception as e:
-                raise OSError(
-                    f"Failed to download spaCy model '{NLP_MODEL}'. Error: {str(e)}\n"
-                    "Please try downloading it manually by running:\n"
-                    f"python -m spacy download {NLP_MODEL}"
-                )
-        # then add special tokenization cases
-        add_special_tok_cases(nlp)
+        if n < 1:
+            raise ValueError(f"Slop value must be at least 1, got {n}")
+
+        loaded = nlp is None
+        if loaded:
+            nlp = load_nlp()
+        else:
+            add_special_tok_cases(nlp)
 
         logger.info(f"Loading patterns with SLOP={n}...")
-        # Determine which pattern file to load
         import json
-        patterns_path = RESOURCES_DIR / f"slop_{n}.json"
-            
+        # the same template of patterns serves every slop value
+        patterns_path = RESOURCES_DIR / "patterns.json"
+        idioms_path = RESOURCES_DIR / "idioms.bin"
+
         if not patterns_path.exists():
-            raise FileNotFoundError(f"Pattern file not found: {patterns_path}. Make sure to run the build_patterns.py script first.")
+            raise FileNotFoundError(f"Pattern file not found: {patterns_path}. Make sure to run `scripts/update.py patterns` first.")
 
-        with open(RESOURCES_DIR / "idioms.yml") as f:
-            idioms_data = yaml.safe_load(f)
-        idioms = [Idiom(**idiom_data) for idiom_data in idioms_data]
-        matcher = Idiomatcher(nlp, n, idioms)
+        snapshot_path = None
+        if cache:
+            # the resources are only hashed to find the snapshot
+            snapshot_path = CACHE_DIR / f"slop_{n}-{fingerprint([idioms_path, patterns_path], nlp, n=n, compiled=compiled)}.msgpack"
+        if snapshot_path is not None and snapshot_path.exists():
+            logger.info(f"Restoring the matcher from {snapshot_path}...")
+            matcher = Idiomatcher.from_disk(snapshot_path, nlp, prefilter=prefilter, engine=engine)
+            if prune and loaded:
+                matcher.prune()
+            return matcher
+
+        matcher = Idiomatcher(nlp, n, IdiomStore.open(idioms_path), compiled=compiled, prefilter=prefilter,
+                              engine=engine)
         with open(patterns_path) as f:
             patterns = json.load(f)
         for idiom, patterns in tqdm(patterns.items(),
                                     desc="adding patterns"):
-            matcher.add(idiom, patterns)
+            matcher.add(idiom, materialize(compile_patterns(patterns) if compiled else patterns, n))
+        if cache:
+            try:
+                matcher.to_disk(snapshot_path)
+            except OSError as e:
+                logger.warning(f"Could not save a snapshot of the matcher to {snapshot_path}: {e}")
+        if prune and loaded:
+            matcher.prune()
         return matcher
-        
-    def __call__(self, doc: Doc, greedy: bool = True) -> list[dict]:
-        matches = super().__call__(doc)
-        results = [
-            {
-                "idiom": self.vocab.strings[token_id],
-                "span": " ".join([token.text for token in doc[start:end]]),
-                "meta": (token_id, start, end),
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the state of the matcher: the slop value, the idioms and all of the patterns added so far.
+        """
+        return srsly.msgpack_dumps({
+            "n": self.n,
+            "compiled": self.compiled,
+            "idioms": self.idioms.to_bytes(),
+            "patterns": {
+                self.vocab.strings[key]: patterns
+                for key, patterns in self._patterns.items()
             }
-            for token_id, start, end in matches
+        })
+
+    @staticmethod
+    def from_bytes(data: bytes, nlp: Language | None = None, prefilter: bool | str = True,
+                   prune: bool = True, engine: str = SPACY) -> 'Idiomatcher':
+        """
+        Restore a matcher serialized with `to_bytes`.
+
+        Args:
+            data: the serialized matcher
+            nlp: the nlp model to use with the matcher. If None, the default one is loaded.
+            prefilter: Whether to evaluate only the patterns whose anchor lemmas appear in a doc, or "trie".
+            prune: Whether to disable the components of the default nlp model that the patterns don't need.
+            engine: What finds the matches: "spacy" or "gaps".
+        Returns:
+            An initialized Idiomatcher
+        """
+        msg = srsly.msgpack_loads(data)
+        loaded = nlp is None
+        nlp = load_nlp() if loaded else nlp
+        if isinstance(msg["idioms"], list):
+            # snapshots saved before the idioms were kept in a store
+            idioms = IdiomStore.from_idioms(Idiom(**idiom_data) for idiom_data in msg["idioms"])
+        else:
+            idioms = IdiomStore(msg["idioms"])
+        # the patterns have already been validated when they were first added
+        matcher = Idiomatcher(nlp, msg["n"], idioms, validate=False, compiled=msg["compiled"],
+                              prefilter=prefilter, engine=engine)
+        for idiom, patterns in msg["patterns"].items():
+            matcher.add(idiom, patterns)
+        if prune and loaded:
+            matcher.prune()
+        return matcher
+
+    def to_disk(self, path: str | Path):
+        """
+        Save the matcher to a file. The file is replaced atomically, so that
+        concurrent workers never read a half-written snapshot.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def from_disk(path: str | Path, nlp: Language | None = None, prefilter: bool | str = True,
+                  prune: bool = True, engine: str = SPACY) -> 'Idiomatcher':
+        """
+        Load a matcher saved with `to_disk`.
+
+        Args:
+            path: the file the matcher was saved to
+            nlp: the nlp model to use with the matcher. If None, the default one is loaded.
+            prefilter: Whether to evaluate only the patterns whose anchor lemmas appear in a doc, or "trie".
+            prune: Whether to disable the components of the default nlp model that the patterns don't need.
+            engine: What finds the matches: "spacy" or "gaps".
+        Returns:
+            An initialized Idiomatcher
+        """
+        return Idiomatcher.from_bytes(Path(path).read_bytes(), nlp, prefilter, prune, engine)
+
+    def idiom(self, lemma: str) -> Idiom:
+        """
+        Look up an idiom by its lemma (e.g. the "idiom" of a match), with its senses, examples and etymology.
+
+        Raises:
+            KeyError: If the matcher has no such idiom
+        """
+        return self.idioms[lemma]
+
+    def add(self, key, patterns, *, on_match=None, greedy=None):
+        super().add(key, patterns, on_match=on_match, greedy=greedy)
+        if on_match is not None or greedy is not None:
+            # callbacks and filters are applied by the matcher as a whole, which sub-matchers can't do
+            self.prefilter = None
+            self.profiler = None
+            self.engine = None
+        if self.prefilter is not None:
+            self.prefilter.add(key, patterns)
+        if self.engine is not None:
+            self.engine.add(key, patterns)
+        self.gate.add(patterns)
+        if self.profiler is not None:
+            self.profiler.add(key, patterns)
+        if self.match_cache is not None:
+            self.match_cache.clear()
+        if self.pruned:
+            # enable the pruned components the new patterns need again
+            needed = required_pipes(patterns)
+            for name in sorted(self.pruned if needed is None else self.pruned & needed):
+                self.nlp.enable_pipe(name)
+                self.pruned.discard(name)
+
+    def remove(self, key):
+        _, patterns = self.get(key, (None, []))
+        super().remove(key)  # raises a ValueError if there is no such key
+        if self.prefilter is not None:
+            self.prefilter.remove(key, patterns)
+        if self.engine is not None:
+            self.engine.remove(key, patterns)
+        self.gate.remove(patterns)
+        if self.profiler is not None:
+            self.profiler.remove(key)
+        if self.match_cache is not None:
+            self.match_cache.clear()
+
+    def prune(self) -> list[str]:
+        """
+        Disable the components of the nlp pipeline that set none of the token attributes the patterns read
+        (see configs.PIPES_BY_ATTR), e.g. the parser and the ner, which take a large share of the time
+        spent tagging a doc. Components that patterns added later need are enabled again as they are added.
+
+        Returns:
+            the names of the components disabled
+        """
+        needed = required_pipes([pattern for patterns in self._patterns.values() for pattern in patterns])
+        if needed is None:
+            return []
+        known = {name for names in PIPES_BY_ATTR.values() for name in names}
+        disabled = [name for name in self.nlp.pipe_names if name in known - needed]
+        for name in disabled:
+            self.nlp.disable_pipe(name)
+        self.pruned.update(disabled)
+        if disabled:
+            logger.info(f"Disabled the components the patterns don't need: {', '.join(disabled)}")
+        return disabled
+
+    def profile(self) -> Profiler:
+        """
+        Start profiling: from now on, each pattern is matched with a sub-matcher of its own, which records
+        how often the pattern is evaluated, how many matches it finds and how long it takes (see profiler.Profiler).
+        The matches are the same, but finding them takes longer. Set `profiler` to None to stop.
+
+        Returns:
+            the profiler, to get a report of the patterns that cost the most from
+        """
+        self.profiler = Profiler(self.vocab)
+        for key, patterns in self._patterns.items():
+            self.profiler.add(self.vocab.strings[key], patterns)
+        return self.profiler
+
+    def cache_matches(self, max_entries: int = 10_000, max_bytes: int = 64 * 2 ** 20) -> MatchCache:
+        """
+        Start caching the matches of the texts matched with match_text / match_texts (and so pipe and amatch),
+        so that a text matched again with the same greedy policy and output is neither tagged nor matched again.
+        The least recently used texts are evicted past max_entries or max_bytes, and the cache is cleared
+        whenever patterns are added or removed (e.g. by add_idioms). Spans are never cached, as they hold on
+        to their docs. Set `match_cache` to None to stop.
+
+        Args:
+            max_entries: the most texts to keep the matches of
+            max_bytes: the most bytes the matches kept may take up
+        Returns:
+            the cache, to get its hits, misses and evictions from (see cache.MatchCache.stats)
+        """
+        self.match_cache = MatchCache(max_entries, max_bytes)
+        return self.match_cache
+
+    def find_matches(self, doc: Doc, within_sentences: bool = False) -> list[tuple[int, int, int]]:
+        """
+        Find the (match_id, start, end) triples of all the idioms in a doc,
+        sorted by their positions so that the order does not depend on how they were found.
+
+        Args:
+            doc: the doc to match
+            within_sentences: whether to match each sentence of the doc on its own (see windows.sentence_bounds),
+                              so that no match spans two sentences, and no partial match is carried on into the next
+                              one. The offsets are still those of the doc.
+        """
+        if within_sentences:
+            bounds = sentence_bounds(doc)
+            if len(bounds) > 1 and self.profiler is None and self.engine is not None:
+                # the engine carries no partial match on past the tokens it can reach, so it gains nothing
+                # from a call per sentence: it matches the doc once, and the matches across sentences are dropped
+                sentence = np.zeros(len(doc), dtype=np.int32)
+                sentence[[start for start, _ in bounds[1:]]] = 1
+                sentence = np.cumsum(sentence)
+                matches = [match for match in self.engine(doc) if sentence[match[1]] == sentence[match[2] - 1]]
+                return sorted(matches, key=lambda match: (match[1], match[2], match[0]))
+            if len(bounds) > 1:
+                matches = [
+                    (match_id, sent_start + start, sent_start + end)
+                    for sent_start, sent_end in bounds
+                    for match_id, start, end in self.match_doclike(doc[sent_start:sent_end])
+                ]
+                return sorted(matches, key=lambda match: (match[1], match[2], match[0]))
+        return sorted(self.match_doclike(doc), key=lambda match: (match[1], match[2], match[0]))
+
+    def match_doclike(self, doclike: Doc | Span) -> list[tuple[int, int, int]]:
+        """The (match_id, start, end) triples of a doc or a span, in no particular order, relative to the span."""
+        if self.profiler is not None:
+            return self.profiler(doclike)
+        if self.engine is not None:
+            return self.engine(doclike)
+        if self.prefilter is not None:
+            return self.prefilter(doclike)
+        return super().__call__(doclike)
+
+    def __call__(self, doc: Doc, greedy: bool | str = True, output: str = DICTS,
+                 within_sentences: bool = False) -> list[dict] | list[Span] | np.ndarray:
+        """
+        Match the idioms in a doc.
+
+        Args:
+            doc: the doc to match
+            greedy: how to resolve the matches that overlap (see resolvers.resolve). True keeps only the longest
+                    of the matches that contain one another, False keeps them all, and "leftmost-longest" keeps
+                    non-overlapping matches only.
+            output: what to return the matches as: "dicts", "spans", or "array" (see OUTPUTS).
+                    "array" builds no Python object per match, which suits callers that only need the offsets.
+            within_sentences: whether to only match within sentences (see find_matches). With large slop values,
+                              this saves following the wildcards of partial matches past the end of their sentence.
+        Returns:
+            the matches, in the given output
+        """
+        if output == ARRAY:
+            return match_array(doc, resolve(self.find_matches(doc, within_sentences), greedy))
+        return list(self.iter_matches(doc, greedy, output, within_sentences))
+
+    def iter_matches(self, doc: Doc, greedy: bool | str = True, output: str = DICTS,
+                     within_sentences: bool = False) -> Iterator[dict | Span]:
+        """
+        Like __call__, but yield the matches one at a time, building each only as it is consumed.
+
+        Args:
+            doc: the doc to match
+            greedy: how to resolve the matches that overlap, as in __call__
+            output: "dicts" or "spans"
+            within_sentences: whether to only match within sentences, as in __call__
+        Returns:
+            the matches, in the given output
+        """
+        if output not in (DICTS, SPANS):
+            raise ValueError(f"Can't iterate over matches as {output}. Must be one of {DICTS}, {SPANS}")
+        for token_id, start, end in resolve(self.find_matches(doc, within_sentences), greedy):
+            if output == SPANS:
+                if doc.vocab is not self.vocab:
+                    # a doc tagged upstream, whose vocab has yet to see the lemmas of the idioms
+                    doc.vocab.strings.add(self.vocab.strings[token_id])
+                yield Span(doc, start, end, label=token_id)
+            else:
+                yield {
+                    "idiom": self.vocab.strings[token_id],
+                    "span": " ".join([token.text for token in doc[start:end]]),
+                    "meta": (token_id, start, end),
+                }
+
+    def match_text(self, text: str, greedy: bool | str = True, output: str = DICTS,
+                   within_sentences: bool = False) -> list[dict] | list[Span] | np.ndarray:
+        """
+        Match the idioms in a raw text. The nlp pipeline only runs on the text if the tokens
+        some idiom requires are all in it (see prefilter.Gate), so texts without any idiom cost
+        no more than tokenizing them.
+
+        Args:
+            text: the text to match
+            greedy: how to resolve the matches that overlap, as in __call__
+            output: what to return the matches as, as in __call__
+            within_sentences: whether to only match within sentences, as in __call__
+        Returns:
+            the matches, as returned by __call__
+        """
+        cache = self.match_cache if output != SPANS else None
+        if cache is not None:
+            key, generation = cache.key(text, self.n, greedy, output, within_sentences), cache.generation
+            matches = cache.get(key)
+            if matches is not None:
+                return matches
+        matches = self(self.nlp(text), greedy, output, within_sentences) if self.gate(text) else no_matches(output)
+        if cache is not None:
+            cache.put(key, matches, generation)
+        return matches
+
+    def match_tokens(self, words: list[str], lemmas: list[str], tags: list[str], pos: list[str],
+                     spaces: list[bool] | None = None, sent_starts: list[bool] | None = None,
+                     greedy: bool | str = True, output: str = DICTS,
+                     within_sentences: bool = False) -> list[dict] | list[Span] | np.ndarray:
+        """
+        Match the idioms in a text tokenized and tagged upstream (e.g. by a pipeline of your own), without running
+        the nlp pipeline on it again. The annotations are set on a Doc as they are, so they should be those the
+        patterns were built with: lemmas as spaCy's English lemmatizer would have them, Penn Treebank tags and
+        Universal POS tags, over tokens split as spaCy's English tokenizer would split them.
+
+        Args:
+            words: the tokens of the text
+            lemmas: the lemma of each token
+            tags: the fine-grained tag of each token (e.g. "PRP$")
+            pos: the coarse-grained tag of each token (e.g. "PRON")
+            spaces: whether each token is followed by a space. Defaults to all of them
+            sent_starts: whether each token starts a sentence, for within_sentences
+            greedy: how to resolve the matches that overlap, as in __call__
+            output: what to return the matches as, as in __call__
+            within_sentences: whether to only match within sentences, as in __call__
+        Returns:
+            the matches, as returned by __call__
+        Raises:
+            ValueError: If the annotations aren't one per token, or a POS tag isn't a Universal POS tag
+        """
+        if not len(words) == len(lemmas) == len(tags) == len(pos):
+            raise ValueError(f"Expected one annotation per token, got {len(words)} words, {len(lemmas)} lemmas, "
+                             f"{len(tags)} tags and {len(pos)} POS tags")
+        doc = Doc(self.vocab, words=words, spaces=spaces, lemmas=lemmas, tags=tags, pos=pos, sent_starts=sent_starts)
+        return self(doc, greedy, output, within_sentences)
+
+    def match_long(self, text: str | Iterable[str], greedy: bool | str = True, window: int = 1000,
+                   overlap: int | None = None, batch_size: int = 8, output: str = DICTS,
+                   within_sentences: bool = False) -> list[dict] | np.ndarray:
+        """
+        Match the idioms in a text too long to tag as a single doc (e.g. a whole book), a window at a time.
+        The windows are aligned to sentences (see windows.windows), and each carries on past the sentences it owns
+        for the overlap, so that a match is found in the window that owns the sentence it starts in, and only there.
+        Only batch_size windows are tagged at a time, so the memory it takes doesn't grow with the text.
+
+        Args:
+            text: the text, or a stream of it in chunks of any size (e.g. an open file)
+            greedy: how to resolve the matches that overlap, as in __call__
+            window: the least number of words each window owns
+            overlap: the least number of words each window carries on with. Defaults to the most tokens
+                     any pattern can match (see builders.reach), which is all it takes to find every match
+            batch_size: the number of windows to tag with nlp.pipe at a time
+            output: "dicts", with the token offsets of the matches in the whole text in their "meta",
+                    or "array", with their character offsets in the whole text too
+            within_sentences: whether to only match within sentences, as in __call__
+        Returns:
+            the matches, as returned by __call__
+        Raises:
+            ValueError: If overlap is None and some pattern can match any number of tokens
+        """
+        if output not in (DICTS, ARRAY):
+            raise ValueError(f"Can't match a long text as {output}. Must be one of {DICTS}, {ARRAY}")
+        if overlap is None:
+            reaches = [reach(pattern) for patterns in self._patterns.values() for pattern in patterns]
+            if None in reaches:
+                raise ValueError("Some pattern can match any number of tokens. Pass the overlap to match with")
+            overlap = max(reaches, default=0)
+
+        def passed() -> Iterator[tuple[str, tuple[int, int, int]]]:
+            base = 0  # the index of the first token of the window in the whole text
+            chunks = [text] if isinstance(text, str) else text
+            for offset, window_text, own in windows(chunks, window, overlap, self.nlp.tokenizer):
+                # the sentences end where tokens end, so the tokens the window owns tokenize the same on their own
+                owned = len(self.nlp.tokenizer(window_text[:own]))
+                if self.gate(window_text):
+                    yield window_text, (offset, owned, base)
+                base += owned
+
+        found = {}  # (match_id, start, end) in the whole text -> the span, and its character offsets in the text
+        for doc, (offset, owned, base) in self.nlp.pipe(passed(), as_tuples=True, batch_size=batch_size):
+            for match_id, start, end in self.find_matches(doc, within_sentences):
+                if start < owned:
+                    span = doc[start:end]
+                    found[(match_id, base + start, base + end)] = (
+                        " ".join([token.text for token in span]),
+                        offset + span.start_char,
+                        offset + span.end_char,
+                    )
+        matches = resolve(sorted(found, key=lambda match: (match[1], match[2], match[0])), greedy)
+        if output == ARRAY:
+            array = np.zeros(len(matches), dtype=MATCH_DTYPE)
+            for i, match in enumerate(matches):
+                _, start_char, end_char = found[match]
+                array[i] = (*match, start_char, end_char)
+            return array
+        return [
+            {"idiom": self.vocab.strings[match[0]], "span": found[match][0], "meta": match}
+            for match in matches
         ]
-        
-        if greedy and results:
-            # Sort matches by span length (descending)
-            # This prioritizes longer matches, which is what we want for greedy matching
-            results.sort(key=lambda x: (x['meta'][2] - x['meta'][1]), reverse=True)
-            # Keep track of non-contained matches
-            new = []
-            # Add the longest match first
-            new.append(results[0])
-            # For each remaining match, check if it's contained in any accepted match
-            for match in results[1:]:
-                start, end = match['meta'][1], match['meta'][2]
-                is_contained = any(
-                    start >= f_match['meta'][1] and end <= f_match['meta'][2]
-                    for f_match in new
-                )
-                if not is_contained:
-                    new.append(match)
-            return new
+
+    def match_texts(self, texts: list[str], greedy: bool | str = True, batch_size: int = 256,
+                    output: str = DICTS, within_sentences: bool = False) -> list[list[dict] | list[Span] | np.ndarray]:
+        """
+        Like match_text, but for a batch of texts, which are tagged together with nlp.pipe.
+        """
+        cache = self.match_cache if output != SPANS else None
+        if cache is None:
+            results = [None for _ in texts]
+        else:
+            generation = cache.generation
+            keys = [cache.key(text, self.n, greedy, output, within_sentences) for text in texts]
+            results = [cache.get(key) for key in keys]
+        missed = [i for i, matches in enumerate(results) if matches is None]
+        for i in missed:
+            results[i] = no_matches(output)
+        passed = [i for i in missed if self.gate(texts[i])]
+        docs = self.nlp.pipe([texts[i] for i in passed], batch_size=batch_size)
+        for i, doc in zip(passed, docs):
+            results[i] = self(doc, greedy, output, within_sentences)
+        if cache is not None:
+            for i in missed:
+                cache.put(keys[i], results[i], generation)
         return results
-        
 
-    def add_idioms(self, idioms: list[dict]):
+    def worker_args(self) -> tuple[bytes, bool | str, bool, str]:
+        """What a worker process restores its own copy of the matcher from (see _init_worker)."""
+        prefilter = TRIE if isinstance(self.prefilter, PatternTrie) else self.prefilter is not None
+        return self.to_bytes(), prefilter, bool(self.pruned), GAPS if self.engine is not None else SPACY
+
+    def pipe(self, texts: Iterable[str | tuple[str, Any]], greedy: bool | str = True,
+             batch_size: int = 256, n_process: int = 1, output: str = DICTS,
+             within_sentences: bool = False) -> Iterator[tuple[Any, Any]]:
+        """
+        Match a stream of texts in batches, optionally across worker processes.
+        The texts are consumed lazily and at most a few batches per process are in flight,
+        so memory stays bounded however long the stream is.
+
+        Args:
+            texts: texts, or (text, context) tuples
+            greedy: how to resolve the matches that overlap, as in __call__
+            batch_size: the number of texts to tag with nlp.pipe at a time
+            n_process: the number of worker processes. Each worker restores its own copy of the matcher.
+            output: what to return the matches as, as in __call__. Spans can't be sent back from the workers
+                    without their docs, so "spans" requires n_process=1.
+            within_sentences: whether to only match within sentences, as in __call__
+        Returns:
+            (context, matches) tuples in the order of the texts, where the context of a plain text is the text itself
+        """
+        items = (
+            (item, item) if isinstance(item, str) else item
+            for item in texts
+        )
+        batches = iter(lambda: list(islice(items, batch_size)), [])
+        if n_process == 1:
+            for batch in batches:
+                contexts = [context for _, context in batch]
+                yield from zip(contexts, self.match_texts([text for text, _ in batch], greedy, batch_size, output,
+                                                          within_sentences))
+            return
+        if output == SPANS:
+            raise ValueError("Spans can't be returned from worker processes. Use n_process=1, or output=\"array\"")
+        # the workers have no cache of their own, so the texts are looked up before they are sent (as in amatch)
+        cache = self.match_cache
+
+        def done(contexts: list, results: list, keys: list, generation: int, future) -> Iterator[tuple[Any, Any]]:
+            # the workers matched the texts that weren't cached, in order
+            matched = iter(future.result() if future is not None else ())
+            for context, matches, key in zip(contexts, results, keys):
+                if matches is None:
+                    matches = next(matched)
+                    if cache is not None:
+                        cache.put(key, matches, generation)
+                yield context, matches
+
+        with ProcessPoolExecutor(n_process, initializer=_init_worker,
+                                 initargs=self.worker_args()) as executor:
+            # (contexts, cached matches, keys, generation, future) of the batches in flight
+            in_flight = deque()
+            for batch in batches:
+                texts = [text for text, _ in batch]
+                if cache is None:
+                    generation, keys, results = 0, [None for _ in texts], [None for _ in texts]
+                else:
+                    generation = cache.generation
+                    keys = [cache.key(text, self.n, greedy, output, within_sentences) for text in texts]
+                    results = [cache.get(key) for key in keys]
+                missed = [text for text, matches in zip(texts, results) if matches is None]
+                future = executor.submit(_match_batch, missed, greedy, output, within_sentences) if missed else None
+                in_flight.append(([context for _, context in batch], results, keys, generation, future))
+                if len(in_flight) >= 2 * n_process:
+                    yield from done(*in_flight.popleft())
+            while in_flight:
+                yield from done(*in_flight.popleft())
+
+    def match_docbin(self, docs: DocBin | bytes | str | Path, greedy: bool | str = True, output: str = DICTS,
+                     within_sentences: bool = False) -> Iterator[tuple[Doc, Any]]:
+        """
+        Match the docs of a DocBin (e.g. those an upstream spaCy pipeline serialized with DocBin.to_bytes / to_disk)
+        with the annotations they were saved with, without running the nlp pipeline on them again.
+        The docs are restored onto the vocab of the matcher one at a time, so memory stays bounded
+        however many docs the DocBin holds. They must have been saved with LEMMA, TAG and POS (as DocBin does
+        by default), and should be annotated as match_tokens describes.
+
+        Args:
+            docs: the DocBin, its bytes, or the path it was saved to
+            greedy: how to resolve the matches that overlap, as in __call__
+            output: what to return the matches as, as in __call__
+            within_sentences: whether to only match within sentences, as in __call__.
+                              The sentences the docs were saved with (as SENT_START) are used, if any.
+        Returns:
+            (doc, matches) tuples in the order of the docs
+        """
+        if isinstance(docs, bytes):
+            docs = DocBin().from_bytes(docs)
+        elif not isinstance(docs, DocBin):
+            docs = DocBin().from_disk(docs)
+        for doc in docs.get_docs(self.vocab):
+            yield doc, self(doc, greedy, output, within_sentences)
+
+    def serve(self, n_process: int = 1, n_threads: int = 1, batch_size: int = 64, max_wait: float = 0.0,
+              max_pending: int = 1024) -> Batcher:
+        """
+        Set up how amatch / apipe match texts off the event loop: the texts awaited at the same time
+        are coalesced into batches, which are tagged together with nlp.pipe in a pool of threads or processes.
+        Calling amatch without serving first serves with the defaults.
+
+        Args:
+            n_process: the number of worker processes. Each worker restores its own copy of the matcher.
+                       With 1, the batches are matched in threads of this process instead.
+            n_threads: the number of threads, if n_process is 1. The matcher is shared by the threads,
+                       so the batches only overlap where the pipeline releases the GIL.
+            batch_size: the most texts to match at a time
+            max_wait: how long (in seconds) to wait for more texts before matching a batch that isn't full.
+                      The texts that arrive while the pool is busy are coalesced either way.
+            max_pending: the most texts to queue before amatch waits for room, to push back on the callers
+        Returns:
+            the batcher, to get stats on how much the texts were coalesced from
+        """
+        if self.batcher is not None:
+            self.batcher.close()
+        if n_process > 1:
+            executor = ProcessPoolExecutor(n_process, initializer=_init_worker, initargs=self.worker_args())
+            run, workers = _match_batch, n_process
+        else:
+            # the indexes the threads share are otherwise built on first use, by whichever thread matches first
+            # (they are locked while they flush, so the others wait for it)
+            if self.prefilter is not None:
+                self.prefilter.flush()
+            self.gate.flush()
+            executor = ThreadPoolExecutor(n_threads, thread_name_prefix="idiomatch")
+            run, workers = (
+                lambda texts, greedy, output, within_sentences:
+                self.match_texts(texts, greedy, batch_size, output, within_sentences)
+            ), n_threads
+        self.batcher = Batcher(run, executor, batch_size, max_wait, max_pending, max_batches=workers)
+        return self.batcher
+
+    async def amatch(self, text: str, greedy: bool | str = True, output: str = DICTS,
+                     within_sentences: bool = False) -> list[dict] | list[Span] | np.ndarray:
+        """
+        Like match_text, but awaitable: the text is matched in the pool set up by serve(), along with
+        the other texts awaited at the same time, so the event loop is never blocked on the pipeline.
+
+        Args:
+            text: the text to match
+            greedy: how to resolve the matches that overlap, as in __call__
+            output: what to return the matches as, as in __call__. Spans can't be sent back from worker processes.
+            within_sentences: whether to only match within sentences, as in __call__
+        Returns:
+            the matches, as returned by __call__
+        """
+        if self.batcher is None:
+            self.serve()
+        if not isinstance(self.batcher.executor, ProcessPoolExecutor):
+            # the threads match with this matcher, and so with its cache (see match_texts)
+            return await self.batcher.submit(text, greedy, output, within_sentences)
+        if output == SPANS:
+            raise ValueError("Spans can't be returned from worker processes. Use n_process=1, or output=\"array\"")
+        # the workers have no cache of their own, so the texts are looked up before they are queued
+        cache = self.match_cache
+        if cache is None:
+            return await self.batcher.submit(text, greedy, output, within_sentences)
+        key, generation = cache.key(text, self.n, greedy, output, within_sentences), cache.generation
+        matches = cache.get(key)
+        if matches is None:
+            matches = await self.batcher.submit(text, greedy, output, within_sentences)
+            cache.put(key, matches, generation)
+        return matches
+
+    async def apipe(self, texts: AsyncIterable[str | tuple[str, Any]] | Iterable[str | tuple[str, Any]],
+                    greedy: bool | str = True, output: str = DICTS,
+                    within_sentences: bool = False) -> AsyncIterator[tuple[Any, Any]]:
+        """
+        Like pipe, but for an async stream of texts (e.g. the messages of a queue), matched with amatch.
+        At most max_pending texts (see serve()) are in flight, so memory stays bounded however long the stream is.
+
+        Args:
+            texts: texts, or (text, context) tuples
+            greedy: how to resolve the matches that overlap, as in __call__
+            output: what to return the matches as, as in __call__
+            within_sentences: whether to only match within sentences, as in __call__
+        Returns:
+            (context, matches) tuples in the order of the texts, where the context of a plain text is the text itself
+        """
+        if self.batcher is None:
+            self.serve()
+        if not isinstance(texts, AsyncIterable):
+            texts = _aiter(texts)
+        in_flight = deque()  # (context, task) of the texts being matched
+        try:
+            async for item in texts:
+                text, context = (item, item) if isinstance(item, str) else item
+                in_flight.append((context, asyncio.ensure_future(self.amatch(text, greedy, output, within_sentences))))
+                if len(in_flight) >= self.batcher.max_pending:
+                    context, task = in_flight.popleft()
+                    yield context, await task
+            while in_flight:
+                context, task = in_flight.popleft()
+                yield context, await task
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+
+    def add_idioms(self, idioms: list[dict], batch_size: int = 256):
         """
         Build patterns for the given idiom and add them into the matcher.
-        
+
         Args:
             idioms: List of idiom dictionaries to add
-            
+            batch_size: the number of lemmas to tag with nlp.pipe at a time when building their patterns
+
         Raises:
-            ValueError: If any of the idioms already exist in the matcher
+            ValueError: If any of the idioms already exist in the matcher, or appear more than once in idioms
         """
-        new_idioms = []
-        duplicates = []
+        new_idioms: dict[str, Idiom] = {}
+        duplicates, repeated = [], []
         for idiom_dict in idioms:
             idiom = Idiom(**idiom_dict)
-            # Check if idiom already exists by comparing lemmas
-            if any(existing.lemma == idiom.lemma for existing in self.idioms):
+            # Check if idiom already exists by looking its lemma up in the index of the store
+            if idiom.lemma in self.idioms:
                 duplicates.append(idiom.lemma)
-                continue
-            new_idioms.append(idiom)
+            elif idiom.lemma in new_idioms:
+                repeated.append(idiom.lemma)
+            else:
+                new_idioms[idiom.lemma] = idiom
 
         if duplicates:
             raise ValueError(f"The following idioms already exist in the matcher: {', '.join(duplicates)}")
+        if repeated:
+            raise ValueError(f"The following idioms appear more than once: {', '.join(dict.fromkeys(repeated))}")
 
         # add new idioms to the matcher
-        self.idioms.extend(new_idioms)
+        self.idioms.extend(new_idioms.values())
         # build patterns and add them to the matcher
-        patterns = build([idiom.lemma for idiom in new_idioms], self.nlp, self.n)
+        patterns = build(list(new_idioms), self.nlp, self.n, batch_size)
         for idiom, patterns in tqdm(patterns.items(),
                                     desc="adding patterns"):
-            super().add(idiom, patterns)
+            self.add(idiom, compile_patterns(patterns) if self.compiled else patterns)
+
+    def remove_idioms(self, lemmas: list[str]):
+        """
+        Remove the given idioms and their patterns from the matcher.
+
+        Args:
+            lemmas: the lemmas of the idioms to remove
+
+        Raises:
+            ValueError: If any of the idioms don't exist in the matcher
+        """
+        missing = [lemma for lemma in lemmas if lemma not in self.idioms]
+        if missing:
+            raise ValueError(f"The following idioms don't exist in the matcher: {', '.join(missing)}")
+        for lemma in tqdm(lemmas, desc="removing patterns"):
+            if lemma in self:
+                self.remove(lemma)
+        self.idioms.remove(lemmas)
 
@@ -0,0 +1,330 @@
+"""
+An inverted index from the anchor of each pattern to the pattern, where the anchor is the most
+selective token a pattern requires. A doc can only match the patterns whose anchors it contains,
+so only those need evaluating.
+The same idea applies to raw text, before it is even tagged: see `Gate`.
+"""
+import threading
+from collections import Counter, defaultdict
+from spacy import Language
+from spacy.matcher.matcher import Matcher
+from spacy.strings import get_string_id
+from spacy.tokens import Doc, Span
+from spacy.vocab import Vocab
+from .builders import literal
+from .configs import LEMMA_EXTENSION
+
+# the two kinds of features a doc is indexed by
+LEMMA = "LEMMA"  # lowercased lemma of a token
+LOWER = "LOWER"  # lowercased text of a token
+
+
+def feature(spec: dict) -> tuple[str, str] | None:
+    """
+    The feature a token must have for the spec to match it, if the spec is a required literal.
+    e.g. {"_": {"idiomatch_lemma": "take"}} -> ("LEMMA", "take")
+         {"TEXT": {"REGEX": "(?i)^Catch$"}} -> ("LOWER", "catch")
+         {"TAG": "PRP$"} -> None (not a literal)
+         {"TEXT": "-", "OP": "?"} -> None (may match zero tokens)
+    Case-sensitive literals are mapped to their lowercased features, which can only over-select.
+    """
+    if spec.get("OP", "1") not in ("1", "+"):
+        return None
+    for attr, value in spec.items():
+        if attr == "_" and isinstance(value, dict) and isinstance(value.get(LEMMA_EXTENSION), str):
+            return LEMMA, value[LEMMA_EXTENSION]
+        if attr in ("LEMMA", "TEXT", "ORTH", "LOWER"):
+            # a regex only counts if it is a plain literal
+            value = literal(value) if isinstance(value, dict) else value
+            if isinstance(value, str):
+                return (LEMMA if attr == "LEMMA" else LOWER), value.lower()
+    return None
+
+
+def features(doclike: Doc | Span) -> set[tuple[str, str]]:
+    """All the features of the tokens in a doc."""
+    return {
+        (kind, value)
+        for token in doclike
+        for kind, value in ((LEMMA, token.lemma_.lower()), (LOWER, token.lower_))
+    }
+
+
+class Prefilter:
+    """
+    Buckets the patterns of a matcher by their anchors, with a sub-matcher per bucket.
+    Evaluating only the buckets of the features a doc has gives exactly the matches
+    of evaluating all the patterns.
+    """
+
+    def __init__(self, vocab: Vocab):
+        self.vocab = vocab
+        # anchor -> the sub-matcher of the patterns anchored on it
+        self.buckets: dict[tuple[str, str], Matcher] = {}
+        # the patterns without any required literal, which must always be evaluated
+        self.unanchored = Matcher(vocab, validate=False)
+        # feature -> number of patterns that require it
+        self.frequencies: Counter = Counter()
+        self.sizes: Counter = Counter()  # anchor -> number of patterns in its bucket
+        self.anchors: dict[str, Counter] = defaultdict(Counter)  # key -> anchor -> number of its patterns there
+        self.pending: list[tuple[str, list[dict]]] = []
+        # held while flushing, so that the threads sharing the index flush the pending patterns once
+        self.lock = threading.Lock()
+        self.docs = 0  # number of docs matched so far
+        self.evaluated = 0  # number of patterns evaluated so far
+        self.candidates = 0  # number of buckets evaluated so far
+
+    def __len__(self) -> int:
+        """The number of patterns in the index."""
+        return sum(self.sizes.values()) + len(self.pending)
+
+    def add(self, key: str, patterns: list[list[dict]]):
+        """
+        Add patterns under a key. Anchors are assigned lazily, so that patterns added
+        in bulk are anchored on the frequencies of the whole batch.
+        """
+        for pattern in patterns:
+            self.frequencies.update({feature(spec) for spec in pattern} - {None})
+            self.pending.append((key, pattern))
+
+    def flush(self):
+        """Assign the pending patterns to the buckets of their anchors."""
+        with self.lock:
+            for key, pattern in self.pending:
+                required = {feature(spec) for spec in pattern} - {None}
+                if not required:
+                    self.unanchored.add(key, [pattern])
+                    self.sizes[None] += 1
+                    self.anchors[key][None] += 1
+                    continue
+                # the rarest feature, and the longest one on ties
+                anchor = min(required, key=lambda f: (self.frequencies[f], -len(f[1]), f))
+                if anchor not in self.buckets:
+                    self.buckets[anchor] = Matcher(self.vocab, validate=False)
+                self.buckets[anchor].add(key, [pattern])
+                self.sizes[anchor] += 1
+                self.anchors[key][anchor] += 1
+            self.pending = []
+
+    def remove(self, key: str, patterns: list[list[dict]]):
+        """
+        Remove the patterns of a key, from the buckets they were assigned to.
+
+        Args:
+            key: the key the patterns were added under
+            patterns: all the patterns of the key, as they were added
+        """
+        if self.pending:
+            self.flush()
+        for pattern in patterns:
+            self.frequencies.subtract({feature(spec) for spec in pattern} - {None})
+        for anchor, size in self.anchors.pop(key, Counter()).items():
+            bucket = self.unanchored if anchor is None else self.buckets[anchor]
+            bucket.remove(key)
+            self.sizes[anchor] -= size
+            if anchor is not None and not self.sizes[anchor]:
+                del self.buckets[anchor]
+                del self.sizes[anchor]
+
+    def __call__(self, doclike: Doc | Span) -> list[tuple[int, int, int]]:
+        """
+        Match the doc against the buckets of its features only.
+
+        Returns:
+            (match_id, start, end) triples, as the Matcher would return them
+        """
+        if self.pending:
+            self.flush()
+        anchors = [anchor for anchor in features(doclike) if anchor in self.buckets]
+        matches = set()
+        for anchor in anchors:
+            matches.update(self.buckets[anchor](doclike))
+        if self.sizes[None]:
+            anchors.append(None)
+            matches.update(self.unanchored(doclike))
+        self.docs += 1
+        self.candidates += len(anchors)
+        self.evaluated += sum(self.sizes[anchor] for anchor in anchors)
+        return list(matches)
+
+    def stats(self) -> dict:
+        """
+        How much the index has pruned so far.
+
+        Returns:
+            docs: the number of docs matched
+            patterns: the number of patterns in the index
+            buckets: the number of anchors in the index
+            evaluated_per_doc: the average number of patterns evaluated per doc
+            candidates_per_doc: the average number of buckets evaluated per doc
+            pruned: the average fraction of patterns skipped per doc
+        """
+        patterns = len(self)
+        evaluated_per_doc = self.evaluated / self.docs if self.docs else 0.0
+        return {
+            "docs": self.docs,
+            "patterns": patterns,
+            "buckets": len(self.buckets),
+            "evaluated_per_doc": evaluated_per_doc,
+            "candidates_per_doc": self.candidates / self.docs if self.docs else 0.0,
+            "pruned": 1 - evaluated_per_doc / patterns if patterns and self.docs else 0.0,
+        }
+
+
+class Gate:
+    """
+    A cheap check on raw text that runs the tokenizer only: whether, for some pattern, every literal
+    the pattern requires appears in the text in a surface form that could be lemmatized to it.
+    The surface forms come from inverting the tables of the lemmatizer (and the lemmas set by the
+    attribute ruler), so they can over-generate but never miss a form. If a text doesn't pass,
+    the pipeline can't produce a doc that matches any pattern.
+    """
+
+    def __init__(self, nlp: Language):
+        self.nlp = nlp
+        self.pending: list[list[dict]] = []
+        self.lock = threading.Lock()  # held while flushing, as in Prefilter
+        self.rules: set[tuple[str, str]] | None = None  # the suffix rules of the lemmatizer, built lazily
+        # lemma -> the hashes of the surface forms it's listed for (lookup tables only keep the hashes)
+        self.forms: dict[str, set[int]] = defaultdict(set)
+        self.unconstrained: set[str] = set()  # lemmas any token could be given
+        self.frequencies: Counter = Counter()  # feature -> number of patterns that require it
+        # the rarest feature of each pattern -> the sets of features the patterns anchored on it require
+        self.anchored: dict[tuple[str, str], list[frozenset]] = defaultdict(list)
+        self.surface: dict[int, frozenset[tuple[str, str]]] = {}  # hash of a surface form -> features
+        self.always = False  # whether some pattern requires no literal at all
+        self.passed = 0  # number of texts that passed so far
+        self.skipped = 0  # number of texts that didn't
+
+    def add(self, patterns: list[list[dict]]):
+        for pattern in patterns:
+            self.frequencies.update({feature(spec) for spec in pattern} - {None})
+            self.pending.append(pattern)
+
+    def remove(self, patterns: list[list[dict]]):
+        """
+        Stop requiring the literals of the patterns. The surface forms indexed for them are kept,
+        which can only let more texts through.
+        """
+        if self.pending or self.rules is None:
+            self.flush()
+        for pattern in patterns:
+            self.frequencies.subtract({feature(spec) for spec in pattern} - {None})
+            required = self.required(pattern)
+            for anchor in required:
+                if required in self.anchored.get(anchor, ()):
+                    self.anchored[anchor].remove(required)
+                    break
+
+    def load_tables(self):
+        """Invert the tables that the lemmatizer and the attribute ruler assign lemmas with."""
+        rules = set()
+        if "lemmatizer" in self.nlp.pipe_names:
+            lookups = self.nlp.get_pipe("lemmatizer").lookups
+            if lookups.has_table("lemma_rules"):
+                for table in lookups.get_table("lemma_rules").values():
+                    rules.update((old, new) for old, new in table)
+            if lookups.has_table("lemma_exc"):
+                for exc in lookups.get_table("lemma_exc").values():
+                    for form, lemmas in exc.items():
+                        for lemma in lemmas:
+                            self.forms[lemma.lower()].add(get_string_id(form))
+            if lookups.has_table("lemma_lookup"):
+                # the lookup table is keyed by case-sensitive forms
+                for form, lemma in lookups.get_table("lemma_lookup").items():
+                    self.forms[lemma.lower()].add(form)
+            if not any(lookups.has_table(name) for name in ("lemma_rules", "lemma_exc", "lemma_lookup")):
+                # e.g. a trainable lemmatizer: any token could be given any lemma
+                self.always = True
+        if "attribute_ruler" in self.nlp.pipe_names:
+            for rule in self.nlp.get_pipe("attribute_ruler").patterns:
+                lemma = rule["attrs"].get("LEMMA")
+                if lemma is None:
+                    continue
+                for pattern in rule["patterns"]:
+                    texts = [value for attr, value in pattern[rule.get("index", 0)].items()
+                             if attr in ("ORTH", "TEXT", "LOWER") and isinstance(value, str)]
+                    if texts:
+                        self.forms[lemma.lower()].add(get_string_id(texts[0].lower()))
+                    else:
+                        self.unconstrained.add(lemma.lower())
+        self.rules = rules
+
+    def inflect(self, lemma: str) -> set[int]:
+        """The hashes of all the surface forms that could be lemmatized to the given (lowercased) lemma."""
+        forms = {get_string_id(lemma)} | self.forms.get(lemma, set())
+        for old, new in self.rules:
+            # the lemmatizer turns form[:-len(old)] + new into the lemma
+            if lemma.endswith(new):
+                forms.add(get_string_id(lemma[:len(lemma) - len(new)] + old))
+        return forms
+
+    def required(self, pattern: list[dict]) -> frozenset:
+        """The features a text must have some surface form of for the pattern to match it."""
+        return frozenset(
+            (kind, value)
+            for kind, value in {feature(spec) for spec in pattern} - {None}
+            if not (kind == LEMMA and value in self.unconstrained)
+        )
+
+    def flush(self):
+        """Index the pending patterns by the surface forms of the literals they require."""
+        with self.lock:
+            if self.rules is None:
+                self.load_tables()
+            # the features whose surface forms are indexed already
+            indexed = {feature for requireds in self.anchored.values() for required in requireds for feature in required}
+            for pattern in self.pending:
+                required = self.required(pattern)
+                if not required:
+                    self.always = True
+                    continue
+                for kind, value in required - indexed:
+                    for form in (self.inflect(value) if kind == LEMMA else {get_string_id(value)}):
+                        # replaced rather than updated, since other threads may be reading the set
+                        self.surface[form] = self.surface.get(form, frozenset()) | {(kind, value)}
+                indexed |= required
+                anchor = min(required, key=lambda f: (self.frequencies[f], f))
+                self.anchored[anchor].append(required)
+            self.pending = []
+
+    def __call__(self, text: str) -> bool:
+        """
+        Whether the text could contain any of the idioms.
+        """
+        if self.pending or self.rules is None:
+            self.flush()
+        passed = self.always
+        if not passed:
+            satisfied = set()
+            for token in self.nlp.tokenizer(text):
+                satisfied.update(self.surface.get(token.lower, ()))
+                satisfied.update(self.surface.get(token.orth, ()))
+            passed = any(
+                required <= satisfied
+                for anchor in satisfied
+                for required in self.anchored.get(anchor, ())
+            )
+        if passed:
+            self.passed += 1
+        else:
+            self.skipped += 1
+        return passed
+
+    def stats(self) -> dict:
+        """
+        How many texts the gate has let through so far.
+
+        Returns:
+            texts: the number of texts checked
+            passed: the number of texts that had to be run through the pipeline
+            skipped: the number of texts that didn't
+            skip_rate: the fraction of texts that didn't
+        """
+        texts = self.passed + self.skipped
+        return {
+            "texts": texts,
+            "passed": self.passed,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / texts if texts else 0.0,
+        }
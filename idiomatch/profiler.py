@@ -0,0 +1,116 @@
+"""
+Attributes the time spent matching to the patterns it was spent on, so that the patterns
+that cost the most (e.g. the wildcard-heavy openslot ones at high slop values) can be found, e.g.
+    profiler = idiomatcher.profile()
+    for doc in docs:
+        idiomatcher(doc)
+    profiler.report(top=10)  # the ten patterns that took the longest
+"""
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+from spacy.matcher.matcher import Matcher
+from spacy.tokens import Doc, Span
+from spacy.vocab import Vocab
+from .builders import variants
+from .prefilter import feature, features
+
+# what the patterns can be ranked by in a report
+RANKINGS = ("time", "candidates", "matches")
+
+
+class Profiler:
+    """
+    Matches every pattern with a sub-matcher of its own, and only in the docs that have every literal
+    the pattern requires, recording per pattern how often it was evaluated (its candidate hits),
+    how many matches it found and how long it took. The matches are the same as the matcher's.
+    """
+
+    def __init__(self, vocab: Vocab):
+        self.vocab = vocab
+        # (key, variant) -> the sub-matcher of the pattern and what it has cost so far
+        self.patterns: dict[tuple[str, str], dict] = {}
+        self.keys: dict[str, list[tuple[str, str]]] = defaultdict(list)  # key -> the names of its patterns
+        # a literal each pattern requires -> the patterns anchored on it. None for the patterns without any
+        self.anchored: dict[tuple[str, str] | None, list[tuple[str, str]]] = defaultdict(list)
+        self.docs = 0  # number of docs matched so far
+
+    def add(self, key: str, patterns: list[list[dict]]):
+        added = len(self.keys[key])
+        # patterns added to a key that already has some are named by their positions
+        names = [f"pattern_{i}" for i in range(added, added + len(patterns))] if added else variants(key, patterns)
+        for name, pattern in zip(names, patterns):
+            matcher = Matcher(self.vocab, validate=False)
+            matcher.add(key, [pattern])
+            required = frozenset({feature(spec) for spec in pattern} - {None})
+            self.patterns[(key, name)] = {
+                "matcher": matcher,
+                "required": required,
+                "candidates": 0,
+                "matches": 0,
+                "time": 0.0,
+            }
+            self.anchored[min(required) if required else None].append((key, name))
+            self.keys[key].append((key, name))
+
+    def remove(self, key: str):
+        for name in self.keys.pop(key, []):
+            entry = self.patterns.pop(name)
+            self.anchored[min(entry["required"]) if entry["required"] else None].remove(name)
+
+    def __call__(self, doclike: Doc | Span) -> list[tuple[int, int, int]]:
+        """
+        Match the doc against the patterns it has every required literal of, timing each one.
+
+        Returns:
+            (match_id, start, end) triples, as the Matcher would return them
+        """
+        doc_features = features(doclike)
+        matches = set()
+        for anchor in [None, *doc_features]:
+            for name in self.anchored.get(anchor, ()):
+                entry = self.patterns[name]
+                if not entry["required"] <= doc_features:
+                    continue
+                start = time.perf_counter()
+                found = entry["matcher"](doclike)
+                entry["time"] += time.perf_counter() - start
+                entry["candidates"] += 1
+                entry["matches"] += len(found)
+                matches.update(found)
+        self.docs += 1
+        return list(matches)
+
+    def report(self, top: int | None = None, by: str = "time") -> list[dict]:
+        """
+        The patterns ranked by what they have cost so far.
+
+        Args:
+            top: the number of patterns to report. All of them if None.
+            by: what to rank the patterns by: "time", "candidates" or "matches"
+        Returns:
+            a dict per pattern, of its idiom, variant, candidates (the number of docs it was evaluated on),
+            matches, time (in seconds) and time_per_candidate
+        Raises:
+            ValueError: If by is not one of RANKINGS
+        """
+        if by not in RANKINGS:
+            raise ValueError(f"Unknown ranking: {by}. Must be one of {', '.join(RANKINGS)}")
+        rows = [
+            {
+                "idiom": key,
+                "variant": name,
+                "candidates": entry["candidates"],
+                "matches": entry["matches"],
+                "time": entry["time"],
+                "time_per_candidate": entry["time"] / entry["candidates"] if entry["candidates"] else 0.0,
+            }
+            for (key, name), entry in self.patterns.items()
+        ]
+        rows.sort(key=lambda row: row[by], reverse=True)
+        return rows[:top]
+
+    def to_disk(self, path: str | Path, top: int | None = None, by: str = "time"):
+        """Save the report as JSON."""
+        Path(path).write_text(json.dumps({"docs": self.docs, "patterns": self.report(top, by)}, indent=2))
@@ -0,0 +1,60 @@
+"""
+Policies for resolving the matches that overlap one another, as a sweep over the matches
+sorted by their positions: O(n log n) in the number of matches.
+"""
+
+LONGEST = "longest"  # drop the matches contained in a longer one
+LEFTMOST_LONGEST = "leftmost-longest"  # keep non-overlapping matches, preferring the leftmost, then the longest
+ALL = "all"  # keep every match
+POLICIES = (LONGEST, LEFTMOST_LONGEST, ALL)
+
+
+def policy_of(greedy: bool | str) -> str:
+    """
+    The policy a greedy argument stands for: True for LONGEST, False for ALL, or the name of a policy.
+    """
+    if greedy is True:
+        return LONGEST
+    if greedy is False:
+        return ALL
+    if greedy not in POLICIES:
+        raise ValueError(f"Unknown policy: {greedy}. Must be a bool or one of {', '.join(POLICIES)}")
+    return greedy
+
+
+def resolve(matches: list[tuple[int, int, int]], greedy: bool | str = True) -> list[tuple[int, int, int]]:
+    """
+    Resolve the overlapping matches of a doc with a policy.
+
+    Args:
+        matches: (match_id, start, end) triples, sorted by (start, end, match_id)
+        greedy: the policy to resolve the matches with (see policy_of)
+            - LONGEST: keep the matches that no other match contains, ordered from the longest to the shortest.
+              Of the matches over the same span, only the one with the smallest id is kept.
+            - LEFTMOST_LONGEST: from left to right, keep the longest match that starts after the last one kept ends.
+            - ALL: keep all the matches as they are.
+    Returns:
+        the matches kept
+    """
+    policy = policy_of(greedy)
+    if policy == ALL:
+        return list(matches)
+    # a match comes after every match that contains it
+    ordered = sorted(matches, key=lambda match: (match[1], -match[2], match[0]))
+    kept = []
+    if policy == LONGEST:
+        reach = -1  # the furthest end of the matches seen so far
+        for match in ordered:
+            if match[2] > reach:
+                kept.append(match)
+                reach = match[2]
+        # stable, so ties stay in the order they were given in
+        kept.sort(key=lambda match: (match[1], match[2], match[0]))
+        kept.sort(key=lambda match: match[2] - match[1], reverse=True)
+    else:
+        end = -1  # the end of the last match kept
+        for match in ordered:
+            if match[1] >= end:
+                kept.append(match)
+                end = match[2]
+    return kept
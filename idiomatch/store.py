@@ -0,0 +1,123 @@
+"""
+A compact store of the idioms a matcher knows about, which only decodes the lemmas up front.
+Matching needs nothing but the lemmas, so the senses, examples and etymology of an idiom
+are decoded and validated when it is looked up, e.g.
+    store = IdiomStore.open(RESOURCES_DIR / "idioms.bin")
+    "open the floodgates" in store  # True, without decoding anything
+    store["open the floodgates"].senses  # decodes that one idiom
+The layout of the store:
+    MAGIC | the length of the index (8 bytes, little-endian) | the index | the records
+where the index is the minified JSON of [[lemma, start, end], ...], with the offsets of the records,
+and the records are the minified JSON of each idiom, one after the other.
+"""
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Iterable, Iterator
+from ._models._idiom import Idiom
+
+MAGIC = b"IDIOMS01"
+HEADER = struct.Struct("<Q")
+
+
+class IdiomStore:
+    """
+    The idioms of a matcher, keyed by their lemmas. The records stay in the buffer (e.g. a file mapped into memory)
+    until they are looked up. Idioms added after the store is loaded are kept as they are.
+    """
+
+    def __init__(self, buffer: bytes | mmap.mmap = b""):
+        self.buffer = buffer
+        self.offsets: dict[str, tuple[int, int]] = {}  # lemma -> (start, end) of its record in the buffer
+        self.added: dict[str, Idiom] = {}  # lemma -> the idioms added since
+        if not buffer:
+            return
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not an idiom store: the magic bytes don't match")
+        (length,) = HEADER.unpack_from(buffer, len(MAGIC))
+        head = len(MAGIC) + HEADER.size
+        records = head + length
+        for lemma, start, end in json.loads(buffer[head:records]):
+            # the first of the idioms with the same lemma is the one kept
+            self.offsets.setdefault(lemma, (records + start, records + end))
+
+    @staticmethod
+    def open(path: str | Path) -> 'IdiomStore':
+        """
+        Map a store saved with `to_disk` into memory.
+        """
+        with open(path, "rb") as f:
+            return IdiomStore(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @staticmethod
+    def from_idioms(idioms: Iterable[Idiom]) -> 'IdiomStore':
+        store = IdiomStore()
+        store.extend(idioms)
+        return store
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the store. The records of the idioms that have not been looked up are copied as they are.
+        """
+        records = [self.buffer[start:end] for start, end in self.offsets.values()]
+        records += [idiom.model_dump_json().encode() for idiom in self.added.values()]
+        index, offset = [], 0
+        for lemma, record in zip(self.lemmas(), records):
+            index.append([lemma, offset, offset + len(record)])
+            offset += len(record)
+        index = json.dumps(index, separators=(",", ":"), ensure_ascii=False).encode()
+        return b"".join([MAGIC, HEADER.pack(len(index)), index, *records])
+
+    def to_disk(self, path: str | Path):
+        Path(path).write_bytes(self.to_bytes())
+
+    def extend(self, idioms: Iterable[Idiom]):
+        for idiom in idioms:
+            if idiom.lemma not in self:
+                self.added[idiom.lemma] = idiom
+
+    def remove(self, lemmas: Iterable[str]):
+        """
+        Remove idioms by their lemmas. Their records stay in the buffer until the store is serialized again.
+        """
+        for lemma in lemmas:
+            self.offsets.pop(lemma, None)
+            self.added.pop(lemma, None)
+
+    def lemmas(self) -> list[str]:
+        return [*self.offsets, *self.added]
+
+    def __getitem__(self, lemma: str | int | slice) -> Idiom | list[Idiom]:
+        """
+        Look an idiom up by its lemma, or, as in the list of idioms the store replaced, by its position
+        (a slice gives a list of the idioms in it).
+        """
+        if isinstance(lemma, slice):
+            return [self[key] for key in self.lemmas()[lemma]]
+        if isinstance(lemma, int):
+            try:
+                lemma = self.lemmas()[lemma]
+            except IndexError:
+                raise IndexError(f"Idiom index out of range: {lemma}") from None
+        if lemma in self.added:
+            return self.added[lemma]
+        try:
+            start, end = self.offsets[lemma]
+        except KeyError:
+            raise KeyError(f"No such idiom: {lemma}") from None
+        return Idiom.model_validate_json(self.buffer[start:end])
+
+    def __contains__(self, lemma: str | Idiom) -> bool:
+        if isinstance(lemma, Idiom):
+            # as in the list of idioms the store replaced
+            return lemma.lemma in self and self[lemma.lemma] == lemma
+        return lemma in self.offsets or lemma in self.added
+
+    def __len__(self) -> int:
+        return len(self.offsets) + len(self.added)
+
+    def __iter__(self) -> Iterator[Idiom]:
+        """Decode the idioms one at a time, in the order they were stored."""
+        for lemma in self.lemmas():
+            yield self[lemma]
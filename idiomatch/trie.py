@@ -0,0 +1,183 @@
+"""
+A trie of the patterns of a matcher by the literals they start with, so that the literals many patterns
+share (e.g. the "take" of "take a stand", "take the plunge", "take someone's word for it") are checked
+once per token rather than once per pattern, and the rest of a pattern is only evaluated where its
+prefix matched (and, as with prefilter.Prefilter, only if the literals it requires after the prefix are there), e.g.
+    idiomatcher = Idiomatcher.from_pretrained(n=3, prefilter="trie")
+    idiomatcher.prefilter.stats()
+"""
+import threading
+from collections import Counter, defaultdict
+from spacy.tokens import Doc, Span
+from spacy.vocab import Vocab
+from .builders import bounds, literal, reach
+from .configs import LEMMA_EXTENSION
+from .prefilter import LEMMA, LOWER, Prefilter
+
+
+def edge(spec: dict) -> tuple[str, str] | None:
+    """
+    The feature a token must have for the spec to match it, if the spec checks that and nothing else.
+    Unlike prefilter.feature, the feature is exact: a token has it if and only if the spec matches the token.
+    e.g. {"_": {"idiomatch_lemma": "take"}} -> ("LEMMA", "take")
+         {"LOWER": "catch"} -> ("LOWER", "catch")
+         {"TEXT": "Catch"} -> None (case-sensitive)
+         {"LOWER": "catch", "OP": "?"} -> None (may match zero tokens)
+    """
+    if spec.get("OP", "1") != "1" or len(spec.keys() - {"OP"}) != 1:
+        return None
+    attr, value = next((attr, value) for attr, value in spec.items() if attr != "OP")
+    if attr == "_" and isinstance(value, dict) and len(value) == 1:
+        lemma = value.get(LEMMA_EXTENSION)
+        return (LEMMA, lemma) if isinstance(lemma, str) and lemma == lemma.lower() else None
+    if attr == "LOWER" and isinstance(value, str) and value == value.lower():
+        return LOWER, value
+    if attr in ("LEMMA", "TEXT") and literal(value) is not None:
+        # a case-insensitive regex of a literal
+        return (LEMMA if attr == "LEMMA" else LOWER), literal(value).lower()
+    return None
+
+
+class Node:
+    """The patterns that start with the same literals, with what is left of them after the literals."""
+
+    def __init__(self, vocab: Vocab):
+        self.children: dict[tuple[str, str], Node] = {}
+        # the rest of the patterns, matched from the end of the prefix, bucketed by their anchors
+        self.rests = Prefilter(vocab)
+        self.size = 0  # number of patterns in the prefilter
+        self.reach: int | None = 0  # the most tokens the rest of any pattern can match, None for no limit
+        self.ends: Counter = Counter()  # the hash of a key -> its patterns that may end right at this node
+
+
+class PatternTrie:
+    """
+    A drop-in for prefilter.Prefilter. Walks the doc from every token down the trie, by the lemma and
+    the lowercased text of each token, and evaluates the rest of the patterns of every node it reaches
+    on the tokens that follow, keeping the matches that start right where the prefix ended.
+    The patterns that don't start with a literal are evaluated on the whole doc.
+    The matches are the same as the matcher's.
+    """
+
+    def __init__(self, vocab: Vocab):
+        self.vocab = vocab
+        self.root = Node(vocab)
+        self.nodes = 1  # number of nodes in the trie
+        # key -> the nodes its patterns are at, with what is left of each pattern there
+        self.keys: dict[str, list[tuple[Node, list[dict]]]] = defaultdict(list)
+        self.sizes: Counter = Counter()  # key -> number of its patterns
+        self.pending: set[Node] = set()  # the nodes with patterns not yet assigned to their anchors
+        self.lock = threading.Lock()  # held while flushing, as in prefilter.Prefilter
+        self.docs = 0  # number of docs matched so far
+        self.evaluated = 0  # number of times the rest of a node's patterns were evaluated so far
+        self.visited = 0  # number of nodes reached so far
+
+    def __len__(self) -> int:
+        """The number of patterns in the trie."""
+        return sum(self.sizes.values())
+
+    def add(self, key: str, patterns: list[list[dict]]):
+        key_hash = self.vocab.strings.add(key)
+        for pattern in patterns:
+            node, depth = self.root, 0
+            # the root matches the patterns that don't start with a literal on the whole doc instead
+            while depth < len(pattern) and (feature := edge(pattern[depth])) is not None:
+                if feature not in node.children:
+                    node.children[feature] = Node(self.vocab)
+                    self.nodes += 1
+                node = node.children[feature]
+                depth += 1
+            rest = pattern[depth:]
+            if node is not self.root and all((bounds(spec.get("OP", "1")) or (1, 1))[0] == 0 for spec in rest):
+                # the Matcher doesn't return empty matches
+                node.ends[key_hash] += 1
+            if rest:
+                node.rests.add(key, [rest])
+                self.pending.add(node)
+                node.size += 1
+                most = reach(rest)
+                node.reach = None if node.reach is None or most is None else max(node.reach, most)
+            self.keys[key].append((node, rest))
+            self.sizes[key] += 1
+
+    def flush(self):
+        """Assign the pending patterns of every node to the buckets of their anchors (see prefilter.Prefilter.flush)."""
+        with self.lock:
+            for node in self.pending:
+                node.rests.flush()
+            self.pending = set()
+
+    def remove(self, key: str, patterns: list[list[dict]]):
+        """
+        Remove the patterns of a key. The nodes they leave empty stay in the trie.
+
+        Args:
+            key: the key the patterns were added under
+            patterns: all the patterns of the key, as they were added
+        """
+        key_hash = self.vocab.strings[key]
+        self.sizes.pop(key, None)
+        rests = defaultdict(list)  # node -> the rests of the key's patterns there
+        for node, rest in self.keys.pop(key, []):
+            rests[node].append(rest)
+        for node, patterns in rests.items():
+            patterns = [rest for rest in patterns if rest]
+            if patterns:
+                node.rests.remove(key, patterns)
+                node.size -= len(patterns)
+            node.ends.pop(key_hash, None)
+
+    def __call__(self, doclike: Doc | Span) -> list[tuple[int, int, int]]:
+        """
+        Match the doc against the patterns whose prefixes it has.
+
+        Returns:
+            (match_id, start, end) triples, as the Matcher would return them
+        """
+        if self.pending:
+            self.flush()
+        length = len(doclike)
+        matches = set(self.root.rests(doclike)) if self.root.size else set()
+        tokens = [((LEMMA, token.lemma_.lower()), (LOWER, token.lower_)) for token in doclike]
+        for start in range(length):
+            frontier, end = [self.root], start
+            while frontier and end < length:
+                frontier = [
+                    node.children[feature]
+                    for node in frontier
+                    for feature in tokens[end]
+                    if feature in node.children
+                ]
+                end += 1
+                for node in frontier:
+                    self.visited += 1
+                    matches.update((key_hash, start, end) for key_hash in node.ends)
+                    stop = length if node.reach is None else min(length, end + node.reach)
+                    if node.size and end < stop:
+                        self.evaluated += 1
+                        matches.update(
+                            (match_id, start, end + rest_end)
+                            for match_id, rest_start, rest_end in node.rests(doclike[end:stop])
+                            if rest_start == 0
+                        )
+        self.docs += 1
+        return list(matches)
+
+    def stats(self) -> dict:
+        """
+        How much of the trie has been evaluated so far.
+
+        Returns:
+            docs: the number of docs matched
+            patterns: the number of patterns in the trie
+            nodes: the number of nodes in the trie, i.e. the distinct prefixes of literals
+            visited_per_doc: the average number of nodes reached per doc
+            evaluated_per_doc: the average number of times the rest of a node's patterns were evaluated per doc
+        """
+        return {
+            "docs": self.docs,
+            "patterns": len(self),
+            "nodes": self.nodes,
+            "visited_per_doc": self.visited / self.docs if self.docs else 0.0,
+            "evaluated_per_doc": self.evaluated / self.docs if self.docs else 0.0,
+        }
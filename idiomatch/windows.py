@@ -0,0 +1,131 @@
+"""
+Splits a long text (e.g. a whole book, or a stream of its lines) into sentence-aligned windows,
+so that the nlp pipeline and the Matcher only ever see a window at a time (see Idiomatcher.match_long).
+Each window owns the sentences up to its size, and carries on past them for the overlap,
+so that a match that starts in the sentences a window owns ends within the window.
+Also finds the sentences of a doc, to match within each of them (see Idiomatcher.find_matches).
+"""
+import re
+from collections import deque
+from typing import Callable, Iterable, Iterator
+from spacy.pipeline import Sentencizer
+from spacy.tokens import Doc
+
+# the whitespace after the end of a sentence, or a blank line
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+# the most characters to buffer without a sentence end, before cutting at the last whitespace
+# (or, without any, at the last token the tokenizer ends within that many characters)
+MAX_SENTENCE = 10_000
+# splits the docs whose pipeline set no sentence boundaries (e.g. with the parser pruned) after their punctuation
+SENTENCIZER = Sentencizer()
+
+
+def sentences(chunks: Iterable[str], tokenizer: Callable[[str], Doc] | None = None) -> Iterator[tuple[int, str]]:
+    """
+    Split a stream of text into sentences, cheaply, without running any pipeline on it.
+    A sentence keeps the whitespace that follows it, so the sentences add up to the text,
+    and each of them ends where the tokenizer would end a token.
+
+    Args:
+        chunks: the text, in chunks of any size (e.g. the lines of a file)
+        tokenizer: where to cut the text that runs on for more than MAX_SENTENCE characters without whitespace.
+                   Without it, such text is cut every MAX_SENTENCE characters, wherever that falls
+    Returns:
+        (the offset of the sentence in the text, the sentence) tuples
+    """
+    offset, buffer = 0, ""
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            if match.end() == len(buffer):
+                # the whitespace may carry on in the next chunk
+                break
+            yield offset + start, buffer[start:match.end()]
+            start = match.end()
+        while len(buffer) - start > MAX_SENTENCE:
+            space = buffer.rfind(" ", start + 1, len(buffer) - 1)
+            cut = space + 1 if space != -1 else start + token_cut(buffer[start:start + MAX_SENTENCE], tokenizer)
+            yield offset + start, buffer[start:cut]
+            start = cut
+        offset += start
+        buffer = buffer[start:]
+    if buffer:
+        yield offset, buffer
+
+
+def token_cut(text: str, tokenizer: Callable[[str], Doc] | None) -> int:
+    """Where to cut text without whitespace: before the last token the tokenizer finds in it, or else at its end."""
+    if tokenizer is not None:
+        doc = tokenizer(text)
+        # the last token may carry on past the text
+        if len(doc) > 1:
+            return doc[-1].idx
+    return len(text)
+
+
+def windows(chunks: Iterable[str], size: int, overlap: int,
+            tokenizer: Callable[[str], Doc] | None = None) -> Iterator[tuple[int, str, int]]:
+    """
+    Group the sentences of a text into windows. A window owns the fewest sentences that add up to at least
+    size words (or what is left of the text), and carries on with the sentences that follow them until
+    it has at least overlap words past them, which are the first sentences of the next window.
+    Words (runs of non-whitespace) are counted in place of tokens, as a word is at least one token.
+
+    Args:
+        chunks: the text, in chunks of any size
+        size: the least number of words a window owns
+        overlap: the least number of words a window carries on with past the sentences it owns
+        tokenizer: where to cut the text without whitespace, as in sentences
+    Returns:
+        (the offset of the window in the text, the text of the window, the number of characters it owns) tuples
+    """
+    if size < 1:
+        raise ValueError(f"A window must own at least one word, got size={size}")
+    buffer = deque()  # (sentence, its number of words) of the window being filled
+    owned, owned_words, carried_words = 0, 0, 0  # the sentences the window owns, and the words in and past them
+    offset = 0  # of the window in the text
+    for start, sentence in sentences(chunks, tokenizer):
+        if not buffer:
+            offset = start
+        words = len(sentence.split())
+        buffer.append((sentence, words))
+        if owned_words < size:
+            owned += 1
+            owned_words += words
+        else:
+            carried_words += words
+        while owned_words >= size and carried_words >= overlap:
+            text = "".join(sentence for sentence, _ in buffer)
+            own = sum(len(buffer[i][0]) for i in range(owned))
+            yield offset, text, own
+            for _ in range(owned):
+                buffer.popleft()
+            offset += own
+            # the sentences carried on with are the first ones of the next window
+            owned, owned_words, carried_words = 0, 0, 0
+            for _, words in buffer:
+                if owned_words < size:
+                    owned += 1
+                    owned_words += words
+                else:
+                    carried_words += words
+    if buffer:
+        text = "".join(sentence for sentence, _ in buffer)
+        yield offset, text, len(text)
+
+
+def sentence_bounds(doc: Doc) -> list[tuple[int, int]]:
+    """
+    The (start, end) token offsets of the sentences of a doc: those its pipeline set (with the parser,
+    the senter or the sentencizer), or else those spaCy's rule-based Sentencizer would set, without setting them.
+
+    Args:
+        doc: the doc to split
+    Returns:
+        the offsets of its sentences, in order, which add up to the doc
+    """
+    if doc.has_annotation("SENT_START"):
+        return [(sent.start, sent.end) for sent in doc.sents]
+    starts = [i for i, start in enumerate(SENTENCIZER.predict([doc])[0]) if start]
+    return list(zip(starts, starts[1:] + [len(doc)]))
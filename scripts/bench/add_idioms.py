@@ -0,0 +1,69 @@
+"""
+Benchmark adding (and removing) thousands of custom idioms in bulk, against adding them
+the way add_idioms used to: tagging the lemmas one at a time and scanning a list for duplicates.
+e.g. python scripts/bench/add_idioms.py --idioms 10000
+With --blank, the lemmas are tokenized by a blank English pipeline, without the model: this times
+everything but the tagging, and the idioms are checked to be in the matcher instead of matched.
+"""
+import random
+import time
+import click
+import spacy
+from loguru import logger
+from idiomatch import Idiomatcher
+from idiomatch.builders import add_special_tok_cases
+from workload import sentences
+
+
+def synthetic(n_idioms: int, seed: int) -> list[dict]:
+    """Idioms of 3 to 5 words drawn from the example sentences, none of which are bundled."""
+    rng = random.Random(seed)
+    words = sorted({word.lower() for sent in sentences() for word in sent.split() if word.isalpha()})
+    lemmas = set()
+    while len(lemmas) < n_idioms:
+        lemmas.add(" ".join(rng.sample(words, rng.randint(3, 5))))
+    return [{"lemma": lemma, "senses": [{"content": "...", "examples": []}]} for lemma in sorted(lemmas)]
+
+
+def one_by_one(idiomatcher: Idiomatcher, idioms: list[dict]) -> float:
+    """The time the old path takes to check for duplicates and tag the lemmas, before any pattern is added."""
+    existing = list(idiomatcher.idioms.lemmas())
+    start = time.perf_counter()
+    for idiom in idioms:
+        if any(lemma == idiom["lemma"] for lemma in existing):
+            raise ValueError(idiom["lemma"])
+        existing.append(idiom["lemma"])
+        idiomatcher.nlp(idiom["lemma"])
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+@click.option("--idioms", "n_idioms", default=10000, help="The number of idioms to add")
+@click.option("--baseline", default=1000, help="The number of idioms to time the old path with (0 to skip)")
+@click.option("--blank", is_flag=True, help="Use a blank English pipeline instead of the model")
+def main(n: int, n_idioms: int, baseline: int, blank: bool):
+    nlp = None
+    if blank:
+        nlp = spacy.blank("en")
+        add_special_tok_cases(nlp)
+    idiomatcher = Idiomatcher.from_pretrained(n, nlp=nlp)
+    idioms = synthetic(n_idioms, seed=0)
+    if baseline:
+        elapsed = one_by_one(idiomatcher, idioms[:baseline])
+        logger.info(f"one by one: {elapsed:.2f}s to check and tag {baseline} idioms "
+                    f"(~{elapsed / baseline * n_idioms:.0f}s for {n_idioms})")
+    start = time.perf_counter()
+    idiomatcher.add_idioms(idioms)
+    logger.info(f"add_idioms: {time.perf_counter() - start:.2f}s for {n_idioms} idioms")
+    doc = idiomatcher.nlp(idioms[0]["lemma"])
+    # a blank pipeline sets none of the tags the patterns read
+    assert idioms[0]["lemma"] in (idiomatcher.idioms if blank else [match["idiom"] for match in idiomatcher(doc)])
+    start = time.perf_counter()
+    idiomatcher.remove_idioms([idiom["lemma"] for idiom in idioms])
+    logger.info(f"remove_idioms: {time.perf_counter() - start:.2f}s for {n_idioms} idioms")
+    assert idioms[0]["lemma"] not in (idiomatcher.idioms if blank else [match["idiom"] for match in idiomatcher(doc)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Benchmark the match cache (see Idiomatcher.cache_matches) on a chat-like workload, where the example sentences
+of the bundled idioms are drawn with a Zipf distribution, so that a few of them make up most of the messages.
+e.g. python scripts/bench/cache.py --n 3 --messages 20000 --max-entries 1000
+"""
+import time
+import click
+import numpy as np
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+@click.option("--messages", default=20000, help="The number of messages to match")
+@click.option("--zipf", default=1.2, help="The exponent of the Zipf distribution the messages are drawn with")
+@click.option("--max-entries", default=1000, help="The most texts the cache keeps the matches of")
+def main(n: int, messages: int, zipf: float, max_entries: int):
+    idiomatcher = Idiomatcher.from_pretrained(n)
+    sents = sentences()
+    ranks = np.random.default_rng(0).zipf(zipf, messages * 2)
+    texts = [sents[rank - 1] for rank in ranks[ranks <= len(sents)][:messages]]
+    # build the gate and the prefilter before timing anything
+    idiomatcher.match_texts(texts[:256])
+    for how in ("uncached", "cached"):
+        cache = idiomatcher.cache_matches(max_entries) if how == "cached" else None
+        idiomatcher.match_cache = cache
+        start = time.perf_counter()
+        for text in texts:
+            idiomatcher.match_text(text)
+        elapsed = time.perf_counter() - start
+        logger.info(f"{how}, n={n}: {len(texts) / elapsed:.1f} messages/s over {len(texts)} messages "
+                    f"({len(set(texts))} distinct)")
+        if cache is not None:
+            logger.info(f"cache stats: {cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Benchmark the regex patterns against the compiled ones (see builders.compile_patterns).
+e.g. python scripts/bench/compile.py --n 3
+"""
+import statistics
+import time
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+def main(n: int):
+    texts = sentences()
+    for compiled in (False, True):
+        start = time.perf_counter()
+        idiomatcher = Idiomatcher.from_pretrained(n, cache=False, compiled=compiled)
+        load = time.perf_counter() - start
+        docs = list(idiomatcher.nlp.pipe(texts))
+        latencies = []
+        for doc in docs:
+            start = time.perf_counter()
+            idiomatcher(doc)
+            latencies.append(time.perf_counter() - start)
+        logger.info(
+            f"compiled={compiled}, n={n}: load {load:.2f}s, "
+            f"per-doc latency mean {statistics.mean(latencies) * 1000:.2f}ms / "
+            f"median {statistics.median(latencies) * 1000:.2f}ms over {len(docs)} docs"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Benchmark spaCy's Matcher (with the prefilter) against the gap engine (see engine.GapMatcher) as the slop value
+and the length of the docs grow, and check that they match the same.
+e.g. python scripts/bench/engine.py --slops 1,3,5 --sizes 1,8
+"""
+import statistics
+import time
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+
+@click.command()
+@click.option("--slops", default="1,3,5", help="The slop values to benchmark with, separated by commas")
+@click.option("--sizes", default="1,8", help="How many example sentences to join into each doc, separated by commas")
+def main(slops: str, sizes: str):
+    examples = sentences()
+    for n in map(int, slops.split(",")):
+        idiomatcher = Idiomatcher.from_pretrained(n)
+        data = idiomatcher.to_bytes()
+        for size in map(int, sizes.split(",")):
+            texts = [" ".join(examples[i:i + size]) for i in range(0, len(examples), size)]
+            docs = list(idiomatcher.nlp.pipe(texts))
+            found = {}
+            for engine in ("spacy", "gaps"):
+                matcher = Idiomatcher.from_bytes(data, idiomatcher.nlp, engine=engine)
+                latencies, found[engine] = [], []
+                for doc in docs:
+                    start = time.perf_counter()
+                    found[engine].append(sorted(matcher.find_matches(doc)))
+                    latencies.append(time.perf_counter() - start)
+                logger.info(
+                    f"engine={engine}, n={n}, {size} sentences per doc: per-doc latency "
+                    f"mean {statistics.mean(latencies) * 1000:.2f}ms / median {statistics.median(latencies) * 1000:.2f}ms "
+                    f"over {len(docs)} docs"
+                )
+                if matcher.engine is not None:
+                    logger.info(f"engine={engine} stats: {matcher.engine.stats()}")
+            assert found["spacy"] == found["gaps"], f"the engines matched differently at n={n}"
+
+
+if __name__ == '__main__':
+    main()
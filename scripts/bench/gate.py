@@ -0,0 +1,43 @@
+"""
+Benchmark matching raw texts with match_text (which skips the pipeline for texts that can't
+contain an idiom) against running the pipeline on every text.
+e.g. python scripts/bench/gate.py --n 1 --no-idiom-ratio 0.9
+"""
+import random
+import time
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+# sentences without any idiom, to mix into the workload
+PLAIN = [
+    "Revenue grew by four percent in the third quarter.",
+    "The committee will publish its report next week.",
+    "Please find the attached invoice for your records.",
+    "The train to Edinburgh departs from platform nine.",
+]
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+@click.option("--no-idiom-ratio", default=0.9, help="The fraction of the workload that has no idiom")
+def main(n: int, no_idiom_ratio: float):
+    idiomatcher = Idiomatcher.from_pretrained(n)
+    texts = sentences()
+    texts += [random.choice(PLAIN) for _ in range(int(len(texts) * no_idiom_ratio / (1 - no_idiom_ratio)))]
+    random.shuffle(texts)
+    start = time.perf_counter()
+    for text in texts:
+        idiomatcher(idiomatcher.nlp(text))
+    logger.info(f"nlp + __call__: {(time.perf_counter() - start) / len(texts) * 1000:.2f}ms per text")
+    idiomatcher.match_text("")  # index the patterns
+    start = time.perf_counter()
+    for text in texts:
+        idiomatcher.match_text(text)
+    logger.info(f"match_text: {(time.perf_counter() - start) / len(texts) * 1000:.2f}ms per text")
+    logger.info(f"gate stats: {idiomatcher.gate.stats()}")
+
+
+if __name__ == '__main__':
+    main()
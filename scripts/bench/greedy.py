@@ -0,0 +1,52 @@
+"""
+Benchmark resolving overlapping matches on synthetic docs with thousands of matches,
+against the pairwise containment check the greedy matching used to do.
+e.g. python scripts/bench/greedy.py --matches 5000
+"""
+import random
+import time
+import click
+from loguru import logger
+from idiomatch.resolvers import resolve, POLICIES
+
+
+def resolve_pairwise(matches: list[tuple[int, int, int]]) -> list[tuple[int, int, int]]:
+    kept = []
+    for match in sorted(matches, key=lambda match: match[2] - match[1], reverse=True):
+        if not any(match[1] >= other[1] and match[2] <= other[2] for other in kept):
+            kept.append(match)
+    return kept
+
+
+def synthetic(n_matches: int, max_length: int, seed: int) -> list[tuple[int, int, int]]:
+    """
+    The matches of a doc about as long as there are matches, where spans of up to max_length tokens
+    overlap heavily, as the wildcards of high slop values make them do.
+    """
+    rng = random.Random(seed)
+    matches = set()
+    while len(matches) < n_matches:
+        start = rng.randrange(n_matches)
+        matches.add((rng.randrange(100), start, start + rng.randint(1, max_length)))
+    return sorted(matches, key=lambda match: (match[1], match[2], match[0]))
+
+
+@click.command()
+@click.option("--matches", "n_matches", default=5000, help="The number of matches per doc")
+@click.option("--max-length", default=12, help="The maximum length of a match")
+@click.option("--docs", default=5, help="The number of synthetic docs")
+def main(n_matches: int, max_length: int, docs: int):
+    workload = [synthetic(n_matches, max_length, seed) for seed in range(docs)]
+    start = time.perf_counter()
+    expected = [resolve_pairwise(matches) for matches in workload]
+    logger.info(f"pairwise: {(time.perf_counter() - start) / docs * 1000:.2f}ms per doc")
+    for policy in POLICIES:
+        start = time.perf_counter()
+        resolved = [resolve(matches, policy) for matches in workload]
+        logger.info(f"{policy}: {(time.perf_counter() - start) / docs * 1000:.2f}ms per doc "
+                    f"({sum(map(len, resolved)) / docs:.0f} matches kept per doc)")
+    assert [resolve(matches) for matches in workload] == expected
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Benchmark matching a long text as a single doc against a window at a time (see Idiomatcher.match_long):
+the time each takes and its peak memory, as the text grows.
+e.g. python scripts/bench/long.py --n 3 --sizes 1,4,16
+"""
+import time
+import tracemalloc
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+@click.option("--sizes", default="1,4,16", help="How many times to repeat the example sentences, separated by commas")
+@click.option("--window", default=1000, help="The least number of words each window owns")
+def main(n: int, sizes: str, window: int):
+    idiomatcher = Idiomatcher.from_pretrained(n)
+    text = " ".join(sentences())
+    # build the gate and the prefilter before timing anything
+    idiomatcher.match_long(text, window=window)
+    for size in map(int, sizes.split(",")):
+        long_text = " ".join([text] * size)
+        for how in ("doc", "windows"):
+            tracemalloc.start()
+            start = time.perf_counter()
+            if how == "doc":
+                matches = idiomatcher(idiomatcher.nlp(long_text), output="array")
+            else:
+                matches = idiomatcher.match_long(long_text, window=window, output="array")
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            logger.info(f"{how}, n={n}, {len(long_text)} chars: {len(matches)} matches in {elapsed:.2f}s, "
+                        f"peak {peak / 2 ** 20:.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
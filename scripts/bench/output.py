@@ -0,0 +1,33 @@
+"""
+Benchmark the post-match time of each output of the matches (see Idiomatcher.__call__), on docs tagged beforehand.
+e.g. python scripts/bench/output.py --n 1 --repeat 5
+"""
+import time
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from idiomatch.idiomatcher import OUTPUTS
+from workload import sentences
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+@click.option("--repeat", default=5, help="How many times to repeat the example sentences")
+def main(n: int, repeat: int):
+    idiomatcher = Idiomatcher.from_pretrained(n)
+    docs = list(idiomatcher.nlp.pipe(sentences() * repeat))
+    start = time.perf_counter()
+    n_matches = sum(len(idiomatcher.find_matches(doc)) for doc in docs)
+    found = time.perf_counter() - start
+    logger.info(f"find_matches: {found / len(docs) * 1000:.3f}ms per doc ({n_matches} matches over {len(docs)} docs)")
+    for output in OUTPUTS:
+        start = time.perf_counter()
+        for doc in docs:
+            idiomatcher(doc, output=output)
+        elapsed = time.perf_counter() - start
+        logger.info(f"output={output}: {elapsed / len(docs) * 1000:.3f}ms per doc "
+                    f"({max(elapsed - found, 0) / len(docs) * 1000:.3f}ms after find_matches)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+"""
+Benchmark the throughput of Idiomatcher.pipe with different numbers of processes.
+e.g. python scripts/bench/pipe.py --n 1 --repeat 10
+"""
+import time
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+@click.option("--repeat", default=10, help="How many times to repeat the example sentences")
+@click.option("--batch-size", default=256)
+def main(n: int, repeat: int, batch_size: int):
+    idiomatcher = Idiomatcher.from_pretrained(n)
+    texts = sentences() * repeat
+    for n_process in (1, 2, 4, 8):
+        start = time.perf_counter()
+        for _ in idiomatcher.pipe(texts, batch_size=batch_size, n_process=n_process):
+            pass
+        elapsed = time.perf_counter() - start
+        logger.info(f"n_process={n_process}: {len(texts) / elapsed:.1f} sentences/sec ({len(texts)} sentences)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""
+Benchmark matching with and without the anchor prefilter (see prefilter.Prefilter),
+and report how many patterns a typical sentence prunes away.
+e.g. python scripts/bench/prefilter.py --n 3
+"""
+import statistics
+import time
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+def main(n: int):
+    idiomatcher = Idiomatcher.from_pretrained(n, prefilter=True)
+    docs = list(idiomatcher.nlp.pipe(sentences()))
+    for matcher in (Idiomatcher.from_bytes(idiomatcher.to_bytes(), idiomatcher.nlp, prefilter=False), idiomatcher):
+        latencies = []
+        for doc in docs:
+            start = time.perf_counter()
+            matcher(doc)
+            latencies.append(time.perf_counter() - start)
+        logger.info(
+            f"prefilter={matcher.prefilter is not None}, n={n}: per-doc latency "
+            f"mean {statistics.mean(latencies) * 1000:.2f}ms / median {statistics.median(latencies) * 1000:.2f}ms "
+            f"over {len(docs)} docs"
+        )
+    logger.info(f"prefilter stats: {idiomatcher.prefilter.stats()}")
+
+
+if __name__ == '__main__':
+    main()
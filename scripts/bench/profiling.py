@@ -0,0 +1,31 @@
+"""
+Profile the patterns on the example sentences of the bundled idioms, and list the ones that cost the most.
+e.g. python scripts/bench/profiling.py --n 5 --top 20 --out profile.json
+"""
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+
+@click.command()
+@click.option("--n", default=5, help="The slop value to profile with")
+@click.option("--top", default=20, help="The number of patterns to list")
+@click.option("--by", default="time", type=click.Choice(["time", "candidates", "matches"]))
+@click.option("--out", default=None, help="The JSON file to save the report to")
+def main(n: int, top: int, by: str, out: str | None):
+    idiomatcher = Idiomatcher.from_pretrained(n)
+    docs = list(idiomatcher.nlp.pipe(sentences()))
+    profiler = idiomatcher.profile()
+    for doc in docs:
+        idiomatcher(doc)
+    for row in profiler.report(top, by):
+        logger.info(f"{row['idiom']} ({row['variant']}): {row['time'] * 1000:.2f}ms over {row['candidates']} docs, "
+                    f"{row['matches']} matches")
+    if out:
+        profiler.to_disk(out, by=by)
+        logger.info(f"Saved the report to {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+Benchmark tagging & matching with the full pipeline against the pruned one (see Idiomatcher.prune).
+e.g. python scripts/bench/prune.py --n 1 --repeat 5
+"""
+import time
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+@click.option("--repeat", default=5, help="How many times to repeat the example sentences")
+def main(n: int, repeat: int):
+    texts = sentences() * repeat
+    latencies = {}
+    for prune in (False, True):
+        idiomatcher = Idiomatcher.from_pretrained(n, prune=prune)
+        start = time.perf_counter()
+        for doc in idiomatcher.nlp.pipe(texts):
+            idiomatcher(doc)
+        latencies[prune] = (time.perf_counter() - start) / len(texts)
+        logger.info(
+            f"prune={prune} ({', '.join(idiomatcher.nlp.pipe_names)}): "
+            f"{latencies[prune] * 1000:.2f}ms per doc over {len(texts)} docs"
+        )
+    saved = latencies[False] - latencies[True]
+    logger.info(f"pruning saved {saved * 1000:.2f}ms per doc ({saved / latencies[False]:.0%})")
+
+
+if __name__ == '__main__':
+    main()
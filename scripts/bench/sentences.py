@@ -0,0 +1,43 @@
+"""
+Benchmark matching paragraphs of several sentences as a whole against a sentence at a time
+(see Idiomatcher.find_matches), and count the matches across sentences that the latter drops.
+e.g. python scripts/bench/sentences.py --slops 1,3,5 --sizes 1,8,32
+"""
+import statistics
+import time
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+
+@click.command()
+@click.option("--slops", default="1,3,5", help="The slop values to benchmark with, separated by commas")
+@click.option("--sizes", default="1,8,32", help="How many example sentences to join into each paragraph, separated by commas")
+@click.option("--prefilter", default="true", type=click.Choice(["true", "false", "trie"]),
+              help="How to prefilter the patterns (see Idiomatcher)")
+def main(slops: str, sizes: str, prefilter: str):
+    examples = sentences()
+    for n in map(int, slops.split(",")):
+        idiomatcher = Idiomatcher.from_pretrained(n, prefilter={"true": True, "false": False}.get(prefilter, prefilter))
+        for size in map(int, sizes.split(",")):
+            paragraphs = [" ".join(examples[i:i + size]) for i in range(0, len(examples), size)]
+            docs = list(idiomatcher.nlp.pipe(paragraphs))
+            found = {}
+            for within_sentences in (False, True):
+                latencies, found[within_sentences] = [], []
+                for doc in docs:
+                    start = time.perf_counter()
+                    found[within_sentences].append(idiomatcher.find_matches(doc, within_sentences))
+                    latencies.append(time.perf_counter() - start)
+                logger.info(
+                    f"within_sentences={within_sentences}, n={n}, {size} sentences per paragraph: per-doc latency "
+                    f"mean {statistics.mean(latencies) * 1000:.2f}ms / median {statistics.median(latencies) * 1000:.2f}ms "
+                    f"over {len(docs)} docs"
+                )
+            across = sum(len(set(whole) - set(within)) for whole, within in zip(found[False], found[True]))
+            logger.info(f"n={n}, {size} sentences per paragraph: {across} matches across sentences dropped")
+
+
+if __name__ == '__main__':
+    main()
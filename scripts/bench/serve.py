@@ -0,0 +1,97 @@
+"""
+Load test the async API (see Idiomatcher.amatch) behind a stand-in ASGI app, against the same app
+matching each request in a thread of its own (asyncio.to_thread), on the example sentences of the bundled idioms.
+The requests are sent to the app in-process, so that only the matching is measured, not the network.
+e.g. python scripts/bench/serve.py --concurrency 64 --n-process 1
+"""
+import asyncio
+import json
+import statistics
+import time
+from typing import Callable
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+MODES = ("amatch", "thread")
+
+
+def make_app(idiomatcher: Idiomatcher, mode: str) -> Callable:
+    """An ASGI app that matches the body of each request and responds with the matches as JSON."""
+    async def app(scope: dict, receive: Callable, send: Callable):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        text = body.decode()
+        if mode == "amatch":
+            matches = await idiomatcher.amatch(text)
+        else:
+            matches = await asyncio.to_thread(idiomatcher.match_text, text)
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps(matches).encode()})
+    return app
+
+
+async def request(app: Callable, text: str) -> float:
+    """Send a text to the app, and return how long the response took."""
+    scope = {"type": "http", "method": "POST", "path": "/match", "headers": []}
+    messages = [{"type": "http.request", "body": text.encode(), "more_body": False}]
+    sent = []
+
+    async def receive() -> dict:
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message: dict):
+        sent.append(message)
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    assert sent[0]["status"] == 200
+    return time.perf_counter() - start
+
+
+async def load(app: Callable, texts: list[str], concurrency: int) -> tuple[float, list[float]]:
+    """Send all the texts, with up to concurrency of them in flight at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(text: str) -> float:
+        async with semaphore:
+            return await request(app, text)
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(bounded(text) for text in texts))
+    return time.perf_counter() - start, latencies
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+@click.option("--concurrency", default=64, help="The number of requests in flight at a time")
+@click.option("--repeat", default=4, help="How many times to repeat the example sentences")
+@click.option("--n-process", default=1, help="The number of worker processes to serve amatch with")
+@click.option("--batch-size", default=64, help="The most texts amatch coalesces into a batch")
+def main(n: int, concurrency: int, repeat: int, n_process: int, batch_size: int):
+    idiomatcher = Idiomatcher.from_pretrained(n)
+    texts = sentences() * repeat
+    # build the gate and the prefilter before timing anything
+    idiomatcher.match_texts(texts[:batch_size])
+    idiomatcher.serve(n_process=n_process, batch_size=batch_size)
+    try:
+        for mode in MODES:
+            elapsed, latencies = asyncio.run(load(make_app(idiomatcher, mode), texts, concurrency))
+            percentiles = statistics.quantiles(latencies, n=100)
+            logger.info(
+                f"{mode}, n={n}, concurrency={concurrency}: {len(texts) / elapsed:.1f} requests/s, "
+                f"p50 {percentiles[49] * 1000:.1f}ms / p99 {percentiles[98] * 1000:.1f}ms over {len(texts)} requests"
+            )
+        logger.info(f"batcher stats: {idiomatcher.batcher.stats()}")
+    finally:
+        idiomatcher.batcher.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark load time, latency and throughput for every slop value and greedy mode, on the example sentences
+of the bundled idioms, and compare the results against a baseline to catch regressions.
+e.g. python scripts/bench/suite.py run --out results.json
+     python scripts/bench/suite.py compare baseline.json results.json --threshold 0.1
+Each slop value is measured in a fresh process with an empty snapshot cache, so that the cold load builds
+the matcher from the resources, the warm load restores it from the snapshot, and the peak RSS is its own.
+Loading the spaCy model is timed on its own (nlp_load_s), so that the load times are those of the matcher alone.
+"""
+import gc
+import json
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+import click
+import spacy
+from loguru import logger
+from idiomatch import Idiomatcher
+from idiomatch import idiomatcher as idiomatcher_module
+from idiomatch.idiomatcher import load_nlp
+from workload import sentences
+
+GREEDY_MODES = (True, False)
+# the metrics that are better the higher they are. Every other metric is better the lower it is
+HIGHER_IS_BETTER = ("sents_per_s",)
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def measure(n: int, repeat: int) -> dict[str, float]:
+    """
+    Measure a slop value, in a process of its own.
+
+    Returns:
+        the metrics, keyed by their names (e.g. "n=1/greedy=True/p95_ms")
+    """
+    metrics = {}
+    start = time.perf_counter()
+    nlp = load_nlp()
+    metrics[f"n={n}/nlp_load_s"] = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as cache_dir:
+        idiomatcher_module.CACHE_DIR = Path(cache_dir)
+        start = time.perf_counter()
+        idiomatcher = Idiomatcher.from_pretrained(n, nlp=nlp)
+        metrics[f"n={n}/load_cold_s"] = time.perf_counter() - start
+        # freed before the warm load, so that the peak RSS counts a single matcher
+        del idiomatcher
+        gc.collect()
+        start = time.perf_counter()
+        idiomatcher = Idiomatcher.from_pretrained(n, nlp=nlp)
+        metrics[f"n={n}/load_warm_s"] = time.perf_counter() - start
+    # a pipeline passed in is left as is, so it is pruned as from_pretrained prunes the one it loads
+    idiomatcher.prune()
+    texts = sentences() * repeat
+    docs = list(idiomatcher.nlp.pipe(texts))
+    for greedy in GREEDY_MODES:
+        latencies = []
+        for doc in docs:
+            start = time.perf_counter()
+            idiomatcher(doc, greedy)
+            latencies.append(time.perf_counter() - start)
+        percentiles = statistics.quantiles(latencies, n=100)
+        metrics[f"n={n}/greedy={greedy}/p50_ms"] = percentiles[49] * 1000
+        metrics[f"n={n}/greedy={greedy}/p95_ms"] = percentiles[94] * 1000
+        metrics[f"n={n}/greedy={greedy}/p99_ms"] = percentiles[98] * 1000
+        # end to end, tagging included
+        start = time.perf_counter()
+        for _ in idiomatcher.pipe(texts, greedy):
+            pass
+        metrics[f"n={n}/greedy={greedy}/sents_per_s"] = len(texts) / (time.perf_counter() - start)
+    metrics[f"n={n}/peak_rss_mb"] = peak_rss_mb()
+    return metrics
+
+
+def regression(name: str, baseline: float, current: float) -> float:
+    """How much worse the current value of a metric is than the baseline, as a fraction of the baseline."""
+    if not baseline:
+        return 0.0
+    worse = baseline - current if name.endswith(HIGHER_IS_BETTER) else current - baseline
+    return worse / baseline
+
+
+@click.group()
+def main():
+    pass
+
+
+@main.command()
+@click.option("--slops", default="1,2,3,4,5", help="The slop values to benchmark, separated by commas")
+@click.option("--repeat", default=1, help="How many times to repeat the example sentences")
+@click.option("--out", default="results.json", help="The JSON file to write the results to")
+def run(slops: str, repeat: int, out: str):
+    metrics = {}
+    for n in map(int, slops.split(",")):
+        logger.info(f"Measuring n={n}...")
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            metrics.update(executor.submit(measure, n, repeat).result())
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "spacy": spacy.__version__,
+            "sentences": len(sentences()) * repeat,
+        },
+        "metrics": metrics,
+    }
+    Path(out).write_text(json.dumps(results, indent=2))
+    for name, value in metrics.items():
+        logger.info(f"{name}: {value:.3f}")
+    logger.info(f"Saved the results to {out}")
+
+
+@main.command()
+@click.argument("baseline", type=click.Path(exists=True))
+@click.argument("current", type=click.Path(exists=True))
+@click.option("--threshold", default=0.1, help="The fraction by which a metric may get worse than the baseline")
+def compare(baseline: str, current: str, threshold: float):
+    """Fail if any metric of the baseline got worse by more than the threshold."""
+    baseline_metrics = json.loads(Path(baseline).read_text())["metrics"]
+    current_metrics = json.loads(Path(current).read_text())["metrics"]
+    regressed = []
+    for name, value in baseline_metrics.items():
+        if name not in current_metrics:
+            logger.warning(f"{name}: missing from {current}")
+            continue
+        worse = regression(name, value, current_metrics[name])
+        logger.info(f"{name}: {value:.3f} -> {current_metrics[name]:.3f} ({worse:+.1%} worse)")
+        if worse > threshold:
+            regressed.append(name)
+    if regressed:
+        logger.error(f"{len(regressed)} metrics regressed by more than {threshold:.0%}: {', '.join(regressed)}")
+        sys.exit(1)
+    logger.info(f"No metric regressed by more than {threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark loading the patterns of a slop value from the template (see builders.materialize) against
+loading them from a pretty-printed file per slop value, as the patterns used to be shipped.
+e.g. python scripts/bench/template.py --n 3
+"""
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import click
+from loguru import logger
+from idiomatch.builders import materialize
+from idiomatch.configs import RESOURCES_DIR
+
+
+def per_slop(path: Path) -> dict[str, list]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def from_template(path: Path, n: int) -> dict[str, list]:
+    with open(path) as f:
+        template = json.load(f)
+    return {idiom: materialize(patterns, n) for idiom, patterns in template.items()}
+
+
+def measure(load, *args) -> tuple[float, int, dict]:
+    """The time it takes to load the patterns, and the memory they take up once loaded."""
+    start = time.perf_counter()
+    load(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    patterns = load(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, patterns
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+def main(n: int):
+    template_path = RESOURCES_DIR / "patterns.json"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        slop_path = Path(tmp_dir) / f"slop_{n}.json"
+        with open(slop_path, "w") as f:
+            json.dump(from_template(template_path, n), f, indent=2)
+        results = {
+            f"slop_{n}.json": measure(per_slop, slop_path),
+            "patterns.json": measure(from_template, template_path, n),
+        }
+        logger.info(f"shipped: {slop_path.stat().st_size * 5 / 1e6:.1f}MB for slop_1-5.json, "
+                    f"{template_path.stat().st_size / 1e6:.1f}MB for patterns.json")
+    for name, (elapsed, size, _) in results.items():
+        logger.info(f"{name}: load {elapsed * 1000:.0f}ms, {size / 1e6:.1f}MB resident")
+    assert results[f"slop_{n}.json"][2] == results["patterns.json"][2]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmark matching with the flat list of patterns, the anchor prefilter (see prefilter.Prefilter)
+and the prefix trie (see trie.PatternTrie): the memory each takes and the per-doc latency.
+e.g. python scripts/bench/trie.py --n 3
+"""
+import statistics
+import time
+import tracemalloc
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from workload import sentences
+
+
+@click.command()
+@click.option("--n", default=1, help="The slop value to benchmark with")
+def main(n: int):
+    idiomatcher = Idiomatcher.from_pretrained(n, prefilter=False)
+    data = idiomatcher.to_bytes()
+    docs = list(idiomatcher.nlp.pipe(sentences()))
+    for prefilter in (False, True, "trie"):
+        tracemalloc.start()
+        matcher = Idiomatcher.from_bytes(data, idiomatcher.nlp, prefilter=prefilter)
+        if matcher.prefilter is not None:
+            matcher.prefilter.flush()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        latencies = []
+        for doc in docs:
+            start = time.perf_counter()
+            matcher(doc)
+            latencies.append(time.perf_counter() - start)
+        logger.info(
+            f"prefilter={prefilter}, n={n}: {memory / 2 ** 20:.1f}MB, per-doc latency "
+            f"mean {statistics.mean(latencies) * 1000:.2f}ms / median {statistics.median(latencies) * 1000:.2f}ms "
+            f"over {len(docs)} docs"
+        )
+        if matcher.prefilter is not None:
+            logger.info(f"prefilter={prefilter} stats: {matcher.prefilter.stats()}")
+
+
+if __name__ == '__main__':
+    main()
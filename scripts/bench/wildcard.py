@@ -0,0 +1,69 @@
+"""
+Benchmark the wildcards of the patterns, which search the text of a token with the WILDCARD regex, against wildcards
+that test a lexeme flag computed once per word of the vocab instead, and check that they match the same.
+e.g. python scripts/bench/wildcard.py --slops 1,3,5 --prefilter trie
+
+The Matcher caches what each regex predicate returns per token, so the regex is searched at most once per token
+(and per sub-matcher of the prefilter) whatever the slop value. The flag saves those searches, but every partial
+match tests it again, which costs more than looking the cached predicate up: with spaCy 3.8, the flag is a few
+percent faster at n=1 and slower from n=2 on, which is why the patterns keep the regex.
+"""
+import json
+import re
+import statistics
+import time
+import click
+from loguru import logger
+from idiomatch import Idiomatcher
+from idiomatch.builders import compile_patterns, materialize
+from idiomatch.configs import RESOURCES_DIR, WILDCARD
+from idiomatch.idiomatcher import load_nlp
+from idiomatch.store import IdiomStore
+from workload import sentences
+
+# of the FLAG19-FLAG63 spaCy leaves to users
+WILDCARD_FLAG = 63
+
+
+def flagged(pattern: list[dict]) -> list[dict]:
+    """The pattern, with its wildcards testing the flag instead of searching the regex."""
+    return [
+        {f"FLAG{WILDCARD_FLAG}": True, "OP": spec["OP"]} if spec.get("TEXT") == {"REGEX": WILDCARD} else spec
+        for spec in pattern
+    ]
+
+
+@click.command()
+@click.option("--slops", default="1,3,5", help="The slop values to benchmark with, separated by commas")
+@click.option("--prefilter", default="true", type=click.Choice(["true", "false", "trie"]),
+              help="How to prefilter the patterns (see Idiomatcher)")
+def main(slops: str, prefilter: str):
+    nlp = load_nlp()
+    regex = re.compile(WILDCARD)
+    nlp.vocab.add_flag(lambda text: regex.search(text) is not None, flag_id=WILDCARD_FLAG)
+    with open(RESOURCES_DIR / "patterns.json") as f:
+        template = {idiom: compile_patterns(patterns) for idiom, patterns in json.load(f).items()}
+    docs = list(nlp.pipe(sentences()))
+    for n in map(int, slops.split(",")):
+        found = {}
+        for wildcard in ("regex", "flag"):
+            # spaCy's pattern schema has no place for lexeme flags
+            idiomatcher = Idiomatcher(nlp, n, IdiomStore.open(RESOURCES_DIR / "idioms.bin"), validate=False,
+                                      prefilter={"true": True, "false": False}.get(prefilter, prefilter))
+            for idiom, patterns in template.items():
+                patterns = materialize(patterns, n)
+                idiomatcher.add(idiom, [flagged(pattern) for pattern in patterns] if wildcard == "flag" else patterns)
+            latencies, found[wildcard] = [], []
+            for doc in docs:
+                start = time.perf_counter()
+                found[wildcard].append(idiomatcher.find_matches(doc))
+                latencies.append(time.perf_counter() - start)
+            logger.info(
+                f"{wildcard}, n={n}: per-doc latency mean {statistics.mean(latencies) * 1000:.2f}ms / "
+                f"median {statistics.median(latencies) * 1000:.2f}ms over {len(docs)} docs"
+            )
+        assert found["regex"] == found["flag"], f"the wildcards matched differently at n={n}"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+"""
+The workload to benchmark with: the example sentences of the bundled idioms.
+"""
+import yaml
+from idiomatch.configs import RESOURCES_DIR
+
+
+def sentences() -> list[str]:
+    """Collect the example sentences of all the senses in idioms.yml."""
+    with open(RESOURCES_DIR / "idioms.yml") as f:
+        idioms_data = yaml.safe_load(f)
+    return [
+        example
+        for idiom_data in idioms_data
+        for sense in idiom_data["senses"]
+        for example in sense["examples"]
+    ]
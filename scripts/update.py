@@ -1,21 +1,21 @@
 import json
-from langcodes import Language
 import spacy
 import yaml
 import glob
-import pandas as pd
 from pathlib import Path
-from idiomatch.builders import build, add_special_tok_cases
-from idiomatch.configs import RESOURCES_DIR, NLP_MODEL
+from idiomatch.builders import build, add_special_tok_cases, to_template, manifest, normalize, lint, dedupe, sharing
+from idiomatch.configs import RESOURCES_DIR, NLP_MODEL, COMPLEXITY_BUDGET
 from idiomatch import Idiom, Sense
+from idiomatch.store import IdiomStore
 from loguru import logger
-import concurrent.futures
 import click
 from tqdm import tqdm
 
 
 def upidioms():
     """Update idioms.yml file with new idioms."""
+    # only needed to read the lexicon, so that updating the patterns doesn't require it
+    import pandas as pd
     # Load the source information from idiomLexicon.tsv
     lexicon_path = Path("scripts/corpus/slide/idiomLexicon.tsv")
     lexicon_df = pd.read_csv(lexicon_path, sep='\t')
@@ -110,50 +110,68 @@ def upidioms():
         yaml.dump([idiom.model_dump() for idiom in idioms], f, allow_unicode=True)
     
     logger.info(f"Successfully saved {len(idioms)} idioms to {out_path}")
+    # the store the matcher loads the idioms from
+    store_path = RESOURCES_DIR / "idioms.bin"
+    IdiomStore.from_idioms(idioms).to_disk(store_path)
+    logger.info(f"Successfully saved the idiom store to {store_path}")
 
 
-def uppatterns():
-    """Update all pattern files with different SLOP values."""
-    def build_and_save(n: int, lemmas: list[str], nlp: Language):
-        """Build patterns with the specified slop value and save them to a file."""
-        logger.info(f"Building patterns with SLOP={n}")
-        patterns = build(lemmas, nlp, n)
-        # Save to a JSON file with the slop value in the filename
-        out_path = RESOURCES_DIR / f"slop_{n}.json"
-        with open(out_path, 'w') as f:
-            json.dump(patterns, f, indent=2)
-        logger.info(f"Successfully saved idiom patterns with SLOP={n} to {out_path}")
-        return n
-    # Load idioms
-    with open(RESOURCES_DIR / "idioms.yml") as f:
-        idioms_data = yaml.safe_load(f)
-    idioms = [Idiom(**d) for d in idioms_data]
-    lemmas = [idiom.lemma for idiom in idioms]
-    # Load NLP model
-    nlp = spacy.load(NLP_MODEL)
-    # Build patterns with different SLOP values (1-5) in parallel
-    logger.info("Starting parallel build of patterns with different SLOP values")
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        # Submit all tasks
-        future_to_slop = {
-            executor.submit(build_and_save, n, lemmas, nlp): n
-            for n in range(1, 6)
-        }
-        # Process results as they complete
-        for future in concurrent.futures.as_completed(future_to_slop):
-            n = future_to_slop[future]
-            try:
-                future.result()
-            except Exception as e:
-                logger.error(f"Error building patterns with SLOP={n}: {e}")
+def uppatterns(batch_size: int, n_process: int, full: bool, max_slop: int, budget: int):
+    """
+    Update the template of patterns, which from_pretrained fills in with any slop value.
+    Only the idioms whose inputs changed since the last update (see builders.manifest) are rebuilt,
+    unless full is set. Fails if any pattern filled in with max_slop is more complex than the budget
+    (see builders.complexity).
+    """
+    # the lemmas are all it takes, so there's no need to parse idioms.yml
+    lemmas = IdiomStore.open(RESOURCES_DIR / "idioms.bin").lemmas()
+    out_path = RESOURCES_DIR / "patterns.json"
+    manifest_path = RESOURCES_DIR / "patterns.manifest.json"
+    hashes = manifest(lemmas, f"{NLP_MODEL}={spacy.util.get_package_version(NLP_MODEL)}")
+    template, built = {}, {}
+    if not full and out_path.exists() and manifest_path.exists():
+        with open(out_path) as f:
+            template = json.load(f)
+        with open(manifest_path) as f:
+            built = json.load(f)
+    stale = [lemma for lemma in lemmas if lemma not in template or built.get(lemma) != hashes[lemma]]
+    logger.info(f"Rebuilding the patterns of {len(stale)} of {len(lemmas)} idioms "
+                f"(dropping {len(template.keys() - set(lemmas))})")
+    if stale:
+        # the parser and the ner set nothing the builders read
+        nlp = spacy.load(NLP_MODEL, exclude=["parser", "ner"])
+        # the wildcards are replaced with empty slots, so a single build serves every slop value
+        rebuilt = to_template(build(stale, nlp, 1, batch_size, n_process), 1)
+        template.update({
+            lemma: dedupe([normalize(pattern) for pattern in patterns])
+            for lemma, patterns in rebuilt.items()
+        })
+    # splice the rebuilt patterns in, in the order of the idioms
+    patterns = {lemma: template[lemma] for lemma in lemmas}
+    logger.info(f"Shared across idioms: {sharing(patterns)}")
+    over = lint(patterns, max_slop, budget)
+    for lemma, i, score in over:
+        logger.error(f"Pattern {i} of '{lemma}' has a complexity of {score} with SLOP={max_slop}")
+    if over:
+        raise click.ClickException(f"{len(over)} patterns exceed the complexity budget of {budget}")
+    with open(out_path, 'w') as f:
+        json.dump(patterns, f, separators=(",", ":"))
+    with open(manifest_path, 'w') as f:
+        json.dump(hashes, f, separators=(",", ":"), ensure_ascii=False)
+    logger.info(f"Successfully saved the patterns of {len(patterns)} idioms to {out_path}")
 
 
 @click.command()
 @click.argument('target', type=click.Choice(['idioms', 'patterns'], case_sensitive=False))
-def main(target):
+@click.option('--batch-size', default=256, help="The number of lemmas to tag at a time (patterns only)")
+@click.option('--n-process', default=1, help="The number of processes to tag the lemmas with (patterns only)")
+@click.option('--full', is_flag=True, help="Rebuild the patterns of every idiom, changed or not (patterns only)")
+@click.option('--max-slop', default=5, help="The slop value to check the complexity of the patterns with (patterns only)")
+@click.option('--budget', default=COMPLEXITY_BUDGET, help="The complexity no pattern may exceed (patterns only)")
+def main(target, batch_size, n_process, full, max_slop, budget):
     """Update either idioms or patterns based on the target argument."""
     if target == 'patterns':
-        uppatterns()
+        uppatterns(batch_size, n_process, full, max_slop, budget)
     else:  # target == 'idioms'
         upidioms()
 
@@ -0,0 +1,55 @@
+"""
+Fixtures shared by the tests.
+"""
+import pytest
+from idiomatch import Idiomatcher, configs
+from idiomatch import idiomatcher as idiomatcher_module
+from idiomatch.idiomatcher import GAPS, SPACY, TRIE
+from idiomatch.store import IdiomStore
+
+# how each backend finds the matches: (prefilter, engine), as from_pretrained takes them
+BACKENDS = {
+    "none": (False, SPACY),
+    "anchors": (True, SPACY),
+    "trie": (TRIE, SPACY),
+    "gaps": (False, GAPS),
+}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cache_dir(tmp_path_factory):
+    """Keep the snapshots from_pretrained caches out of the home directory of whoever runs the tests."""
+    path = tmp_path_factory.mktemp("idiomatch_cache")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        # the env var, for the processes the tests start, and the paths already read from it
+        monkeypatch.setenv("IDIOMATCH_CACHE_DIR", str(path))
+        monkeypatch.setattr(configs, "CACHE_DIR", path)
+        monkeypatch.setattr(idiomatcher_module, "CACHE_DIR", path)
+        yield path
+
+
+@pytest.fixture(scope="session")
+def examples() -> list[str]:
+    """The examples of the senses of the bundled idioms."""
+    return [
+        example
+        for idiom in IdiomStore.open(configs.RESOURCES_DIR / "idioms.bin")
+        for sense in idiom.senses
+        for example in sense.examples
+    ]
+
+
+@pytest.fixture(scope="session")
+def full_idiomatcher() -> Idiomatcher:
+    """The matcher that evaluates every pattern with spaCy's Matcher, which the other backends must agree with."""
+    return Idiomatcher.from_pretrained(n=3, prefilter=False)
+
+
+@pytest.fixture(scope="module", params=list(BACKENDS))
+def backend(request, full_idiomatcher: Idiomatcher) -> Idiomatcher:
+    """
+    A matcher of the patterns of full_idiomatcher, on its nlp, for each backend in BACKENDS, or for those a test
+    picks with indirect parametrization, e.g. @pytest.mark.parametrize("backend", ["trie"], indirect=True)
+    """
+    prefilter, engine = BACKENDS[request.param]
+    return Idiomatcher.from_bytes(full_idiomatcher.to_bytes(), full_idiomatcher.nlp, prefilter, engine=engine)
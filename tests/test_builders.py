@@ -1,11 +1,14 @@
 import pytest
 import spacy
 from spacy.matcher import Matcher
+from idiomatch import builders
 from idiomatch.builders import (
     add_special_tok_cases,
-    slop, reorder, openslot, openslot_passive, hyphenated, build
+    slop, reorder, openslot, openslot_passive, hyphenated, build,
+    compile_spec, compile_patterns, to_template, materialize, manifest,
+    bounds, normalize, complexity, lint, wildcard, dedupe, sharing
 )
-from idiomatch.configs import NLP_MODEL
+from idiomatch.configs import NLP_MODEL, LEMMA_EXTENSION
 
 
 SLOP = 1
@@ -203,3 +206,135 @@ def test_openslot_passive_2(nlp):
     ]
     assert lemma in strings
 
+
+def test_compile_spec():
+    assert compile_spec({"LEMMA": {"REGEX": "(?i)^Take$"}}) == {"_": {LEMMA_EXTENSION: "take"}}
+    assert compile_spec({"TEXT": {"REGEX": "(?i)^Catch$"}}) == {"LOWER": "catch"}
+    # anything that is not a plain literal is left as is
+    assert compile_spec({"LEMMA": {"REGEX": "(?i)^...$"}}) == {"LEMMA": {"REGEX": "(?i)^...$"}}
+    assert compile_spec({"TAG": "PRP$"}) == {"TAG": "PRP$"}
+    assert compile_spec({"TEXT": "-", "OP": "?"}) == {"TEXT": "-", "OP": "?"}
+
+
+@pytest.mark.parametrize("sent", [
+    "He called my blatant bluff",
+    "my bluff was called by her.",
+    "This is a Catch 22 situation",
+    "That was one balls-out street race!",
+    "they were teaching me a lesson for daring to complain.",
+])
+def test_compile_patterns_same_matches(nlp, sent):
+    lemmas = ["call someone's bluff", "Catch-22", "balls-out", "teach someone a lesson"]
+    lemma2patterns = build(lemmas, nlp, 3)
+    matcher = Matcher(nlp.vocab)
+    compiled = Matcher(nlp.vocab)
+    for lemma, patterns in lemma2patterns.items():
+        matcher.add(lemma, patterns)
+        compiled.add(lemma, compile_patterns(patterns))
+    doc = nlp(sent)
+    assert matcher(doc)
+    assert sorted(compiled(doc)) == sorted(matcher(doc))
+
+
+@pytest.mark.parametrize("n", [1, 3, 7])
+def test_template_materialize(nlp, n):
+    lemmas = ["call someone's bluff", "Catch-22", "teach someone a lesson"]
+    template = to_template(build(lemmas, nlp, 1), 1)
+    # the template is the same whatever slop value it is built with
+    assert to_template(build(lemmas, nlp, n), n) == template
+    assert {lemma: materialize(patterns, n) for lemma, patterns in template.items()} == build(lemmas, nlp, n)
+    assert {lemma: materialize(compile_patterns(patterns), n) for lemma, patterns in template.items()} == \
+        {lemma: compile_patterns(patterns) for lemma, patterns in build(lemmas, nlp, n).items()}
+
+
+def test_build_n_process(nlp):
+    lemmas = ["call someone's bluff", "Catch-22", "teach someone a lesson", "open the floodgates"]
+    assert build(lemmas, nlp, SLOP, batch_size=1, n_process=2) == build(lemmas, nlp, SLOP)
+
+
+def test_manifest():
+    lemmas = ["call someone's bluff", "Catch-22"]
+    hashes = manifest(lemmas, "en_core_web_sm=3.8.0")
+    assert list(hashes) == lemmas
+    assert len(set(hashes.values())) == 2
+    # the same inputs give the same hashes, and a change of model rebuilds every idiom
+    assert manifest(lemmas[:1], "en_core_web_sm=3.8.0") == {lemmas[0]: hashes[lemmas[0]]}
+    assert not set(manifest(lemmas, "en_core_web_sm=3.8.1").values()) & set(hashes.values())
+
+
+def test_manifest_builders_version(monkeypatch):
+    lemmas = ["call someone's bluff"]
+    hashes = manifest(lemmas, "en_core_web_sm=3.8.0")
+    # only a new version of the builders rebuilds every idiom, not any edit of builders.py
+    monkeypatch.setattr(builders, "BUILDERS_VERSION", builders.BUILDERS_VERSION + 1)
+    assert manifest(lemmas, "en_core_web_sm=3.8.0") != hashes
+
+
+def test_bounds():
+    assert bounds("1") == (1, 1)
+    assert bounds("?") == (0, 1)
+    assert bounds("*") == (0, None)
+    assert bounds("{0,3}") == (0, 3)
+    assert bounds("{2}") == (2, 2)
+    assert bounds("{2,}") == (2, None)
+    assert bounds("!") is None
+
+
+def test_normalize():
+    take, comma = {"LEMMA": "take"}, {"TEXT": ",", "OP": "?"}
+    assert normalize([take, None, None, None, take]) == [take, 3, take]
+    assert normalize([None, take, None]) == [None, take, None]
+    assert normalize([take, comma, comma, take]) == [take, {"TEXT": ",", "OP": "{0,2}"}, take]
+    assert normalize([take, comma, {"TEXT": ",", "OP": "*"}]) == [take, {"TEXT": ",", "OP": "*"}]
+    # the specs that are required are left as they are
+    assert normalize([take, take]) == [take, take]
+    assert normalize([]) == []
+    assert materialize([[take, 3, take]], 2) == [[take, wildcard(6), take]]
+
+
+@pytest.mark.parametrize("sent", [
+    "He called my blatant bluff",
+    "my bluff was called by her.",
+    "This is a Catch 22 situation",
+    "they were teaching me a lesson for daring to complain.",
+    "Our lesson was taught, as it were, by them",
+])
+def test_normalize_same_matches(nlp, sent):
+    lemmas = ["call someone's bluff", "Catch-22", "teach someone a lesson"]
+    template = to_template(build(lemmas, nlp, 1), 1)
+    matcher = Matcher(nlp.vocab)
+    normalized = Matcher(nlp.vocab)
+    for lemma, patterns in template.items():
+        matcher.add(lemma, materialize(patterns, 3))
+        normalized.add(lemma, materialize([normalize(pattern) for pattern in patterns], 3))
+    doc = nlp(sent)
+    assert sorted(normalized(doc)) == sorted(matcher(doc))
+
+
+def test_complexity():
+    take = {"LEMMA": "take"}
+    assert complexity([take, take]) == 1
+    assert complexity([take, wildcard(3), take]) == 3
+    # merged or not, a run of optional tokens is as complex
+    assert complexity([take, wildcard(3), wildcard(3), take]) == complexity([take, wildcard(6), take]) == 20
+    assert complexity([take, wildcard(3), take, wildcard(2), take]) == 3
+    assert complexity([take, {"TEXT": ",", "OP": "*"}, take]) == 1
+
+
+def test_lint():
+    take = {"LEMMA": "take"}
+    template = {"take": [[take, None, take]], "take take": [[take, 3, take], [take, take]]}
+    assert lint(template, 1, 1) == [("take take", 0, 3)]
+    assert lint(template, 2, 1) == [("take take", 0, 20), ("take", 0, 2)]
+    assert lint(template, 5, 10 ** 9) == []
+
+
+def test_dedupe():
+    take, slot = {"LEMMA": "take"}, None
+    assert dedupe([[take, 2, take], [take, slot, take], [take, 2, take]]) == [[take, 2, take], [take, slot, take]]
+
+
+def test_sharing():
+    take, stand = {"LEMMA": "take"}, {"LEMMA": "stand"}
+    template = {"take a stand": [[take, 2, stand]], "take stand": [[take, 2, stand]], "take": [[take]]}
+    assert sharing(template) == {"patterns": 3, "unique": 2, "shared": 2, "specs": 7, "prefix_nodes": 3}
@@ -0,0 +1,99 @@
+"""
+Testing if the match cache evicts the least recently used texts and counts its hits, misses and evictions.
+"""
+import numpy as np
+import pytest
+from idiomatch.cache import MatchCache, Memo, sizeof
+
+
+def matches(idiom: str) -> list[dict]:
+    return [{"idiom": idiom, "span": idiom, "meta": (1, 0, 3)}]
+
+
+def test_hits_and_misses():
+    cache = MatchCache()
+    key = cache.key("piece of cake", 1, True, "dicts")
+    assert cache.get(key) is None
+    cache.put(key, matches("piece of cake"), cache.generation)
+    assert cache.get(key) == matches("piece of cake")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_key_settings():
+    # the same text matched with another slop value, greedy policy, output or sentence mode has matches of its own
+    keys = {
+        MatchCache.key("break a leg!", 1, True, "dicts"),
+        MatchCache.key("break a leg!", 2, True, "dicts"),
+        MatchCache.key("break a leg!", 1, False, "dicts"),
+        MatchCache.key("break a leg!", 1, True, "array"),
+        MatchCache.key("break a leg!", 1, True, "dicts", within_sentences=True),
+    }
+    assert len(keys) == 5
+
+
+def test_evict_least_recently_used():
+    cache = MatchCache(max_entries=2)
+    a, b, c = (cache.key(text, 1, True, "dicts") for text in "abc")
+    cache.put(a, matches("a"), cache.generation)
+    cache.put(b, matches("b"), cache.generation)
+    cache.get(a)  # b is now the least recently used
+    cache.put(c, matches("c"), cache.generation)
+    assert cache.get(b) is None
+    assert cache.get(a) is not None and cache.get(c) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_evict_by_bytes():
+    size = sizeof(matches("a"))
+    cache = MatchCache(max_bytes=2 * size)
+    for text in "abcd":
+        cache.put(cache.key(text, 1, True, "dicts"), matches(text), cache.generation)
+    assert len(cache) == 2
+    assert cache.stats()["bytes"] <= 2 * size
+
+
+def test_clear_drops_stale_matches():
+    cache = MatchCache()
+    key = cache.key("piece of cake", 1, True, "dicts")
+    generation = cache.generation
+    cache.clear()  # e.g. idioms were added while the text was being matched
+    cache.put(key, matches("piece of cake"), generation)
+    assert cache.get(key) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_copies():
+    cache = MatchCache()
+    key = cache.key("piece of cake", 1, True, "array")
+    array = np.zeros(2, dtype=np.int32)
+    cache.put(key, array, cache.generation)
+    array[0] = 1
+    cached = cache.get(key)
+    assert cached.tolist() == [0, 0]
+    cached[1] = 1
+    assert cache.get(key).tolist() == [0, 0]
+
+
+def test_empty_cache():
+    with pytest.raises(ValueError):
+        MatchCache(max_entries=0)
+
+
+def test_memo_evicts_least_recently_used():
+    memo, calls = Memo(max_entries=2), []
+
+    def square(key: int) -> int:
+        calls.append(key)
+        return key * key
+
+    assert memo.lookup([1, 2, 1], square) == {1: 1, 2: 4}
+    assert memo.lookup([1, 3], square) == {1: 1, 3: 9}
+    # 2 was the least recently used
+    assert memo.lookup([2], square) == {2: 4}
+    assert sorted(calls[:2]) == [1, 2] and calls[2:] == [3, 2]
+    assert len(memo) == 2 and memo.evictions == 2
+    # the values of all the keys of a lookup are returned, even past the bound
+    assert memo.lookup([4, 5, 6], square) == {4: 16, 5: 25, 6: 36}
+    with pytest.raises(ValueError):
+        Memo(max_entries=0)
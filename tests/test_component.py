@@ -0,0 +1,41 @@
+"""
+Testing the Idiomatcher as a spaCy pipeline component.
+"""
+import pytest
+import spacy
+from idiomatch import Idiomatcher
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    nlp = Idiomatcher.from_pretrained().nlp
+    nlp.add_pipe("idiomatcher")
+    nlp.initialize()
+    return nlp
+
+
+SENTS = [
+    "The floodgates will remain opened for a host of new lawsuits.",
+    "He called my blatant bluff",
+    "I walked up to him and said hello.",
+]
+
+
+def spans(docs) -> list[list[tuple[str, int, int]]]:
+    return [[(span.label_, span.start, span.end) for span in doc.spans["idioms"]] for doc in docs]
+
+
+def test_doc_spans(nlp):
+    doc = nlp(SENTS[0])
+    assert [span.label_ for span in doc.spans["idioms"]] == ["open the floodgates"]
+    assert doc.spans["idioms"][0].text == "The floodgates will remain opened"
+
+
+def test_to_disk_spacy_load(nlp, tmp_path):
+    nlp.to_disk(tmp_path / "pipeline")
+    loaded = spacy.load(tmp_path / "pipeline")
+    assert spans(loaded.pipe(SENTS)) == spans(nlp.pipe(SENTS))
+
+
+def test_pipe_n_process(nlp):
+    assert spans(nlp.pipe(SENTS, n_process=2)) == spans(nlp.pipe(SENTS))
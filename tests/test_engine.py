@@ -0,0 +1,119 @@
+"""
+Testing if the gap engine finds exactly what spaCy's Matcher finds, on docs built without a model.
+"""
+import random
+from functools import partial
+import pytest
+import spacy
+from spacy.matcher import Matcher
+from spacy.tokens import Doc
+from idiomatch import engine as engine_module
+from idiomatch.builders import materialize
+from idiomatch.cache import Memo
+from idiomatch.engine import GapMatcher, Unsupported, predicates
+
+
+WORDS = ["he", "called", "my", "blatant", "bluff", ",", "the", "Floodgates", "opened", "."]
+LEMMAS = ["he", "call", "my", "blatant", "bluff", ",", "the", "floodgate", "open", "."]
+TAGS = ["PRP", "VBD", "PRP$", "JJ", "NN", ",", "DT", "NNS", "VBD", "."]
+POS = ["PRON", "VERB", "PRON", "ADJ", "NOUN", "PUNCT", "DET", "NOUN", "VERB", "PUNCT"]
+
+TEMPLATE = {
+    "call someone's bluff": [[
+        {"LEMMA": {"REGEX": "(?i)^call$"}}, None, {"TAG": "PRP$"}, None, {"LOWER": "bluff"},
+    ]],
+    "open the floodgates": [[
+        {"LOWER": "the", "OP": "?"}, {"LEMMA": {"REGEX": "(?i)^floodgate$"}},
+        None, {"LEMMA": {"REGEX": "(?i)^open$"}},
+    ]],
+}
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    return spacy.blank("en")
+
+
+@pytest.fixture(scope="module")
+def doc(nlp) -> Doc:
+    return Doc(nlp.vocab, words=WORDS, lemmas=LEMMAS, tags=TAGS, pos=POS)
+
+
+def matchers(nlp, patterns: dict[str, list[list[dict]]]) -> tuple[Matcher, GapMatcher]:
+    matcher, engine = Matcher(nlp.vocab, validate=False), GapMatcher(nlp.vocab)
+    for key, key_patterns in patterns.items():
+        matcher.add(key, key_patterns)
+        engine.add(key, key_patterns)
+    return matcher, engine
+
+
+@pytest.mark.parametrize("n", [1, 2, 3])
+def test_same_matches(nlp, doc: Doc, n: int):
+    matcher, engine = matchers(nlp, {key: materialize(patterns, n) for key, patterns in TEMPLATE.items()})
+    assert sorted(engine(doc)) == sorted(matcher(doc))
+    assert len(engine(doc)) > 0
+    # on spans, the offsets are relative to the span
+    span = doc[1:9]
+    assert sorted(engine(span)) == sorted(matcher(span))
+
+
+def test_same_matches_operators(nlp):
+    random.seed(0)
+    words = list("abcd")
+    operators = ["1", "?", "*", "+", "!", "{0,2}", "{1,3}", "{2}", "{2,}"]
+
+    def spec() -> dict:
+        chance = random.random()
+        if chance < 0.6:
+            value = random.choice(words)
+        elif chance < 0.8:
+            value = {"IN": random.sample(words, 2)}
+        else:
+            value = {"NOT_IN": random.sample(words, 2)}
+        return {"LOWER": value, "OP": random.choice(operators)}
+
+    for _ in range(300):
+        patterns = [[spec() for _ in range(random.randint(1, 4))] for _ in range(3)]
+        matcher, engine = matchers(nlp, {"key": patterns})
+        doc = nlp(" ".join(random.choice(words + ["A", "B"]) for _ in range(random.randint(1, 9))))
+        assert sorted(engine(doc)) == sorted(matcher(doc)), patterns
+
+
+def test_remove(nlp, doc: Doc):
+    matcher, engine = matchers(nlp, {key: materialize(patterns, 1) for key, patterns in TEMPLATE.items()})
+    engine.remove("open the floodgates", materialize(TEMPLATE["open the floodgates"], 1))
+    assert {nlp.vocab.strings[match_id] for match_id, _, _ in engine(doc)} == {"call someone's bluff"}
+    assert len(engine) == 1
+
+
+def test_unsupported(nlp, doc: Doc):
+    with pytest.raises(Unsupported):
+        predicates({"MORPH": "Number=Sing"}, nlp.vocab)
+    # left to the Matcher, with the same matches
+    patterns = {"bluff": [[{"MORPH": {"IS_SUPERSET": []}}, {"LOWER": "bluff"}]]}
+    matcher, engine = matchers(nlp, patterns)
+    assert engine(doc) == matcher(doc)
+    assert engine.stats()["fallback"] == 1
+
+
+def test_missing_annotation(nlp):
+    matcher, engine = matchers(nlp, {"bluff": [[{"TAG": "PRP$"}, {"LOWER": "bluff"}]]})
+    with pytest.raises(ValueError):
+        engine(nlp("my bluff"))
+
+
+def test_other_vocab(nlp, doc: Doc):
+    matcher, engine = matchers(nlp, {key: materialize(patterns, 3) for key, patterns in TEMPLATE.items()})
+    # tagged upstream, on a vocab of its own
+    other = Doc(spacy.blank("en").vocab, words=WORDS, lemmas=LEMMAS, tags=TAGS, pos=POS)
+    assert sorted(engine(other)) == sorted(matcher(doc))
+
+
+def test_memos_bounded(nlp, doc: Doc, monkeypatch):
+    monkeypatch.setattr(engine_module, "Memo", partial(Memo, max_entries=5))
+    matcher, engine = matchers(nlp, {key: materialize(patterns, 3) for key, patterns in TEMPLATE.items()})
+    # a stream of texts with ever new lemmas
+    for i in range(20):
+        engine(Doc(nlp.vocab, words=WORDS, lemmas=[f"{lemma}{i}" for lemma in LEMMAS], tags=TAGS, pos=POS))
+    assert engine.regexes and all(len(memo) <= 5 for memo in engine.regexes.values())
+    assert sorted(engine(doc)) == sorted(matcher(doc))
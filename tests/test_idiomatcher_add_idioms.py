@@ -46,6 +46,15 @@ def test_add_idioms_duplicate(idiomatcher):
             }]
         }])
 
+
+def test_add_idioms_repeated(idiomatcher):
+    idiom = {"lemma": "repeated idiom", "senses": [{"content": "Test content", "examples": ["Test example"]}]}
+    with pytest.raises(ValueError, match="The following idioms appear more than once: repeated idiom"):
+        idiomatcher.add_idioms([idiom, idiom])
+    # nothing of the batch is added
+    assert "repeated idiom" not in idiomatcher.idioms
+
+
 def test_add_idioms_wrong_format(idiomatcher):
     with pytest.raises(ValueError):
         # a sense is missing content
@@ -55,3 +64,38 @@ def test_add_idioms_wrong_format(idiomatcher):
                 "examples": ["I walked up to John and said hello."]
             }]
         }])
+
+
+def test_remove_idioms(idiomatcher):
+    if "walk up to someone" not in idiomatcher.idioms:
+        idiomatcher.add_idioms([{
+            "lemma": "walk up to someone",
+            "senses": [{"content": "...", "examples": ["..."]}]
+        }])
+    doc = idiomatcher.nlp("I walked up to him and said hello.")
+    assert [match["idiom"] for match in idiomatcher(doc)] == ["walk up to someone"]
+    idiomatcher.remove_idioms(["walk up to someone"])
+    assert "walk up to someone" not in idiomatcher.idioms
+    assert idiomatcher(doc) == []
+    assert idiomatcher.match_text("I walked up to him and said hello.") == []
+    # the bundled idioms are matched as before
+    doc = idiomatcher.nlp("The floodgates will remain opened for a host of new lawsuits.")
+    assert [match["idiom"] for match in idiomatcher(doc)] == ["open the floodgates"]
+
+
+def test_remove_idioms_missing(idiomatcher):
+    with pytest.raises(ValueError, match="The following idioms don't exist in the matcher: not an idiom"):
+        idiomatcher.remove_idioms(["not an idiom"])
+
+
+def test_add_idioms_bulk(idiomatcher):
+    lemmas = [f"bulk idiom number {word}" for word in ("one", "two", "three", "four", "five")]
+    idiomatcher.add_idioms([
+        {"lemma": lemma, "senses": [{"content": "...", "examples": []}]}
+        for lemma in lemmas
+    ], batch_size=2)
+    assert all(lemma in idiomatcher.idioms for lemma in lemmas)
+    doc = idiomatcher.nlp("That was bulk idiom number three.")
+    assert [match["idiom"] for match in idiomatcher(doc)] == ["bulk idiom number three"]
+    idiomatcher.remove_idioms(lemmas)
+    assert idiomatcher(doc) == []
@@ -0,0 +1,60 @@
+"""
+Testing if matching text tagged upstream finds what matching it with the nlp model of the matcher finds.
+"""
+import pytest
+import spacy
+from spacy.tokens import Doc, DocBin
+from idiomatch import Idiomatcher
+
+
+SENTS = [
+    "The floodgates will remain opened for a host of new lawsuits.",
+    "He called my blatant bluff. That was one balls-out street race!",
+    "This will keep all of us posted",
+]
+
+
+@pytest.fixture(scope="module")
+def idiomatcher() -> Idiomatcher:
+    return Idiomatcher.from_pretrained(n=3)
+
+
+@pytest.fixture(scope="module")
+def docs(idiomatcher: Idiomatcher) -> list[Doc]:
+    return list(idiomatcher.nlp.pipe(SENTS))
+
+
+def test_match_tokens(idiomatcher: Idiomatcher, docs: list[Doc]):
+    for doc in docs:
+        matches = idiomatcher.match_tokens(
+            [token.text for token in doc], [token.lemma_ for token in doc],
+            [token.tag_ for token in doc], [token.pos_ for token in doc],
+            spaces=[bool(token.whitespace_) for token in doc],
+        )
+        assert matches == idiomatcher(doc)
+        assert matches
+
+
+def test_match_tokens_lengths(idiomatcher: Idiomatcher):
+    with pytest.raises(ValueError):
+        idiomatcher.match_tokens(["He", "called"], ["he", "call"], ["PRP"], ["PRON", "VERB"])
+
+
+def test_other_vocab(idiomatcher: Idiomatcher, docs: list[Doc]):
+    other = spacy.blank("en")
+    for doc in docs:
+        copy = Doc(other.vocab, words=[token.text for token in doc], lemmas=[token.lemma_ for token in doc],
+                   tags=[token.tag_ for token in doc], pos=[token.pos_ for token in doc])
+        assert idiomatcher(copy) == idiomatcher(doc)
+        assert [span.label_ for span in idiomatcher(copy, output="spans")] == \
+               [span.label_ for span in idiomatcher(doc, output="spans")]
+
+
+def test_match_docbin(idiomatcher: Idiomatcher, docs: list[Doc], tmp_path):
+    docbin = DocBin(docs=docs)
+    expected = [idiomatcher(doc) for doc in docs]
+    assert [matches for _, matches in idiomatcher.match_docbin(docbin.to_bytes())] == expected
+    docbin.to_disk(tmp_path / "docs.spacy")
+    matched = list(idiomatcher.match_docbin(tmp_path / "docs.spacy", output="array"))
+    assert [doc.text for doc, _ in matched] == SENTS
+    assert [len(matches) for _, matches in matched] == [len(matches) for matches in expected]
@@ -0,0 +1,85 @@
+"""
+Testing if the async API finds what match_text finds, coalescing the texts awaited at the same time.
+"""
+import asyncio
+import pytest
+from idiomatch import Idiomatcher
+
+
+SENTS = [
+    "He called my blatant bluff",
+    "my bluff was called by her.",
+    "The floodgates will remain opened for a host of new lawsuits.",
+    "That was one balls-out street race!",
+    "Revenue grew by four percent in the third quarter.",
+]
+
+
+@pytest.fixture(scope="module")
+def idiomatcher() -> Idiomatcher:
+    idiomatcher = Idiomatcher.from_pretrained()
+    yield idiomatcher
+    if idiomatcher.batcher is not None:
+        idiomatcher.batcher.close()
+
+
+def test_amatch_same_matches(idiomatcher: Idiomatcher):
+    idiomatcher.serve(batch_size=4)
+
+    async def match() -> list:
+        return await asyncio.gather(*(idiomatcher.amatch(sent, greedy=False) for sent in SENTS * 4))
+
+    assert asyncio.run(match()) == [idiomatcher.match_text(sent, greedy=False) for sent in SENTS * 4]
+    stats = idiomatcher.batcher.stats()
+    assert stats["requests"] == len(SENTS) * 4
+    # the texts awaited at the same time are matched together
+    assert stats["batches"] < stats["requests"]
+    assert stats["batch_size"] <= 4
+
+
+def test_amatch_threads():
+    idiomatcher = Idiomatcher.from_pretrained(prefilter="trie")
+    idiomatcher.serve(n_threads=4, batch_size=1)
+    # the indexes the threads share are flushed before any of them matches
+    assert not idiomatcher.prefilter.pending and not idiomatcher.gate.pending
+
+    async def match() -> list:
+        return await asyncio.gather(*(idiomatcher.amatch(sent, greedy=False) for sent in SENTS * 4))
+
+    try:
+        assert asyncio.run(match()) == [idiomatcher.match_text(sent, greedy=False) for sent in SENTS * 4]
+    finally:
+        idiomatcher.batcher.close()
+
+
+def test_amatch_backpressure(idiomatcher: Idiomatcher):
+    idiomatcher.serve(max_pending=2)
+
+    async def match() -> list:
+        return await asyncio.gather(*(idiomatcher.amatch(sent) for sent in SENTS * 4))
+
+    # the callers wait for room in the queue instead of failing
+    assert len(asyncio.run(match())) == len(SENTS) * 4
+
+
+def test_apipe(idiomatcher: Idiomatcher):
+    idiomatcher.serve(max_pending=3)
+
+    async def texts():
+        for i, sent in enumerate(SENTS):
+            yield sent, i
+
+    async def match() -> list:
+        return [result async for result in idiomatcher.apipe(texts(), output="array")]
+
+    results = asyncio.run(match())
+    assert [context for context, _ in results] == list(range(len(SENTS)))
+    for (_, matches), sent in zip(results, SENTS):
+        assert matches.tolist() == idiomatcher.match_text(sent, output="array").tolist()
+
+
+def test_amatch_spans_from_processes(idiomatcher: Idiomatcher):
+    idiomatcher.serve(n_process=2)
+    with pytest.raises(ValueError):
+        asyncio.run(idiomatcher.amatch(SENTS[0], output="spans"))
+    idiomatcher.serve()
@@ -0,0 +1,23 @@
+"""
+Testing if every backend (the anchor prefilter, the trie, the gap engine) finds exactly what the full matcher finds,
+before and after idioms are added and removed.
+"""
+from idiomatch import Idiomatcher
+
+
+def test_same_matches(backend: Idiomatcher, full_idiomatcher: Idiomatcher, examples: list[str]):
+    for doc in backend.nlp.pipe(examples):
+        assert backend.find_matches(doc) == full_idiomatcher.find_matches(doc)
+        assert backend(doc) == full_idiomatcher(doc)
+        assert backend(doc, greedy=False) == full_idiomatcher(doc, greedy=False)
+
+
+def test_added_removed_idioms(backend: Idiomatcher):
+    backend.add_idioms([{
+        "lemma": "walk up to someone",
+        "senses": [{"content": "...", "examples": ["..."]}]
+    }])
+    doc = backend.nlp("I walked up to him and said hello.")
+    assert [match["idiom"] for match in backend(doc)] == ["walk up to someone"]
+    backend.remove_idioms(["walk up to someone"])
+    assert backend(doc) == []
@@ -0,0 +1,87 @@
+"""
+Testing if the matches of repeated texts are served from the cache, and if the cache is cleared as idioms are added.
+"""
+import pytest
+from idiomatch import Idiomatcher
+
+
+SENTS = [
+    "He called my blatant bluff",
+    "my bluff was called by her.",
+    "The floodgates will remain opened for a host of new lawsuits.",
+    "That was one balls-out street race!",
+    "Revenue grew by four percent in the third quarter.",
+]
+
+
+@pytest.fixture(scope="module")
+def idiomatcher() -> Idiomatcher:
+    return Idiomatcher.from_pretrained()
+
+
+def test_cache_same_matches(idiomatcher: Idiomatcher):
+    expected = [idiomatcher.match_text(sent, greedy=False) for sent in SENTS]
+    cache = idiomatcher.cache_matches()
+    try:
+        assert [idiomatcher.match_text(sent, greedy=False) for sent in SENTS] == expected
+        assert [idiomatcher.match_text(sent, greedy=False) for sent in SENTS] == expected
+        assert idiomatcher.match_texts(SENTS, greedy=False) == expected
+    finally:
+        idiomatcher.match_cache = None
+    stats = cache.stats()
+    assert stats["misses"] == len(SENTS)
+    assert stats["hits"] == 2 * len(SENTS)
+
+
+def test_cache_array(idiomatcher: Idiomatcher):
+    expected = idiomatcher.match_text(SENTS[2], output="array")
+    cache = idiomatcher.cache_matches()
+    try:
+        idiomatcher.match_text(SENTS[2], output="array")
+        assert idiomatcher.match_text(SENTS[2], output="array").tolist() == expected.tolist()
+    finally:
+        idiomatcher.match_cache = None
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_pipe_n_process(idiomatcher: Idiomatcher):
+    expected = [idiomatcher.match_text(sent, greedy=False) for sent in SENTS]
+    cache = idiomatcher.cache_matches()
+    try:
+        # the workers match the texts that aren't cached, and their matches are cached as they come back
+        assert [matches for _, matches in idiomatcher.pipe(SENTS, greedy=False, n_process=2)] == expected
+        assert [matches for _, matches in idiomatcher.pipe(SENTS, greedy=False, n_process=2)] == expected
+    finally:
+        idiomatcher.match_cache = None
+    stats = cache.stats()
+    assert stats["misses"] == len(SENTS)
+    assert stats["hits"] == len(SENTS)
+
+
+def test_cache_spans(idiomatcher: Idiomatcher):
+    cache = idiomatcher.cache_matches()
+    try:
+        idiomatcher.match_text(SENTS[0], output="spans")
+        idiomatcher.match_text(SENTS[0], output="spans")
+    finally:
+        idiomatcher.match_cache = None
+    # spans hold on to their docs, so they are never cached
+    assert len(cache) == 0
+
+
+def test_cache_add_idioms(idiomatcher: Idiomatcher):
+    cache = idiomatcher.cache_matches()
+    sent = "I walked up to him and said hello."
+    try:
+        assert idiomatcher.match_text(sent) == []
+        idiomatcher.add_idioms([{
+            "lemma": "walk up to someone",
+            "senses": [{
+                "content": "Walk up to someone and talk to them.",
+                "examples": ["I walked up to John and said hello."]
+            }]
+        }])
+        assert [match["idiom"] for match in idiomatcher.match_text(sent)] == ["walk up to someone"]
+    finally:
+        idiomatcher.match_cache = None
+    assert cache.stats()["invalidations"] >= 1
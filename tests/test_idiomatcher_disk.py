@@ -0,0 +1,81 @@
+"""
+Testing if the matcher can be saved and restored without rebuilding it.
+"""
+import pytest
+import spacy
+from idiomatch import Idiomatcher
+from idiomatch import idiomatcher as idiomatcher_module
+from idiomatch.configs import RESOURCES_DIR
+
+
+@pytest.fixture(scope="module")
+def idiomatcher():
+    matcher = Idiomatcher.from_pretrained(cache=False)
+    return matcher
+
+
+def test_to_disk_from_disk(idiomatcher, tmp_path):
+    path = tmp_path / "idiomatcher.msgpack"
+    idiomatcher.to_disk(path)
+    restored = Idiomatcher.from_disk(path, idiomatcher.nlp)
+    assert restored.n == idiomatcher.n
+    assert len(restored) == len(idiomatcher)
+    assert [idiom.lemma for idiom in restored.idioms] == [idiom.lemma for idiom in idiomatcher.idioms]
+    sent = "The floodgates will remain opened for a host of new lawsuits."
+    doc = idiomatcher.nlp(sent)
+    assert restored(doc) == idiomatcher(doc)
+
+
+def test_to_bytes_keeps_added_idioms(idiomatcher):
+    restored = Idiomatcher.from_bytes(idiomatcher.to_bytes(), idiomatcher.nlp)
+    restored.add_idioms([{
+        "lemma": "walk up to someone",
+        "senses": [{"content": "...", "examples": ["..."]}]
+    }])
+    again = Idiomatcher.from_bytes(restored.to_bytes(), idiomatcher.nlp)
+    doc = idiomatcher.nlp("I walked up to him and said hello.")
+    assert "walk up to someone" in [match["idiom"] for match in again(doc)]
+
+
+def test_from_pretrained_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(idiomatcher_module, "CACHE_DIR", tmp_path)
+    built = Idiomatcher.from_pretrained()
+    snapshots = list(tmp_path.glob("slop_1-*.msgpack"))
+    assert len(snapshots) == 1
+    restored = Idiomatcher.from_pretrained()
+    assert len(restored) == len(built)
+    doc = built.nlp("He called my blatant bluff")
+    assert restored(doc) == built(doc)
+
+
+def test_fingerprint_changes_with_inputs(idiomatcher, tmp_path):
+    patterns_path = tmp_path / "patterns.json"
+    patterns_path.write_bytes((RESOURCES_DIR / "patterns.json").read_bytes())
+    before = idiomatcher_module.fingerprint([patterns_path], idiomatcher.nlp, n=1)
+    assert before == idiomatcher_module.fingerprint([patterns_path], idiomatcher.nlp, n=1)
+    assert before != idiomatcher_module.fingerprint([patterns_path], idiomatcher.nlp, n=2)
+    patterns_path.write_text("{}")
+    assert before != idiomatcher_module.fingerprint([patterns_path], idiomatcher.nlp, n=1)
+
+
+def test_fingerprint_changes_with_code(tmp_path, monkeypatch):
+    nlp = spacy.blank("en")
+    patterns_path = tmp_path / "patterns.json"
+    patterns_path.write_text("{}")
+    before = idiomatcher_module.fingerprint([patterns_path], nlp, n=1)
+    # another release of idiomatch, with the same resources
+    monkeypatch.setattr(idiomatcher_module.importlib.metadata, "version", lambda name: "99.0.0")
+    assert before != idiomatcher_module.fingerprint([patterns_path], nlp, n=1)
+    monkeypatch.undo()
+    # another way of compiling or filling in the patterns, within a release
+    monkeypatch.setattr(idiomatcher_module, "BUILDERS_VERSION", idiomatcher_module.BUILDERS_VERSION + 1)
+    assert before != idiomatcher_module.fingerprint([patterns_path], nlp, n=1)
+
+
+def test_from_pretrained_without_cache(monkeypatch):
+    def fingerprint(*args, **kwargs):
+        raise AssertionError("the resources are hashed without a cache")
+
+    monkeypatch.setattr(idiomatcher_module, "fingerprint", fingerprint)
+    matcher = Idiomatcher.from_pretrained(cache=False, nlp=spacy.blank("en"))
+    assert len(matcher) > 0
@@ -0,0 +1,32 @@
+"""
+Testing the gap engine with the idioms and the nlp model
+(that it finds exactly what spaCy's Matcher finds is tested in test_idiomatcher_backends).
+"""
+import pytest
+from idiomatch import Idiomatcher
+from idiomatch.engine import GapMatcher
+
+
+@pytest.mark.parametrize("backend", ["gaps"], indirect=True)
+def test_engine_from_bytes(backend: Idiomatcher):
+    # the prefilter is not used with the engine
+    assert isinstance(backend.engine, GapMatcher) and backend.prefilter is None
+    data, prefilter, prune, engine = backend.worker_args()
+    assert engine == "gaps"
+    restored = Idiomatcher.from_bytes(data, backend.nlp, prefilter, engine=engine)
+    assert isinstance(restored.engine, GapMatcher)
+    doc = backend.nlp("He called my blatant bluff")
+    assert restored(doc) == backend(doc)
+
+
+@pytest.mark.parametrize("backend", ["gaps"], indirect=True)
+def test_engine_stats(backend: Idiomatcher):
+    backend(backend.nlp("The floodgates will remain opened for a host of new lawsuits."))
+    stats = backend.engine.stats()
+    assert stats["docs"] >= 1
+    assert stats["patterns"] == sum(len(patterns) for patterns in backend._patterns.values())
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        Idiomatcher.from_pretrained(engine="nfa")
@@ -0,0 +1,42 @@
+"""
+Testing if matching a long text a window at a time finds each match once, at its offsets in the whole text.
+"""
+import pytest
+from idiomatch import Idiomatcher
+
+
+SENTS = [
+    "The floodgates will remain opened for a host of new lawsuits.",
+    "That was one balls-out street race!",
+    "Revenue grew by four percent in the third quarter.",
+    "This is a Catch 22 situation.",
+]
+
+
+@pytest.fixture(scope="module")
+def idiomatcher() -> Idiomatcher:
+    return Idiomatcher.from_pretrained(n=3)
+
+
+@pytest.mark.parametrize("window", [5, 40, 10 ** 6])
+def test_match_long_offsets(idiomatcher: Idiomatcher, window: int):
+    text = " ".join(SENTS * 10)
+    matches = idiomatcher.match_long(text, window=window, output="array")
+    assert len(matches) == 30
+    # each match once, at its offsets in the whole text
+    assert len({(match["start"], match["end"]) for match in matches}) == len(matches)
+    doc = idiomatcher.nlp.make_doc(text)
+    for match in matches:
+        span = doc[match["start"]:match["end"]]
+        assert (span.start_char, span.end_char) == (match["start_char"], match["end_char"])
+
+
+def test_match_long_chunks(idiomatcher: Idiomatcher):
+    text = " ".join(SENTS * 10)
+    chunks = (text[i:i + 16] for i in range(0, len(text), 16))
+    assert idiomatcher.match_long(chunks, window=5) == idiomatcher.match_long(text, window=5)
+
+
+def test_match_long_spans(idiomatcher: Idiomatcher):
+    with pytest.raises(ValueError):
+        idiomatcher.match_long(SENTS[0], output="spans")
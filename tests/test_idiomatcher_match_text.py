@@ -0,0 +1,62 @@
+"""
+Testing if matching raw text (which skips the pipeline for texts without idioms) misses nothing.
+"""
+import pytest
+import spacy
+from idiomatch import Idiomatcher
+from idiomatch.configs import LEMMA_EXTENSION
+from idiomatch.prefilter import Gate
+
+
+SENTS = [
+    "Try running, you'll have blood on your hands.",
+    "in terms of rhyme, meter, and balls-out swagger.",
+    "in terms of rhyme, meter, and balls out swagger.",
+    "he gave them a blow by blow account of your rescue",
+    "they were teaching me a lesson for daring to complain.",
+    "Jo is a playwright who has always been ahead of her time",
+    "qualities attributed to the drug. It is a catch 22 for any trainer or owner.",
+    "qualities attributed to the drug. It is a Catch-22 for any trainer or owner.",
+    "He wants to get out of there something awful, but he just doesn't have the money.",
+    "I can most definitely tell you that this is a scam.",
+    "Just stop beating around the bush and tell me what the problem is!",
+    "The floodgates will remain opened for a host of new lawsuits.",
+    "my bluff was embarrassingly called by her",
+]
+
+
+@pytest.fixture(scope="module")
+def idiomatcher() -> Idiomatcher:
+    return Idiomatcher.from_pretrained(n=3)
+
+
+@pytest.mark.parametrize("sent", SENTS)
+def test_match_text(idiomatcher: Idiomatcher, sent: str):
+    matches = idiomatcher.match_text(sent)
+    assert matches
+    assert matches == idiomatcher(idiomatcher.nlp(sent))
+
+
+def test_match_text_no_false_negatives(idiomatcher: Idiomatcher, examples: list[str]):
+    for example in examples:
+        assert idiomatcher.match_text(example, greedy=False) == idiomatcher(idiomatcher.nlp(example), greedy=False)
+
+
+def test_match_text_skips_pipeline(idiomatcher: Idiomatcher):
+    skipped = idiomatcher.gate.stats()["skipped"]
+    assert idiomatcher.match_text("Revenue grew by four percent in the third quarter.") == []
+    assert idiomatcher.gate.stats()["skipped"] == skipped + 1
+
+
+def test_gate_inflects_once(monkeypatch):
+    gate = Gate(spacy.blank("en"))
+    gate.add([[{"_": {LEMMA_EXTENSION: "call"}}, {"LOWER": "bluff"}]])
+    assert gate("he called my bluff") is False
+    inflected = []
+    inflect = gate.inflect
+    monkeypatch.setattr(gate, "inflect", lambda lemma: inflected.append(lemma) or inflect(lemma))
+    # the lemmas indexed by an earlier flush are not inflected again
+    gate.add([[{"_": {LEMMA_EXTENSION: "call"}}, {"LOWER": "it"}, {"_": {LEMMA_EXTENSION: "quit"}}]])
+    assert gate("call it quits") is False
+    assert inflected == ["quit"]
+    assert gate("call it quit") is True
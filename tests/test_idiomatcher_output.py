@@ -0,0 +1,50 @@
+"""
+Testing if the spans and the array of matches agree with the dicts.
+"""
+import numpy as np
+import pytest
+from idiomatch import Idiomatcher
+from idiomatch.idiomatcher import MATCH_DTYPE
+
+
+SENTS = [
+    "The floodgates will remain opened for a host of new lawsuits.",
+    "Try running, you'll have blood on your hands.",
+    "Revenue grew by four percent in the third quarter.",
+]
+
+
+@pytest.fixture(scope="module")
+def idiomatcher() -> Idiomatcher:
+    return Idiomatcher.from_pretrained()
+
+
+@pytest.mark.parametrize("sent", SENTS)
+def test_output_spans(idiomatcher: Idiomatcher, sent: str):
+    doc = idiomatcher.nlp(sent)
+    spans = idiomatcher(doc, output="spans")
+    assert [(span.label, span.start, span.end) for span in spans] == [match["meta"] for match in idiomatcher(doc)]
+    assert [span.label_ for span in spans] == [match["idiom"] for match in idiomatcher(doc)]
+
+
+@pytest.mark.parametrize("sent", SENTS)
+def test_output_array(idiomatcher: Idiomatcher, sent: str):
+    doc = idiomatcher.nlp(sent)
+    array = idiomatcher(doc, output="array")
+    assert array.dtype == MATCH_DTYPE
+    spans = idiomatcher(doc, output="spans")
+    assert [tuple(row) for row in array.tolist()] == [
+        (span.label, span.start, span.end, span.start_char, span.end_char) for span in spans
+    ]
+
+
+def test_iter_matches(idiomatcher: Idiomatcher):
+    doc = idiomatcher.nlp(SENTS[0])
+    assert list(idiomatcher.iter_matches(doc)) == idiomatcher(doc)
+
+
+def test_match_text_no_matches(idiomatcher: Idiomatcher):
+    array = idiomatcher.match_text(SENTS[2], output="array")
+    assert isinstance(array, np.ndarray) and len(array) == 0
+    with pytest.raises(ValueError):
+        idiomatcher.match_text(SENTS[2], output="tuples")
@@ -0,0 +1,35 @@
+"""
+Testing if matching a stream of texts gives the same matches as matching them one by one.
+"""
+import pytest
+from idiomatch import Idiomatcher
+
+
+SENTS = [
+    "Try running, you'll have blood on your hands.",
+    "Revenue grew by four percent in the third quarter.",
+    "they were teaching me a lesson for daring to complain.",
+    "The floodgates will remain opened for a host of new lawsuits.",
+    "qualities attributed to the drug. It is a catch-22 for any trainer or owner.",
+] * 3
+
+
+@pytest.fixture(scope="module")
+def idiomatcher() -> Idiomatcher:
+    return Idiomatcher.from_pretrained()
+
+
+def test_pipe_texts(idiomatcher: Idiomatcher):
+    results = list(idiomatcher.pipe(SENTS, batch_size=4))
+    assert [text for text, _ in results] == SENTS
+    assert [matches for _, matches in results] == [idiomatcher(idiomatcher.nlp(sent)) for sent in SENTS]
+
+
+def test_pipe_tuples(idiomatcher: Idiomatcher):
+    results = list(idiomatcher.pipe(((sent, i) for i, sent in enumerate(SENTS)), greedy=False))
+    assert [i for i, _ in results] == list(range(len(SENTS)))
+    assert [matches for _, matches in results] == [idiomatcher(idiomatcher.nlp(sent), greedy=False) for sent in SENTS]
+
+
+def test_pipe_n_process(idiomatcher: Idiomatcher):
+    assert list(idiomatcher.pipe(SENTS, batch_size=2, n_process=2)) == list(idiomatcher.pipe(SENTS))
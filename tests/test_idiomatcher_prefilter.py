@@ -0,0 +1,18 @@
+"""
+Testing if prefiltering patterns by their anchors prunes the patterns evaluated per doc
+(that it finds exactly what the full matcher finds is tested in test_idiomatcher_backends).
+"""
+import pytest
+from idiomatch import Idiomatcher
+from idiomatch.prefilter import Prefilter
+
+
+@pytest.mark.parametrize("backend", ["anchors"], indirect=True)
+def test_prefilter_stats(backend: Idiomatcher):
+    assert isinstance(backend.prefilter, Prefilter)
+    backend(backend.nlp("The floodgates will remain opened for a host of new lawsuits."))
+    stats = backend.prefilter.stats()
+    assert stats["docs"] >= 1
+    assert stats["patterns"] == sum(len(patterns) for patterns in backend._patterns.values())
+    # a typical sentence can only contain a handful of idioms
+    assert stats["pruned"] > 0.9
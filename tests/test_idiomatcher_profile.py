@@ -0,0 +1,58 @@
+"""
+Testing if profiling finds the same matches, and attributes them to the patterns that found them.
+"""
+import pytest
+import spacy
+from idiomatch import Idiomatcher
+from idiomatch.profiler import Profiler
+
+
+SENTS = [
+    "He called my blatant bluff",
+    "my bluff was called by her.",
+    "The floodgates will remain opened for a host of new lawsuits.",
+    "That was one balls-out street race!",
+    "Revenue grew by four percent in the third quarter.",
+]
+
+
+@pytest.fixture(scope="module")
+def idiomatcher() -> Idiomatcher:
+    return Idiomatcher.from_pretrained()
+
+
+def test_profile_same_matches(idiomatcher: Idiomatcher):
+    docs = [idiomatcher.nlp(sent) for sent in SENTS]
+    expected = [idiomatcher(doc, greedy=False) for doc in docs]
+    profiler = idiomatcher.profile()
+    try:
+        assert [idiomatcher(doc, greedy=False) for doc in docs] == expected
+    finally:
+        idiomatcher.profiler = None
+    assert profiler.docs == len(SENTS)
+
+
+def test_profile_report(idiomatcher: Idiomatcher, tmp_path):
+    profiler = idiomatcher.profile()
+    try:
+        for sent in SENTS:
+            idiomatcher(idiomatcher.nlp(sent))
+    finally:
+        idiomatcher.profiler = None
+    rows = {(row["idiom"], row["variant"]): row for row in profiler.report()}
+    assert rows[("call someone's bluff", "openslot")]["matches"] >= 1
+    assert rows[("call someone's bluff", "openslot_passive")]["matches"] >= 1
+    assert rows[("open the floodgates", "default")]["matches"] == 1
+    assert rows[("balls-out", "hyphenated")]["matches"] == 1
+    # only the docs with every literal a pattern requires are candidates for it
+    assert rows[("open the floodgates", "default")]["candidates"] == 1
+    top = profiler.report(top=3)
+    assert len(top) == 3
+    assert [row["time"] for row in top] == sorted((row["time"] for row in top), reverse=True)
+    profiler.to_disk(tmp_path / "profile.json", top=3)
+    assert (tmp_path / "profile.json").exists()
+
+
+def test_profile_report_unknown_ranking():
+    with pytest.raises(ValueError, match="Must be one of time, candidates, matches"):
+        Profiler(spacy.blank("en").vocab).report(by="tme")
@@ -0,0 +1,41 @@
+"""
+Testing if disabling the components the patterns don't need leaves the matches as they are.
+"""
+import pytest
+from idiomatch import Idiomatcher
+
+
+SENTS = [
+    "Try running, you'll have blood on your hands.",
+    "in terms of rhyme, meter, and balls-out swagger.",
+    "It is a Catch-22 for any trainer or owner.",
+    "Just stop beating around the bush and tell me what the problem is!",
+    "The floodgates will remain opened for a host of new lawsuits.",
+    "my bluff was embarrassingly called by her",
+]
+
+
+@pytest.fixture(scope="module")
+def idiomatcher() -> Idiomatcher:
+    return Idiomatcher.from_pretrained()
+
+
+def test_from_pretrained_prunes(idiomatcher):
+    assert "parser" not in idiomatcher.nlp.pipe_names
+    assert "ner" not in idiomatcher.nlp.pipe_names
+    assert {"tok2vec", "tagger", "attribute_ruler", "lemmatizer"} <= set(idiomatcher.nlp.pipe_names)
+
+
+def test_same_matches_as_unpruned(idiomatcher):
+    unpruned = Idiomatcher.from_pretrained(prune=False)
+    assert "parser" in unpruned.nlp.pipe_names
+    for sent in SENTS:
+        assert idiomatcher.match_text(sent) == unpruned.match_text(sent)
+
+
+def test_add_enables_pruned_components(idiomatcher):
+    matcher = Idiomatcher.from_bytes(idiomatcher.to_bytes())
+    assert "parser" not in matcher.nlp.pipe_names
+    matcher.add("subject of sth", [[{"DEP": "nsubj"}, {"LOWER": "of"}]])
+    assert "parser" in matcher.nlp.pipe_names
+    assert "ner" not in matcher.nlp.pipe_names
@@ -0,0 +1,44 @@
+"""
+Testing if matching within sentences drops the matches across sentences only, at their offsets in the doc.
+"""
+import pytest
+from idiomatch import Idiomatcher
+
+
+SENTS = [
+    "The floodgates will remain opened for a host of new lawsuits.",
+    "He called my blatant bluff.",
+    "This is a Catch 22 situation.",
+]
+
+
+@pytest.fixture(scope="module")
+def idiomatcher() -> Idiomatcher:
+    return Idiomatcher.from_pretrained(n=3)
+
+
+def test_within_sentences_offsets(idiomatcher: Idiomatcher):
+    doc = idiomatcher.nlp(" ".join(SENTS))
+    # each sentence has an idiom of its own, found at the same offsets either way
+    assert idiomatcher(doc, within_sentences=True) == idiomatcher(doc)
+    assert len(idiomatcher(doc, within_sentences=True)) == len(SENTS)
+    array = idiomatcher(doc, output="array", within_sentences=True)
+    for match in array:
+        span = doc[match["start"]:match["end"]]
+        assert (span.start_char, span.end_char) == (match["start_char"], match["end_char"])
+
+
+def test_within_sentences_across(idiomatcher: Idiomatcher):
+    # the wildcards don't match sentence-final punctuation, but a parser may split a sentence without any
+    doc = idiomatcher.nlp("He called my blatant bluff")
+    doc[3].is_sent_start = True
+    assert [match["idiom"] for match in idiomatcher(doc)] == ["call someone's bluff"]
+    assert idiomatcher(doc, within_sentences=True) == []
+
+
+def test_within_sentences_batches(idiomatcher: Idiomatcher):
+    texts = [" ".join(SENTS), "No idiom here. Nor here."]
+    expected = [idiomatcher.match_text(text, within_sentences=True) for text in texts]
+    assert idiomatcher.match_texts(texts, within_sentences=True) == expected
+    assert [matches for _, matches in idiomatcher.pipe(texts, within_sentences=True)] == expected
+    assert len(expected[0]) == len(SENTS)
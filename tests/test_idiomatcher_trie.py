@@ -0,0 +1,33 @@
+"""
+Testing if the trie of the patterns by the literals they start with shares their prefixes
+(that it finds exactly what the full matcher finds is tested in test_idiomatcher_backends).
+"""
+import pytest
+from idiomatch import Idiomatcher
+from idiomatch.trie import PatternTrie, edge
+
+
+def test_edge():
+    assert edge({"_": {"idiomatch_lemma": "take"}}) == ("LEMMA", "take")
+    assert edge({"LEMMA": {"REGEX": "(?i)^Take$"}}) == ("LEMMA", "take")
+    assert edge({"LOWER": "catch"}) == ("LOWER", "catch")
+    # not exact, or not required
+    assert edge({"TEXT": "Catch"}) is None
+    assert edge({"LOWER": "catch", "TAG": "NN"}) is None
+    assert edge({"LOWER": "catch", "OP": "?"}) is None
+
+
+@pytest.mark.parametrize("backend", ["trie"], indirect=True)
+def test_trie_stats(backend: Idiomatcher):
+    assert isinstance(backend.prefilter, PatternTrie)
+    backend(backend.nlp("The floodgates will remain opened for a host of new lawsuits."))
+    stats = backend.prefilter.stats()
+    assert stats["docs"] >= 1
+    assert stats["patterns"] == sum(len(patterns) for patterns in backend._patterns.values())
+    # the idioms share the literals they start with
+    assert stats["nodes"] < stats["patterns"]
+
+
+def test_unknown_prefilter():
+    with pytest.raises(ValueError):
+        Idiomatcher.from_pretrained(prefilter="radix")
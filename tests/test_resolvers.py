@@ -0,0 +1,60 @@
+"""
+Testing the policies for resolving overlapping matches.
+"""
+import random
+import pytest
+from idiomatch.resolvers import resolve, LONGEST, LEFTMOST_LONGEST, ALL
+
+
+def resolve_longest(matches: list[tuple[int, int, int]]) -> list[tuple[int, int, int]]:
+    """
+    Longest-first containment, checked against every match kept so far.
+    """
+    kept = []
+    for match in sorted(matches, key=lambda match: match[2] - match[1], reverse=True):
+        if not any(match[1] >= other[1] and match[2] <= other[2] for other in kept):
+            kept.append(match)
+    return kept
+
+
+def random_matches(seed: int) -> list[tuple[int, int, int]]:
+    rng = random.Random(seed)
+    matches = set()
+    for _ in range(rng.randint(0, 40)):
+        start = rng.randint(0, 30)
+        matches.add((rng.randint(1, 5), start, start + rng.randint(1, 8)))
+    return sorted(matches, key=lambda match: (match[1], match[2], match[0]))
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_longest_same_as_containment(seed: int):
+    matches = random_matches(seed)
+    assert resolve(matches, LONGEST) == resolve_longest(matches)
+    assert resolve(matches, True) == resolve(matches, LONGEST)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_leftmost_longest_non_overlapping(seed: int):
+    matches = random_matches(seed)
+    kept = resolve(matches, LEFTMOST_LONGEST)
+    assert all(left[2] <= right[1] for left, right in zip(kept, kept[1:]))
+    # every match dropped overlaps one kept
+    for match in set(matches) - set(kept):
+        assert any(match[1] < other[2] and other[1] < match[2] for other in kept)
+
+
+def test_leftmost_longest():
+    # (id, start, end)
+    matches = [(1, 0, 2), (2, 0, 3), (3, 1, 5), (4, 3, 4), (5, 4, 6)]
+    assert resolve(matches, LEFTMOST_LONGEST) == [(2, 0, 3), (4, 3, 4), (5, 4, 6)]
+    assert resolve(matches, LONGEST) == [(3, 1, 5), (2, 0, 3), (5, 4, 6)]
+
+
+def test_all():
+    matches = random_matches(0)
+    assert resolve(matches, ALL) == resolve(matches, False) == matches
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        resolve([], "shortest")
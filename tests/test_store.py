@@ -0,0 +1,57 @@
+"""
+Testing if the idiom store gives back the idioms of idioms.yml, decoding no more than it has to.
+"""
+import tracemalloc
+import pytest
+import yaml
+from idiomatch import Idiom
+from idiomatch.configs import RESOURCES_DIR
+from idiomatch.store import IdiomStore
+
+
+@pytest.fixture(scope="module")
+def store() -> IdiomStore:
+    return IdiomStore.open(RESOURCES_DIR / "idioms.bin")
+
+
+def test_store_matches_yml(store: IdiomStore):
+    with open(RESOURCES_DIR / "idioms.yml") as f:
+        idioms_data = yaml.safe_load(f)
+    idioms = {}
+    for idiom_data in idioms_data:
+        idioms.setdefault(idiom_data["lemma"], Idiom(**idiom_data))
+    assert store.lemmas() == list(idioms)
+    for lemma, idiom in idioms.items():
+        assert store[lemma] == idiom
+
+
+def test_open_memory_budget():
+    tracemalloc.start()
+    store = IdiomStore.open(RESOURCES_DIR / "idioms.bin")
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(store) > 4000
+    # only the index of the lemmas is decoded, far less than the 1.6 MB of idioms.yml once parsed
+    assert size < 2_000_000
+
+
+def test_extend_to_bytes(store: IdiomStore):
+    added = Idiom(lemma="walk up to someone", senses=[{"content": "...", "examples": ["..."]}])
+    restored = IdiomStore(store.to_bytes())
+    restored.extend([added, restored["Catch-22"]])
+    assert len(restored) == len(store) + 1
+    again = IdiomStore(restored.to_bytes())
+    assert again.lemmas() == restored.lemmas()
+    assert again["walk up to someone"] == added
+    with pytest.raises(KeyError):
+        again["not an idiom"]
+
+
+def test_getitem_position(store: IdiomStore):
+    lemmas = store.lemmas()
+    assert store[0] == store[lemmas[0]]
+    assert store[-1] == store[lemmas[-1]]
+    assert [idiom.lemma for idiom in store[10:13]] == lemmas[10:13]
+    assert store[0] in store
+    with pytest.raises(IndexError):
+        store[len(store)]
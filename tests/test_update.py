@@ -0,0 +1,68 @@
+"""
+Testing if scripts/update.py refuses to save patterns more complex than the budget.
+"""
+import importlib.util
+import json
+import click
+import pytest
+import spacy
+from idiomatch import Idiom, Sense
+from idiomatch.builders import manifest, lint
+from idiomatch.configs import NLP_MODEL, RESOURCES_DIR, COMPLEXITY_BUDGET
+from idiomatch.store import IdiomStore
+
+
+@pytest.fixture
+def update(tmp_path, monkeypatch):
+    spec = importlib.util.spec_from_file_location("update", RESOURCES_DIR.parent.parent / "scripts" / "update.py")
+    update = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(update)
+    monkeypatch.setattr(update, "RESOURCES_DIR", tmp_path)
+    return update
+
+
+def write_resources(path, patterns: dict[str, list]):
+    """The resources of idioms whose patterns are all up to date, so that none is rebuilt."""
+    lemmas = list(patterns)
+    IdiomStore.from_idioms(
+        Idiom(lemma=lemma, senses=[Sense(content="...", examples=["..."])]) for lemma in lemmas
+    ).to_disk(path / "idioms.bin")
+    (path / "patterns.json").write_text(json.dumps(patterns))
+    hashes = manifest(lemmas, f"{NLP_MODEL}={spacy.util.get_package_version(NLP_MODEL)}")
+    (path / "patterns.manifest.json").write_text(json.dumps(hashes))
+
+
+def test_uppatterns_over_budget(update, tmp_path):
+    # a run of wildcard slots between the commas of "year in, year out"
+    write_resources(tmp_path, {
+        "year in, year out": [[{"LOWER": "year"}, None, {"LOWER": "in"}, 3, {"LOWER": "year"}, None, {"LOWER": "out"}]],
+        "take a stand": [[{"LOWER": "take"}, None, {"LOWER": "stand"}]],
+    })
+    patterns = (tmp_path / "patterns.json").read_text()
+    with pytest.raises(click.ClickException, match="1 patterns exceed"):
+        update.uppatterns(256, 1, False, 5, 1000)
+    # nothing is saved
+    assert (tmp_path / "patterns.json").read_text() == patterns
+
+
+def test_uppatterns_within_budget(update, tmp_path):
+    write_resources(tmp_path, {"take a stand": [[{"LOWER": "take"}, None, {"LOWER": "stand"}]]})
+    update.uppatterns(256, 1, False, 5, 1000)
+    assert json.loads((tmp_path / "patterns.json").read_text()) == {
+        "take a stand": [[{"LOWER": "take"}, None, {"LOWER": "stand"}]]
+    }
+
+
+def test_bundled_patterns_within_budget():
+    with open(RESOURCES_DIR / "patterns.json") as f:
+        template = json.load(f)
+    assert lint(template, 5, COMPLEXITY_BUDGET) == []
+    # the budget is tight enough that one more wildcard slot in the worst of them goes over it
+    assert lint(template, 6, COMPLEXITY_BUDGET)
+
+
+def test_bundled_manifest():
+    # the manifest is committed along with the patterns, so that a fresh checkout only rebuilds what changed
+    lemmas = IdiomStore.open(RESOURCES_DIR / "idioms.bin").lemmas()
+    with open(RESOURCES_DIR / "patterns.manifest.json") as f:
+        assert json.load(f) == manifest(lemmas, "en_core_web_sm=3.8.0")
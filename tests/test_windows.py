@@ -0,0 +1,67 @@
+"""
+Testing if the windows of a long text cover it exactly, whatever chunks it streams in.
+"""
+import pytest
+import spacy
+from spacy.tokens import Doc
+from idiomatch.windows import MAX_SENTENCE, sentences, windows, sentence_bounds
+
+
+TEXT = "He called my blatant bluff. Did he?  She opened the floodgates!\n\nThat was one balls-out street race " * 20
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, len(TEXT)])
+def test_sentences(chunk_size: int):
+    chunks = [TEXT[i:i + chunk_size] for i in range(0, len(TEXT), chunk_size)]
+    split = list(sentences(chunks))
+    assert "".join(sentence for _, sentence in split) == TEXT
+    assert all(TEXT[offset:offset + len(sentence)] == sentence for offset, sentence in split)
+    assert split[0][1] == "He called my blatant bluff. "
+
+
+def test_sentences_without_whitespace():
+    # e.g. a dump of a minified file, which has neither sentence ends nor whitespace
+    text = "call,bluff," * 5000
+    chunks = [text[i:i + 1000] for i in range(0, len(text), 1000)]
+    for tokenizer in (None, spacy.blank("en").tokenizer):
+        split = list(sentences(chunks, tokenizer))
+        assert "".join(sentence for _, sentence in split) == text
+        assert all(len(sentence) <= MAX_SENTENCE for _, sentence in split)
+    # the cuts fall where the tokenizer ends a token
+    ends = {token.idx + len(token) for token in tokenizer(text)}
+    assert len(split) > 1 and all(offset + len(sentence) in ends for offset, sentence in split)
+
+
+@pytest.mark.parametrize("size,overlap", [(1, 0), (5, 3), (40, 12), (10 ** 6, 5)])
+def test_windows(size: int, overlap: int):
+    split = list(windows([TEXT], size, overlap))
+    position = 0
+    for i, (offset, text, own) in enumerate(split):
+        assert offset == position
+        assert TEXT[offset:offset + len(text)] == text
+        if i < len(split) - 1:
+            assert len(text[:own].split()) >= size
+            assert len(text[own:].split()) >= overlap
+        position += own
+    # the parts the windows own add up to the text
+    assert position == len(TEXT)
+
+
+def test_windows_size():
+    with pytest.raises(ValueError):
+        list(windows([TEXT], 0, 5))
+
+
+def test_sentence_bounds():
+    nlp = spacy.blank("en")
+    # without sentence boundaries, split after the punctuation
+    doc = nlp("He called my blatant bluff. Did he?  She opened the floodgates!")
+    bounds = sentence_bounds(doc)
+    assert [doc[start:end].text for start, end in bounds] == [
+        "He called my blatant bluff.", "Did he?", " She opened the floodgates!"
+    ]
+    assert not doc.has_annotation("SENT_START")
+    # with them, as they are set
+    doc = Doc(nlp.vocab, words=["He", "called", ".", "She", "did"], sent_starts=[True, False, False, False, False])
+    assert sentence_bounds(doc) == [(0, 5)]
+    assert sentence_bounds(nlp("")) == []